@@ -4,46 +4,45 @@ SensorLog-TelegramBot
 Este script insere dados recebidos em um banco de dados SQLite.
 """
 
-import sqlite3
 import logging
 from telebot import TeleBot, types
-from sensorlog import Decode, Events, Values
+from sensorlog import Decode, Events, Values, filter_direct_channel_text_signed, metrics
+from sensorlog.dedup import Deduplicator
+from sensorlog.runner import Runner
+from sensorlog.storage import SQLiteWriter
 from config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 bot = TeleBot(token=settings.telegram_token)
+writer = SQLiteWriter(settings.db_name)
 
 
-def insert_into_db(table, data):
+def insert_into_db(table, record: Values | Events):
     """
-    Insere dados em uma tabela do banco de dados SQLite.
+    Enfileira um registro para inserção em uma tabela do banco de dados SQLite.
+
+    A gravação é feita em lote pelo `SQLiteWriter`, em uma thread própria, para
+    que o processamento das mensagens não aguarde o disco. As colunas são as de
+    `record.COLUMNS`, com os valores de `record.as_tuple()`.
 
     Args:
         table (str): O nome da tabela onde os dados serão inseridos.
-        data (dict): Os dados a serem inseridos na tabela.
+        record (Values | Events): O registro a ser inserido na tabela.
 
     Returns:
         None
     """
-    logger.info("Iniciando inserção no banco de dados")
+    logger.debug("Iniciando inserção no banco de dados")
     try:
-        conn = sqlite3.connect(settings.db_name)
-        cursor = conn.cursor()
-
-        columns = ", ".join(data.keys())
-        placeholders = ", ".join("?" * len(data))
-        sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
-
-        cursor.execute(sql, tuple(data.values()))
-        conn.commit()
-        conn.close()
-        logger.info(f"Dados inseridos na tabela {table}: {data}")
+        row = record.as_tuple()
+        writer.write(table, record.COLUMNS, row)
+        logger.debug("Dados enfileirados para a tabela %s: %s", table, row)
     except Exception as e:
         logger.error(f"Erro ao inserir dados no banco de dados: {e}")
     finally:
-        logger.info("Finalizando inserção no banco de dados")
+        logger.debug("Finalizando inserção no banco de dados")
 
 
 def process_channel_message_event(event: Events):
@@ -55,25 +54,14 @@ def process_channel_message_event(event: Events):
 
     A função insere os dados do evento na tabela 'events' do banco de dados.
     """
-    logger.info("Iniciando processamento do evento")
+    logger.debug("Iniciando processamento do evento")
     try:
-        logger.info(f"Processando evento")
-        data = {
-            "time": event.time,
-            "timezone_offset": event.timezone_offset.total_seconds(),
-            "channel_id": event.channel_id,
-            "channel_name": event.channel_name,
-            "bot_name": event.bot_name,
-            "device_name": event.device_name,
-            "type": event.type,
-            "flag": event.flag,
-            "text": event.text,
-        }
-        insert_into_db("events", data)
+        logger.debug("Processando evento")
+        insert_into_db("events", event)
     except Exception as e:
         logger.error(f"Erro ao processar evento: {e}")
     finally:
-        logger.info("Finalizando processamento do evento")
+        logger.debug("Finalizando processamento do evento")
 
 
 def process_channel_message_values(values: Values):
@@ -85,57 +73,16 @@ def process_channel_message_values(values: Values):
 
     A função insere os valores dos sensores na tabela 'sensor_values' do banco de dados.
     """
-    logger.info("Iniciando processamento dos valores")
+    logger.debug("Iniciando processamento dos valores")
     try:
-        logger.info(f"Processando valores")
-        data = {
-            "time": values.time,
-            "timezone_offset": values.timezone_offset.total_seconds(),
-            "channel_id": values.channel_id,
-            "channel_name": values.channel_name,
-            "bot_name": values.bot_name,
-            "device_name": values.device_name,
-            "level": values.level,
-            "raw_level": values.raw_level,
-            "distance": values.distance,
-            "t0": values.t0,
-            "t1": values.t1,
-            "v0": values.v0,
-            "v1": values.v1,
-            "snr": values.snr,
-            "rssi": values.rssi,
-            "snr_gw": values.snr_gw,
-            "rssi_gw": values.rssi_gw,
-            "counter": values.counter,
-            "digital_input": values.digital_input,
-        }
-        insert_into_db("sensor_values", data)
+        logger.debug("Processando valores")
+        insert_into_db("sensor_values", values)
     except Exception as e:
         logger.error(f"Erro ao processar valores: {e}")
     finally:
-        logger.info("Finalizando processamento dos valores")
-
-
-def filter_direct_channel_text_signed(m: types.Message) -> bool:
-    """
-    Filtra mensagens de texto diretas assinadas em um canal.
-
-    Args:
-        m (types.Message): A mensagem recebida do canal do Telegram.
+        logger.debug("Finalizando processamento dos valores")
 
-    Returns:
-        bool: True se a mensagem atender aos critérios de filtro, False caso contrário.
-    """
-    return (
-        m.reply_to_message is None
-        and m.forward_from_chat is None
-        and m.author_signature is not None
-        and m.content_type == "text"
-        and m.chat.type == "channel"
-    )
 
-
-@bot.channel_post_handler(func=filter_direct_channel_text_signed)
 def handle_channel_message(m: types.Message):
     """
     Manipula postagens de canal filtradas.
@@ -145,7 +92,7 @@ def handle_channel_message(m: types.Message):
 
     A função decodifica a mensagem e processa os dados de eventos ou valores dos sensores.
     """
-    logger.info("Iniciando manipulação da mensagem do canal")
+    logger.debug("Iniciando manipulação da mensagem do canal")
     try:
         message = Decode(m)
         if isinstance(message.var_data, Values):
@@ -155,8 +102,22 @@ def handle_channel_message(m: types.Message):
     except Exception as e:
         logger.error(f"Erro ao manipular mensagem do canal: {e}")
     finally:
-        logger.info("Finalizando manipulação da mensagem do canal")
+        logger.debug("Finalizando manipulação da mensagem do canal")
+
+
+runner = Runner(
+    bot,
+    handle_channel_message,
+    func=filter_direct_channel_text_signed,
+    workers=settings.workers,
+    dedup=Deduplicator.for_consumer(settings.dedup_dir, "sqlite_insert"),
+)
 
+if settings.metrics_port:
+    metrics.serve(settings.metrics_port)
 
 logger.info("Bot iniciado. Aguardando mensagens do canal")
-bot.infinity_polling(skip_pending=False)
+try:
+    runner.infinity_polling(skip_pending=False)
+finally:
+    writer.close()
@@ -0,0 +1,40 @@
+"""
+SensorLog-TelegramBot
+
+Este script exporta as leituras de um banco no esquema versionado para o
+arquivo colunar de `sensorlog.archive` (um arquivo por dispositivo e mês).
+
+Uso:
+    python3 archive_db.py --root arquivo/
+    python3 archive_db.py --root arquivo/ --since 2024-06-01 --device "Sensor 01"
+"""
+
+import argparse
+import logging
+import sqlite3
+from datetime import datetime
+from sensorlog.archive import export_archive
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta as leituras para o arquivo colunar.")
+    parser.add_argument("--db", default=settings.db_name, help="Banco SQLite")
+    parser.add_argument("--root", required=True, help="Diretório do arquivo colunar")
+    parser.add_argument("--since", help="Data (AAAA-MM-DD) a partir da qual regravar os meses")
+    parser.add_argument("--device", action="append", help="Dispositivo a exportar (pode ser repetido)")
+    args = parser.parse_args()
+
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    try:
+        export_archive(args.db, args.root, since, args.device)
+    except (KeyError, ValueError, OSError, sqlite3.Error) as e:
+        logger.error(f"Erro ao exportar o arquivo colunar: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+SensorLog-TelegramBot
+
+Este script reconstrói as tabelas `sensor_values` e `events` a partir de uma
+exportação de canal do Telegram Desktop (`result.json`).
+
+A cada lote, o maior `message_id` importado é registrado em `ingest_progress` na
+mesma transação das linhas; uma importação interrompida retoma exatamente desse
+ponto, e mensagens já importadas são ignoradas antes da decodificação.
+
+Uso:
+    python3 backfill.py result.json [--db sensordata.db] [--processes 8] [--restart]
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+from sensorlog import Decode, Values
+from sensorlog.dedup import PROGRESS_COLUMNS, create_progress_table, load_progress
+from sensorlog.export import filter_exported_message, open_export, open_export_slices, to_message
+from sensorlog.parallel import decode_export_parallel
+from sensorlog.sinks import SQLiteSink
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROGRESS_SOURCE = "backfill"
+
+
+def backfill(
+    path: str,
+    db_name: str,
+    batch_size: int,
+    progress_interval: float,
+    processes: int = 1,
+    resume: bool = True,
+) -> dict:
+    """
+    Decodifica todas as mensagens da exportação e grava os resultados em lote.
+
+    Args:
+        path (str): Caminho do `result.json` exportado.
+        db_name (str): Banco SQLite de destino (tabelas criadas por `create_db.py`).
+        batch_size (int): Mensagens aceitas por transação (e por ponto de retomada); com
+            vários processos, cada fatia da exportação (~1 MiB) é uma transação.
+        progress_interval (float): Intervalo, em segundos, entre os relatórios de progresso.
+        processes (int): Com mais de um processo, a leitura do JSON, o filtro e a
+            decodificação são feitos nos workers (`decode_export_parallel`).
+        resume (bool): Ignora as mensagens até o último `message_id` registrado em `ingest_progress`.
+
+    Returns:
+        dict: Contadores finais (mensagens lidas, ignoradas, aceitas, sem data, valores, eventos).
+    """
+    if processes > 1:
+        chat, slices = open_export_slices(path)
+    else:
+        chat, raw_messages = open_export(path)
+    conn = sqlite3.connect(db_name)
+    create_progress_table(conn)
+    last_imported = load_progress(conn, PROGRESS_SOURCE, chat.id) if resume else None
+    conn.close()
+    if last_imported is None:
+        last_imported = -1
+        logger.info(f"Importando o canal {chat.title} ({chat.id}) para {db_name}")
+    else:
+        logger.info(f"Retomando a importação do canal {chat.title} ({chat.id}) após a mensagem {last_imported}")
+    # Os lotes são gravados apenas nos pontos de retomada (`checkpoint`), para que as
+    # linhas e o registro em `ingest_progress` fiquem na mesma transação.
+    sink = SQLiteSink(db_name, batch_size=2**62, flush_interval=86400.0)
+    counters = {"read": 0, "skipped": 0, "accepted": 0, "undated": 0, "values": 0, "events": 0}
+    start = time.perf_counter()
+    next_report = start + progress_interval
+
+    def accepted():
+        for raw in raw_messages:
+            counters["read"] += 1
+            if raw.get("id", -1) <= last_imported:
+                counters["skipped"] += 1
+            elif filter_exported_message(raw):
+                message = to_message(raw, chat)
+                if message is None:
+                    counters["undated"] += 1
+                    continue
+                counters["accepted"] += 1
+                yield message
+
+    handed = -1
+
+    def checkpoint():
+        if handed > last_imported:
+            sink.writer.write("ingest_progress", PROGRESS_COLUMNS, (PROGRESS_SOURCE, chat.id, handed))
+        sink.writer.flush()
+
+    def report():
+        nonlocal next_report
+        if time.perf_counter() >= next_report:
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"{counters['read']:,} mensagens lidas, {counters['values']:,} valores, "
+                f"{counters['events']:,} eventos ({counters['read'] / elapsed:,.0f} msg/s)"
+            )
+            next_report = time.perf_counter() + progress_interval
+
+    # `handed` é o último `message_id` já entregue ao `SQLiteWriter`; ao sair (inclusive
+    # por interrupção), as linhas pendentes são gravadas junto com esse ponto de retomada.
+    try:
+        if processes > 1:
+            for batch, counts in decode_export_parallel(slices, chat, last_imported, processes):
+                sink.on_batch(batch)
+                for key in ("read", "skipped", "accepted", "undated"):
+                    counters[key] += counts[key]
+                counters["values"] += len(batch)
+                counters["events"] += len(batch.events)
+                handed = max(handed, counts["last"])
+                checkpoint()
+                report()
+        else:
+            for message in accepted():
+                record = Decode(message).var_data
+                if isinstance(record, Values):
+                    sink.on_values(record)
+                    counters["values"] += 1
+                elif record is not None:
+                    sink.on_event(record)
+                    counters["events"] += 1
+                handed = message.message_id
+                if counters["accepted"] % batch_size == 0:
+                    checkpoint()
+                if counters["accepted"] % 1000 == 0:
+                    report()
+    finally:
+        try:
+            checkpoint()
+        finally:
+            sink.close()
+    elapsed = time.perf_counter() - start
+    counters["seconds"] = elapsed
+    logger.info(
+        f"Concluído: {counters['read']:,} mensagens lidas, {counters['skipped']:,} já importadas, "
+        f"{counters['accepted']:,} aceitas, {counters['undated']:,} sem data, "
+        f"{counters['values']:,} valores e {counters['events']:,} eventos em {elapsed:.1f}s "
+        f"({counters['read'] / max(elapsed, 1e-9):,.0f} msg/s)"
+    )
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa uma exportação de canal do Telegram para o SQLite.")
+    parser.add_argument("export", help="Arquivo result.json exportado pelo Telegram Desktop")
+    parser.add_argument("--db", default=settings.db_name, help="Banco SQLite de destino")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Mensagens por transação")
+    parser.add_argument("--progress", type=float, default=5.0, help="Segundos entre relatórios de progresso")
+    parser.add_argument("--processes", type=int, default=1, help="Processos de decodificação (1 = sequencial)")
+    parser.add_argument("--restart", action="store_true", help="Ignora o progresso registrado e importa tudo")
+    args = parser.parse_args()
+    backfill(args.export, args.db, args.batch_size, args.progress, args.processes, resume=not args.restart)
+
+
+if __name__ == "__main__":
+    main()
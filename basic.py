@@ -6,7 +6,17 @@ Este script processa eventos do Telegram e exibe os dados no console.
 
 import logging
 from telebot import TeleBot, types
-from sensorlog import Decode, Events, Values, EVENT_LEVEL, EVENT_COMMUNICATION
+from sensorlog import (
+    Decode,
+    Events,
+    Values,
+    EVENT_LEVEL,
+    EVENT_COMMUNICATION,
+    filter_direct_channel_text_signed,
+    metrics,
+)
+from sensorlog.dedup import Deduplicator
+from sensorlog.runner import Runner
 from config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -28,7 +38,7 @@ def process_channel_message_event(event: Events):
 
     A função imprime detalhes do evento com base no seu tipo.
     """
-    logger.info("Iniciando processamento do evento")
+    logger.debug("Iniciando processamento do evento")
     try:
         if event.type == EVENT_LEVEL:
             print(f"Evento de nível:\n{event}")
@@ -39,7 +49,7 @@ def process_channel_message_event(event: Events):
     except Exception as e:
         logger.error(f"Erro ao processar evento: {e}")
     finally:
-        logger.info("Finalizando processamento do evento")
+        logger.debug("Finalizando processamento do evento")
 
 
 def process_channel_message_values(values: Values):
@@ -51,35 +61,15 @@ def process_channel_message_values(values: Values):
 
     A função imprime os valores dos sensores recebidos.
     """
-    logger.info("Iniciando processamento dos valores")
+    logger.debug("Iniciando processamento dos valores")
     try:
         print(f"Valores de sensores recebidos:\n{values}")
     except Exception as e:
         logger.error(f"Erro ao processar valores: {e}")
     finally:
-        logger.info("Finalizando processamento dos valores")
+        logger.debug("Finalizando processamento dos valores")
 
 
-def filter_direct_channel_text_signed(m: types.Message) -> bool:
-    """
-    Filtra mensagens de texto diretas assinadas em um canal.
-
-    Args:
-        m (types.Message): A mensagem recebida do canal do Telegram.
-
-    Returns:
-        bool: True se a mensagem atender aos critérios de filtro, False caso contrário.
-    """
-    return (
-        m.reply_to_message is None
-        and m.forward_from_chat is None
-        and m.author_signature is not None
-        and m.content_type == "text"
-        and m.chat.type == "channel"
-    )
-
-
-@bot.channel_post_handler(func=filter_direct_channel_text_signed)
 def handle_channel_message(m: types.Message):
     """
     Manipula postagens de canal filtradas.
@@ -87,7 +77,7 @@ def handle_channel_message(m: types.Message):
     Args:
         m (types.Message): A mensagem recebida do canal do Telegram.
     """
-    logger.info("Iniciando manipulação da mensagem do canal")
+    logger.debug("Iniciando manipulação da mensagem do canal")
     try:
         message = Decode(m)
         if isinstance(message.var_data, Values):
@@ -97,8 +87,19 @@ def handle_channel_message(m: types.Message):
     except Exception as e:
         logger.error(f"Erro ao manipular mensagem do canal: {e}")
     finally:
-        logger.info("Finalizando manipulação da mensagem do canal")
+        logger.debug("Finalizando manipulação da mensagem do canal")
+
+
+runner = Runner(
+    bot,
+    handle_channel_message,
+    func=filter_direct_channel_text_signed,
+    workers=settings.workers,
+    dedup=Deduplicator.for_consumer(settings.dedup_dir, "basic"),
+)
 
+if settings.metrics_port:
+    metrics.serve(settings.metrics_port)
 
 logger.info("Bot iniciado. Aguardando mensagens do canal")
-bot.infinity_polling(skip_pending=False)
+runner.infinity_polling(skip_pending=False)
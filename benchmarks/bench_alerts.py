@@ -0,0 +1,132 @@
+"""
+Simulação de um gateway instável: uma rajada de eventos de comunicação enviada
+a um servidor local que imita o limite do CallMeBot (respostas 429 acima de
+`--limit` mensagens por segundo). Compara o envio direto, um GET por evento
+como a versão original de `whatsapp.py`, com o `AlertDispatcher`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sensorlog import EVENT_COMMUNICATION, Events
+from sensorlog.alerts import AlertDispatcher, CallMeBotClient
+
+from .corpus import DEVICE_NAMES
+
+
+class FakeCallMeBot(ThreadingHTTPServer):
+    """Servidor que aceita até `limit` mensagens por segundo e responde 429 às demais."""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.accepted = 0
+        self.throttled = 0
+        self.recent: deque[float] = deque()
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+    def admit(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            if len(self.recent) >= self.limit:
+                self.throttled += 1
+                return False
+            self.recent.append(now)
+            self.accepted += 1
+            return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.server.admit() else 429)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def storm(events: int, devices: int) -> list[Events]:
+    """Eventos alternando falha/retorno de comunicação entre `devices` dispositivos."""
+    rnd = random.Random(1)
+    flags = {}
+    result = []
+    for _ in range(events):
+        device = DEVICE_NAMES[rnd.randrange(devices)]
+        flag = "✅" if flags.get(device) == "⚠" else "⚠"
+        flags[device] = flag
+        text = "Comunicação normalizada" if flag == "✅" else "Falha de comunicação"
+        result.append(
+            Events(
+                device_name=device,
+                event_flag=flag,
+                time=datetime.now(),
+                channel_id=-1001234567890,
+                channel_name="Canal de testes",
+                event_type=EVENT_COMMUNICATION,
+                event_text=f"{device}: {flag}\n{text}",
+            )
+        )
+    return result
+
+
+def run_server(limit: float) -> tuple[FakeCallMeBot, str]:
+    server = FakeCallMeBot(limit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/whatsapp.php"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--limit", type=float, default=5, help="Mensagens por segundo aceitas pelo servidor")
+    parser.add_argument("--debounce", type=float, default=2.0)
+    args = parser.parse_args()
+
+    events = storm(args.events, min(args.devices, len(DEVICE_NAMES)))
+
+    server, url = run_server(args.limit)
+    client = CallMeBotClient("5500000000000", "chave", url)
+    start = time.perf_counter()
+    for event in events:
+        try:
+            client.send(f"*{event.channel_name}*\n{event.text}")
+        except ConnectionError:
+            pass
+    direct = time.perf_counter() - start
+    client.close()
+    server.shutdown()
+    print(
+        f"Envio direto:    {server.accepted:5d} entregues, {server.throttled:5d} recusadas (429) "
+        f"em {direct:.1f}s de handler"
+    )
+
+    server, url = run_server(args.limit)
+    dispatcher = AlertDispatcher(
+        CallMeBotClient("5500000000000", "chave", url), rate=args.limit * 0.8, burst=1, debounce=args.debounce
+    )
+    start = time.perf_counter()
+    for event in events:
+        dispatcher.submit(event)
+    handler = time.perf_counter() - start
+    dispatcher.close()
+    total = time.perf_counter() - start
+    server.shutdown()
+    print(
+        f"AlertDispatcher: {server.accepted:5d} entregues, {server.throttled:5d} recusadas (429) "
+        f"em {handler * 1e3:.1f} ms de handler ({total:.1f}s até o último envio)"
+    )
+    print(f"Estatísticas: {dispatcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark do arquivo colunar: "soma de `level` de um dispositivo em um ano"
+lida do SQLite (`SensorQuery.range`) contra `Archive.column`, e as páginas de
+cada coluna trazidas para a memória por essa varredura (Linux: `mincore` após
+descartar o cache dos arquivos com `posix_fadvise`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import glob
+import math
+import mmap
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Optional
+
+from sensorlog.archive import PAGE_SIZE, Archive, ColumnFile, export_archive
+from sensorlog.query import SensorQuery
+from sensorlog.schema import create_schema
+from sensorlog.storage import SQLiteWriter
+
+from .bench_rollup import COLUMNS, readings
+from .corpus import DEVICE_NAMES
+
+
+def load(db_name: str, rows: list[tuple]):
+    conn = sqlite3.connect(db_name)
+    create_schema(conn)
+    conn.close()
+    writer = SQLiteWriter(db_name, batch_size=5000)
+    for row in rows:
+        writer.write("sensor_values", COLUMNS, row)
+    writer.close()
+
+
+def drop_cache(path: str) -> bool:
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # Páginas recém-gravadas (sujas) só saem do cache depois de gravadas no disco.
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def resident_pages(path: str) -> Optional[list[bool]]:
+    """Páginas de `path` presentes no cache do sistema, ou `None` se `mincore` não estiver disponível."""
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    libc.mincore.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_ubyte))
+    size = os.path.getsize(path)
+    vector = (ctypes.c_ubyte * -(-size // PAGE_SIZE))()
+    with open(path, "rb") as file:
+        # Mapeamento privado (gravável) apenas para obter o endereço; nenhuma página é tocada.
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        view = (ctypes.c_char * size).from_buffer(mapped)
+        status = libc.mincore(ctypes.addressof(view), size, vector)
+        del view
+        mapped.close()
+    return [bool(flag & 1) for flag in vector] if status == 0 else None
+
+
+def column_residency(paths: list[str]) -> Optional[dict[str, tuple[int, int]]]:
+    """Páginas em cache / total, por coluna, somadas nos arquivos."""
+    totals: dict[str, list[int]] = {}
+    for path in paths:
+        pages = resident_pages(path)
+        if pages is None:
+            return None
+        with ColumnFile(path) as column_file:
+            layout = sorted(column_file.header["columns"].items(), key=lambda item: item[1]["offset"])
+        offsets = [spec["offset"] // PAGE_SIZE for _, spec in layout] + [len(pages)]
+        for (name, _), first, last in zip(layout, offsets, offsets[1:]):
+            total = totals.setdefault(name, [0, 0])
+            total[0] += sum(pages[first:last])
+            total[1] += last - first
+    return {name: (cached, total) for name, (cached, total) in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    span = args.days * 86400
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "sensorlog.db")
+        root = os.path.join(directory, "archive")
+        load(db_name, readings(args.rows, min(args.devices, len(DEVICE_NAMES)), span))
+        start = time.perf_counter()
+        report = export_archive(db_name, root)
+        print(
+            f"Exportação: {report['rows']:,} leituras, {report['months']} arquivos em "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+        device = DEVICE_NAMES[0]
+        since = int(time.time()) - span - 86400
+        with SensorQuery(db_name) as query:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                rows = query.range(device, since, fields=("level",))
+                expected = math.fsum(row[1] for row in rows if row[1] is not None)
+            sqlite_time = (time.perf_counter() - start) / args.repeat
+
+        with Archive(root) as archive:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                total = math.fsum(math.fsum(view) for view in archive.column(device, "level", since))
+            archive_time = (time.perf_counter() - start) / args.repeat
+        assert math.isclose(total, expected), f"soma {total} no arquivo, {expected} no SQLite"
+        print(f"SQLite (SensorQuery.range):  {sqlite_time * 1e3:9.2f} ms  ({len(rows):,} leituras)")
+        print(f"Arquivo colunar (mmap):      {archive_time * 1e3:9.2f} ms  ({sqlite_time / archive_time:.0f}x)")
+
+        with Archive(root) as archive:
+            paths = glob.glob(os.path.join(root, str(archive.device_id(device)), "*.col"))
+            if not all(drop_cache(path) for path in paths):
+                return
+            for view in archive.column(device, "level", since):
+                math.fsum(view)
+        residency = column_residency(paths)
+        if residency is None:
+            return
+        print("Páginas lidas por coluna (em cache / total):")
+        for name, (cached, total) in residency.items():
+            print(f"  {name:<14} {cached:6d} / {total:<6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark do decodificador: mensagens/segundo do `Decode` atual contra a
+implementação anterior (split por linha + `SetValues.set_value`) e contra a
+decodificação colunar de `Decode.batch`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+
+from sensorlog import Decode, SetValues
+from sensorlog.core import VALUE_PATTERN
+
+from .corpus import values_messages
+
+
+class LegacyDecode:
+    """Reprodução do `Decode._parse_values` anterior, mantida apenas como referência."""
+
+    __slots__ = ("var_data",)
+
+    def __init__(self, message):
+        lines = (message.text or "").splitlines()
+        self.var_data = self._parse_values(lines, message) if lines else None
+
+    @staticmethod
+    def _parse_values(lines, message):
+        match = re.search(r'Nome:\s*"([^"]+)"', lines[0])
+        if not match:
+            return None
+        result = SetValues(
+            device_name=match.group(1).strip(),
+            time=message.date,
+            channel_id=message.chat.id,
+            channel_name=message.chat.title,
+            message_id=message.message_id,
+            bot_name=message.author_signature,
+        )
+        for line in lines[1:]:
+            key_value = line.split(":", 1)
+            if len(key_value) != 2:
+                continue
+            raw_value = key_value[1].strip()
+            value = VALUE_PATTERN.search(raw_value)
+            try:
+                result.set_value(key_value[0].strip(), value.group() if value else raw_value)
+            except (ValueError, TypeError):
+                continue
+        return result
+
+
+def measure(decoders, messages, repeat: int) -> list[float]:
+    """Retorna mensagens/segundo (melhor rodada) de cada decodificador, intercalando as rodadas."""
+    best = [float("inf")] * len(decoders)
+    for _ in range(repeat):
+        for index, decoder in enumerate(decoders):
+            start = time.perf_counter()
+            for message in messages:
+                decoder(message)
+            best[index] = min(best[index], time.perf_counter() - start)
+    return [len(messages) / elapsed for elapsed in best]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = values_messages(args.messages)
+    for message in messages[:100]:
+        legacy, current = LegacyDecode(message).var_data, Decode(message).var_data
+        assert str(legacy) == str(current), "decodificadores divergem"
+
+    legacy_rate, current_rate = measure((LegacyDecode, Decode), messages, args.repeat)
+    print(f"Decode anterior: {legacy_rate:12,.0f} msg/s")
+    print(f"Decode atual:    {current_rate:12,.0f} msg/s  ({current_rate / legacy_rate:.2f}x)")
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        Decode.batch(messages)
+        best = min(best, time.perf_counter() - start)
+    batch_rate = len(messages) / best
+    print(f"Decode.batch:    {batch_rate:12,.0f} msg/s  ({batch_rate / legacy_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
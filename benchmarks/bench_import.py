@@ -0,0 +1,84 @@
+"""
+Tempo de importação do pacote, medido em processos novos (mediana de
+`--repeat` execuções, sem contar a inicialização do interpretador).
+
+Cada caso tem um limite em milissegundos e uma lista de módulos pesados que não
+podem ser carregados por ele (`telebot`, `requests`, `http.server`...). Um caso
+acima do limite, ou que carregue um desses módulos, encerra com código 1:
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --tolerance 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que nenhum dos casos abaixo deve carregar.
+HEAVY = ("telebot", "requests", "http.server", "sqlite3", "fastapi", "concurrent.futures")
+
+# (instrução, limite em ms, módulos de HEAVY permitidos); limite None = apenas referência.
+CASES = (
+    ("import sensorlog", 10.0, ()),
+    ("from sensorlog import Decode", 40.0, ()),
+    ("from sensorlog.Post import Decode", 40.0, ()),
+    ("from sensorlog.parallel import decode_parallel", 60.0, ("concurrent.futures",)),
+    ("import telebot", None, HEAVY),
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def measure(statement: str, repeat: int) -> tuple[float, list[str]]:
+    """Mediana (ms) do tempo da instrução e os módulos de `HEAVY` que ela carregou."""
+    code = _PROBE.format(statement=statement, heavy=HEAVY)
+    samples = []
+    loaded: list[str] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        elapsed, loaded = json.loads(output)
+        samples.append(elapsed * 1e3)
+    return statistics.median(samples), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=11)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Multiplica os limites (ex.: 2 em máquinas lentas)")
+    args = parser.parse_args()
+
+    failures = []
+    for statement, limit, allowed in CASES:
+        elapsed, loaded = measure(statement, args.repeat)
+        budget = f"(limite {limit * args.tolerance:.0f} ms)" if limit is not None else "(referência)"
+        print(f"{statement:48s} {elapsed:7.1f} ms {budget}")
+        if limit is not None and elapsed > limit * args.tolerance:
+            failures.append(f"{statement}: {elapsed:.1f} ms > {limit * args.tolerance:.0f} ms")
+        unexpected = [name for name in loaded if name not in allowed]
+        if unexpected:
+            failures.append(f"{statement}: importa {', '.join(unexpected)}")
+    if failures:
+        print("REGRESSÃO:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
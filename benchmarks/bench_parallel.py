@@ -0,0 +1,110 @@
+"""
+Benchmark de decodificação em múltiplos processos: mensagens/segundo de
+`decode_parallel` com 1, 2, 4, ... processos, contra `decode_batch` em um único
+processo; e, para uma exportação sintética (`result.json`), a leitura completa
+como em `backfill.py`: sequencial, com o JSON lido e filtrado no processo
+principal (`decode_parallel`) e com fatias de texto lidas nos workers
+(`decode_export_parallel`).
+
+O ganho depende dos núcleos disponíveis; em uma máquina de um núcleo o pool só
+acrescenta o custo de serialização. Por isso também é medido o tempo de CPU do
+processo principal por mensagem: a parte que não se divide entre os workers e
+que limita o ganho com mais núcleos (lei de Amdahl).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from sensorlog.batch import decode_batch
+from sensorlog.export import filter_exported_message, open_export, open_export_slices, to_message
+from sensorlog.parallel import as_raw, decode_export_parallel, decode_parallel
+
+from .corpus import values_messages, write_export
+
+
+def process_counts(limit: int) -> list[int]:
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != limit:
+        counts.append(limit)
+    return counts
+
+
+def export_serial(path: str) -> int:
+    chat, raw_messages = open_export(path)
+    messages = (to_message(raw, chat) for raw in raw_messages if filter_exported_message(raw))
+    return len(decode_batch([message for message in messages if message is not None]))
+
+
+def export_parent(path: str, processes: int) -> int:
+    chat, raw_messages = open_export(path)
+    messages = (to_message(raw, chat) for raw in raw_messages if filter_exported_message(raw))
+    records = (as_raw(message) for message in messages if message is not None)
+    return sum(len(batch) for batch in decode_parallel(records, processes))
+
+
+def export_workers(path: str, processes: int) -> int:
+    chat, slices = open_export_slices(path)
+    return sum(len(batch) for batch, _ in decode_export_parallel(slices, chat, processes=processes))
+
+
+def timed(function, *args) -> tuple[int, float, float]:
+    """Resultado, segundos decorridos e segundos de CPU do processo principal."""
+    start, cpu = time.perf_counter(), time.process_time()
+    result = function(*args)
+    return result, time.perf_counter() - start, time.process_time() - cpu
+
+
+def bench_export(count: int, max_processes: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "result.json")
+        write_export(path, count)
+        print(f"\nExportação ({count:,} mensagens, {os.path.getsize(path) / 2**20:.1f} MiB):")
+        expected, elapsed, cpu = timed(export_serial, path)
+        baseline = count / elapsed
+        print(f"sequencial:                   {baseline:10,.0f} msg/s  CPU principal {cpu / count * 1e6:6.1f} µs/msg")
+        for processes in process_counts(max_processes):
+            for label, function in (("JSON no principal", export_parent), ("JSON nos workers", export_workers)):
+                total, elapsed, cpu = timed(function, path, processes)
+                assert total == expected, f"esperado {expected} leituras, decodificadas {total}"
+                rate = count / elapsed
+                print(
+                    f"{label} ({processes:>2} proc.): {rate:10,.0f} msg/s ({rate / baseline:.2f}x)  "
+                    f"CPU principal {cpu / count * 1e6:6.1f} µs/msg"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--export", type=int, default=200_000, help="Mensagens da exportação sintética (0 = não medir)")
+    args = parser.parse_args()
+
+    messages = values_messages(args.messages)
+    records = [as_raw(message) for message in messages]
+
+    start = time.perf_counter()
+    decoded = len(decode_batch(messages))
+    baseline = args.messages / (time.perf_counter() - start)
+    print(f"decode_batch (1 processo):  {baseline:12,.0f} msg/s")
+
+    for processes in process_counts(args.max_processes):
+        start = time.perf_counter()
+        total = sum(len(batch) for batch in decode_parallel(records, processes, args.chunk_size))
+        rate = args.messages / (time.perf_counter() - start)
+        assert total == decoded, f"esperado {decoded} leituras, decodificadas {total}"
+        print(f"decode_parallel ({processes:>2} proc.): {rate:12,.0f} msg/s  ({rate / baseline:.2f}x)")
+
+    if args.export:
+        bench_export(args.export, args.max_processes)
+
+
+if __name__ == "__main__":
+    main()
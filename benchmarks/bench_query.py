@@ -0,0 +1,108 @@
+"""
+Benchmark de consulta "últimas 24 h do dispositivo X": varredura da tabela
+`sensor_values` original contra `SensorQuery.range` no esquema versão 1, com e
+sem partições mensais.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from sensorlog.query import SensorQuery
+from sensorlog.schema import migrate
+
+from .bench_sqlite import new_database
+from .corpus import DEVICE_NAMES
+
+COLUMNS = ("time", "timezone_offset", "channel_id", "channel_name", "bot_name", "device_name", "level", "rssi")
+
+
+def fill_legacy(db_name: str, rows: int, devices: int, interval: int) -> int:
+    """Grava `rows` leituras no esquema original e retorna o horário da última."""
+    rnd = random.Random(1)
+    names = [f"{DEVICE_NAMES[i % len(DEVICE_NAMES)]} {i:03d}" for i in range(devices)]
+    start = int(time.time()) - rows * interval // devices
+    conn = sqlite3.connect(db_name)
+    sql = f"INSERT INTO sensor_values ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+    conn.executemany(
+        sql,
+        (
+            (
+                datetime.fromtimestamp(start + (i // devices) * interval),
+                0,
+                -1001234567890,
+                "Canal de testes",
+                "sensorlog",
+                names[i % devices],
+                rnd.uniform(0, 100),
+                rnd.randint(-130, -40),
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+    return start + (rows // devices) * interval
+
+
+def timed(function, repeat: int) -> tuple[float, int]:
+    found = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        found = function()
+    return (time.perf_counter() - start) / repeat, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--interval", type=int, default=600, help="Segundos entre leituras de um dispositivo")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = new_database(directory, "legacy.db")
+        end = fill_legacy(legacy, args.rows, args.devices, args.interval)
+        start = end - 24 * 3600
+        device = f"{DEVICE_NAMES[7 % len(DEVICE_NAMES)]} {7:03d}"
+
+        conn = sqlite3.connect(legacy)
+        since = datetime.fromtimestamp(start)
+        legacy_time, legacy_found = timed(
+            lambda: len(
+                conn.execute(
+                    "SELECT time, level FROM sensor_values WHERE device_name = ? AND time >= ? ORDER BY time",
+                    (device, since),
+                ).fetchall()
+            ),
+            args.repeat,
+        )
+        conn.close()
+        print(f"Esquema original (varredura): {legacy_time * 1e3:10.2f} ms  ({legacy_found} linhas)")
+
+        for partitioned in (False, True):
+            db_name = shutil.copy(legacy, f"{directory}/v1-{partitioned}.db")
+            conn = sqlite3.connect(db_name)
+            began = time.perf_counter()
+            migrate(conn, partitioned=partitioned, drop_legacy=True)
+            migrated = time.perf_counter() - began
+            conn.close()
+            with SensorQuery(db_name) as query:
+                elapsed, found = timed(lambda: len(query.range(device, start, fields=("level",))), args.repeat)
+            label = "particionado" if partitioned else "tabela única"
+            print(
+                f"Versão 1, {label + ':':<14}     {elapsed * 1e3:10.2f} ms  ({found} linhas, "
+                f"{legacy_time / elapsed:,.0f}x; migração em {migrated:.1f}s)"
+            )
+            assert found == legacy_found, f"esperado {legacy_found} linhas, encontradas {found}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark dos agregados: custo de manter `rollup_1m/1h/1d` durante a gravação
+e tempo de uma consulta de painel ("média horária de `level` em um ano") nas
+leituras brutas contra `SensorQuery.rollup`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from sensorlog.query import SensorQuery
+from sensorlog.rollup import create_rollups
+from sensorlog.schema import create_schema
+from sensorlog.storage import SQLiteWriter
+
+from .corpus import DEVICE_NAMES
+
+COLUMNS = ("time", "timezone_offset", "channel_id", "channel_name", "bot_name", "device_name", "level", "t0", "v0", "rssi")
+
+
+def readings(rows: int, devices: int, span: int) -> list[tuple]:
+    rnd = random.Random(1)
+    start = int(time.time()) - span
+    step = span * devices // rows
+    return [
+        (
+            datetime.fromtimestamp(start + (i // devices) * step),
+            0,
+            -1001234567890,
+            "Canal de testes",
+            "sensorlog",
+            DEVICE_NAMES[i % devices],
+            rnd.uniform(0, 100),
+            rnd.uniform(-5, 45),
+            rnd.uniform(3.0, 4.2),
+            rnd.randint(-130, -40),
+        )
+        for i in range(rows)
+    ]
+
+
+def load(db_name: str, rows: list[tuple], rollups: bool) -> float:
+    conn = sqlite3.connect(db_name)
+    create_schema(conn)
+    if rollups:
+        create_rollups(conn, fields=("level", "t0", "v0", "rssi"))
+    conn.close()
+    writer = SQLiteWriter(db_name, batch_size=5000)
+    start = time.perf_counter()
+    for row in rows:
+        writer.write("sensor_values", COLUMNS, row)
+    writer.close()
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    span = args.days * 86400
+    rows = readings(args.rows, min(args.devices, len(DEVICE_NAMES)), span)
+    with tempfile.TemporaryDirectory() as directory:
+        plain = os.path.join(directory, "plain.db")
+        rolled = os.path.join(directory, "rollup.db")
+        plain_rate = load(plain, rows, rollups=False)
+        rollup_rate = load(rolled, rows, rollups=True)
+        print(f"Gravação sem agregados: {plain_rate:12,.0f} linhas/s")
+        print(f"Gravação com agregados: {rollup_rate:12,.0f} linhas/s  ({rollup_rate / plain_rate:.2f}x)")
+
+        with SensorQuery(rolled) as query:
+            device = query.device_id(DEVICE_NAMES[0])
+            since = int(time.time()) - span
+            since -= since % 3600
+            sql = (
+                "SELECT time - time % 3600, COUNT(level), MIN(level), MAX(level), AVG(level) "
+                "FROM sensor_readings WHERE device_id = ? AND time >= ? GROUP BY time - time % 3600"
+            )
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                raw = query.conn.execute(sql, (device, since)).fetchall()
+            raw_time = (time.perf_counter() - start) / args.repeat
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                hourly = query.rollup(device, "level", since, resolution="1h")
+            rollup_time = (time.perf_counter() - start) / args.repeat
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                daily = query.rollup(device, "level", since, resolution="1d")
+            daily_time = (time.perf_counter() - start) / args.repeat
+        assert len(raw) == len(hourly), f"{len(raw)} janelas nas leituras brutas, {len(hourly)} nos agregados"
+        print(f"Média horária (brutas):    {raw_time * 1e3:9.2f} ms  ({len(raw)} janelas)")
+        print(f"Média horária (rollup_1h): {rollup_time * 1e3:9.2f} ms  ({raw_time / rollup_time:.0f}x)")
+        print(f"Média diária (rollup_1d):  {daily_time * 1e3:9.2f} ms  ({len(daily)} janelas)")
+        for name in (plain, rolled):
+            print(f"{os.path.basename(name):<11} {os.path.getsize(name) / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark do motor de regras: leituras/segundo avaliadas por `RuleEngine`
+(regras de limite, média móvel, taxa de variação e mudança de estado) comparadas
+à vazão do `Decode`, e custo por leitura conforme o número de regras.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from sensorlog import Decode
+from sensorlog.rules import RuleEngine
+
+from .corpus import values_messages
+
+RULES = (
+    "rssi < -110 for 3",
+    "avg(t0, 10) > 40",
+    "rate(level, 6) > 5",
+    "rate(distance, 6) < -20",
+    "change(digital_input)",
+    "v0 < 3.3 for 5",
+    "avg(snr, 20) < -5",
+    "level > 95",
+)
+
+
+def best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = values_messages(args.messages)
+    decode_time = best_of(args.repeat, lambda: [Decode(message) for message in messages])
+    records = [Decode(message).var_data for message in messages]
+    print(f"Decode:           {len(messages) / decode_time:12,.0f} leituras/s")
+
+    for count in (1, 4, len(RULES)):
+        fired = 0
+
+        def run():
+            nonlocal fired
+            engine = RuleEngine(RULES[:count])
+            evaluate = engine.evaluate
+            for values in records:
+                evaluate(values)
+            fired = engine.fired
+
+        elapsed = best_of(args.repeat, run)
+        print(
+            f"{count} regra(s):        {len(records) / elapsed:12,.0f} leituras/s  "
+            f"({elapsed / len(records) * 1e6:.2f} µs/leitura, {fired:,} eventos)"
+        )
+
+
+if __name__ == "__main__":
+    main()
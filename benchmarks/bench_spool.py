@@ -0,0 +1,123 @@
+"""
+Benchmark do spool (`sensorlog.spool`):
+
+- vazão de gravação com `fsync` em lote (`sync_interval`), com `fsync` a cada
+  registro e com `append_many`, e a vazão de leitura de um consumidor;
+- tempo de `Pipeline.handle` com um destino lento (`--sink-delay` por registro):
+  com fila em memória (`block`), o recebimento passa a esperar o destino assim
+  que a fila enche; com spool, não.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sensorlog import Decode
+from sensorlog.pipeline import Pipeline, Sink
+from sensorlog.spool import Spool
+
+from .corpus import mixed_messages
+
+
+class SlowSink(Sink):
+    name = "slow"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+
+    def on_values(self, values):
+        time.sleep(self.delay)
+        self.received += 1
+
+    def on_event(self, event):
+        time.sleep(self.delay)
+        self.received += 1
+
+
+def append_rate(directory: str, records: list, sync_interval: float, batch: int = 0) -> tuple[float, float]:
+    """Registros/s e MiB/s gravados (incluindo o `fsync` final)."""
+    with Spool(directory, sync_interval=sync_interval) as spool:
+        start = time.perf_counter()
+        if batch:
+            for index in range(0, len(records), batch):
+                spool.append_many(records[index : index + batch])
+        else:
+            for record in records:
+                spool.append(record)
+        spool.sync()
+        elapsed = time.perf_counter() - start
+        size = spool.end - spool.start
+    return len(records) / elapsed, size / elapsed / 2**20
+
+
+def read_rate(directory: str) -> tuple[float, int]:
+    with Spool(directory) as spool:
+        cursor = spool.cursor("bench")
+        count = 0
+        start = time.perf_counter()
+        while True:
+            records = cursor.read(timeout=0)
+            if not records:
+                break
+            count += len(records)
+        return count / (time.perf_counter() - start), count
+
+
+def ingest(messages: list, pipeline: Pipeline) -> tuple[float, float]:
+    """Mensagens/s e p99 (µs) de `Pipeline.handle`."""
+    latencies = []
+    start = time.perf_counter()
+    for message in messages:
+        began = time.perf_counter()
+        pipeline.handle(message)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    return len(messages) / elapsed, statistics.quantiles(latencies, n=100)[98] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--fsync-records", type=int, default=2_000, help="Registros no caso com fsync a cada gravação")
+    parser.add_argument("--ingest", type=int, default=5_000, help="Mensagens no caso com destino lento")
+    parser.add_argument("--sink-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    messages = [message for _, message in mixed_messages(args.messages)]
+    records = [record for record in (Decode(message).var_data for message in messages) if record is not None]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (label, options, count) in enumerate(
+            (
+                ("append, fsync a cada 0,2 s", {"sync_interval": 0.2}, len(records)),
+                ("append_many (100), fsync em lote", {"sync_interval": 0.2, "batch": 100}, len(records)),
+                ("append, fsync a cada registro", {"sync_interval": 0}, args.fsync_records),
+            )
+        ):
+            path = os.path.join(directory, f"append-{index}")
+            rate, throughput = append_rate(path, records[:count], **options)
+            print(f"{label:34s} {rate:>12,.0f} registros/s  {throughput:7.1f} MiB/s")
+        rate, count = read_rate(os.path.join(directory, "append-0"))
+        print(f"{'leitura (SpoolCursor.read)':34s} {rate:>12,.0f} registros/s  ({count:,} registros)")
+
+        sample = messages[: args.ingest]
+        for label, spool in (
+            ("fila em memória (1000)", None),
+            ("spool", Spool(os.path.join(directory, "ingest"))),
+        ):
+            pipeline = Pipeline(spool=spool)
+            sink = pipeline.register(SlowSink(args.sink_delay), queue_size=1000)
+            rate, p99 = ingest(sample, pipeline)
+            print(f"handle, destino lento, {label:24s} {rate:>10,.0f} msg/s  p99 {p99:10.1f} µs")
+            began = time.perf_counter()
+            pipeline.close()
+            print(f"  entrega dos pendentes no close: {time.perf_counter() - began:.1f}s ({sink.received:,} registros)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de gravação: linhas/segundo do caminho anterior (uma conexão e um
+commit por linha) contra o `SQLiteWriter` em lote.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from sensorlog import Decode
+from sensorlog.storage import SQLiteWriter, create_tables
+
+from .corpus import values_messages
+
+
+def sensor_row(values) -> dict:
+    return {
+        "time": values.time,
+        "timezone_offset": values.timezone_offset.total_seconds(),
+        "channel_id": values.channel_id,
+        "channel_name": values.channel_name,
+        "bot_name": values.bot_name,
+        "device_name": values.device_name,
+        "level": values.level,
+        "raw_level": values.raw_level,
+        "distance": values.distance,
+        "t0": values.t0,
+        "t1": values.t1,
+        "v0": values.v0,
+        "v1": values.v1,
+        "snr": values.snr,
+        "rssi": values.rssi,
+        "snr_gw": values.snr_gw,
+        "rssi_gw": values.rssi_gw,
+        "counter": values.counter,
+        "digital_input": values.digital_input,
+    }
+
+
+def per_row_insert(db_name: str, table: str, data: dict):
+    """Reprodução do `insert_into_db` anterior."""
+    conn = sqlite3.connect(db_name)
+    columns = ", ".join(data.keys())
+    placeholders = ", ".join("?" * len(data))
+    conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", tuple(data.values()))
+    conn.commit()
+    conn.close()
+
+
+def new_database(directory: str, name: str) -> str:
+    db_name = os.path.join(directory, name)
+    conn = sqlite3.connect(db_name)
+    create_tables(conn)
+    conn.close()
+    return db_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--legacy-rows", type=int, default=2_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = [sensor_row(Decode(message).var_data) for message in values_messages(args.rows)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = new_database(directory, "legacy.db")
+        start = time.perf_counter()
+        for data in rows[: args.legacy_rows]:
+            per_row_insert(db_name, "sensor_values", data)
+        legacy_rate = args.legacy_rows / (time.perf_counter() - start)
+
+        db_name = new_database(directory, "writer.db")
+        writer = SQLiteWriter(db_name, batch_size=args.batch_size)
+        start = time.perf_counter()
+        for data in rows:
+            writer.insert("sensor_values", data)
+        enqueue_elapsed = time.perf_counter() - start
+        writer.flush()
+        writer_rate = len(rows) / (time.perf_counter() - start)
+        writer.close()
+
+        conn = sqlite3.connect(db_name)
+        stored = conn.execute("SELECT COUNT(*) FROM sensor_values").fetchone()[0]
+        conn.close()
+        assert stored == len(rows), f"esperado {len(rows)} linhas, gravadas {stored}"
+
+    print(f"Uma transação por linha: {legacy_rate:12,.0f} linhas/s")
+    print(f"SQLiteWriter (lote):     {writer_rate:12,.0f} linhas/s  ({writer_rate / legacy_rate:.1f}x)")
+    print(f"Custo no chamador:       {enqueue_elapsed / len(rows) * 1e6:12.1f} us/linha")
+
+
+if __name__ == "__main__":
+    main()
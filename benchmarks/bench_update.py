@@ -0,0 +1,83 @@
+"""
+Custo por atualização da Bot API até o `Values`/`Events`: `types.Update.de_json`
+(o caminho do polling com o `telebot`), `types.Message.de_json` do
+`channel_post`, e `Decode.from_dict`/`Decode.from_json`, que leem só as chaves
+usadas pelo decodificador.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from telebot import types
+
+from sensorlog import Decode
+
+from .corpus import DEVICE_NAMES, MIX, message_json
+
+
+def recorded_bodies(count: int, seed: int = 42) -> list[bytes]:
+    """Corpos de POST de webhook (`Update` em JSON) com as categorias de `MIX`."""
+    rnd = random.Random(seed)
+    names = [name for name, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    generators = {name: generator for name, _, generator in MIX}
+    bodies = []
+    for index in range(count):
+        text = generators[rnd.choices(names, weights)[0]](rnd, rnd.choice(DEVICE_NAMES))
+        update = {"update_id": index, "channel_post": message_json(text, index)}
+        bodies.append(json.dumps(update, ensure_ascii=False).encode())
+    return bodies
+
+
+def via_update(bodies):
+    for body in bodies:
+        Decode(types.Update.de_json(json.loads(body)).channel_post)
+
+
+def via_message(bodies):
+    for body in bodies:
+        Decode(types.Message.de_json(json.loads(body)["channel_post"]))
+
+
+def via_from_dict(bodies):
+    for body in bodies:
+        Decode.from_dict(json.loads(body))
+
+
+def via_from_json(bodies):
+    for body in bodies:
+        Decode.from_json(body)
+
+
+def best_of(repeat: int, function, bodies) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(bodies)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bodies = recorded_bodies(args.updates)
+    for name, function in (
+        ("Update.de_json", via_update),
+        ("Message.de_json", via_message),
+        ("Decode.from_dict", via_from_dict),
+        ("Decode.from_json", via_from_json),
+    ):
+        elapsed = best_of(args.repeat, function, bodies)
+        print(f"{name:18s} {elapsed / len(bodies) * 1e6:6.2f} µs/atualização  {len(bodies) / elapsed:>10,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Custo de criação e memória por leitura: `Values` montado pelo construtor
+(propriedades + `setattr` por campo, como o `Decode` fazia) contra
+`Values.from_parsed`, com o horário guardado como época e materializado
+apenas quando lido.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from sensorlog import Decode, SetValues
+from sensorlog.core import _VALUE_FIELDS
+
+from .corpus import values_messages
+
+
+def parsed_rows(count: int) -> list[tuple]:
+    """Saída do parser (identificação + 15 campos), pronta para construir os objetos."""
+    rows = []
+    for message in values_messages(count):
+        values = Decode(message).var_data
+        fields = [getattr(values, field) for field in _VALUE_FIELDS]
+        identification = (values.channel_id, values.channel_name, values.message_id, values.bot_name, values.device_name)
+        rows.append((message.date, *identification, fields))
+    return rows
+
+
+def build_setattr(rows):
+    result = []
+    for date, channel_id, channel_name, message_id, bot_name, device_name, fields in rows:
+        values = SetValues(
+            device_name=device_name,
+            time=date,
+            channel_id=channel_id,
+            channel_name=channel_name,
+            message_id=message_id,
+            bot_name=bot_name,
+        )
+        for field, value in zip(_VALUE_FIELDS, fields):
+            setattr(values, field, value)
+        values.time  # o construtor antigo sempre criava o datetime
+        result.append(values)
+    return result
+
+
+def build_from_parsed(rows):
+    from_parsed = SetValues.from_parsed
+    return [from_parsed(*row) for row in rows]
+
+
+def best_of(repeat: int, function, rows) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained(function, rows) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(rows)
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return size / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = parsed_rows(args.records)
+    for name, function in (("construtor + setattr", build_setattr), ("Values.from_parsed", build_from_parsed)):
+        elapsed = best_of(args.repeat, function, rows)
+        print(
+            f"{name:22s} {elapsed / len(rows) * 1e6:6.2f} µs/objeto  "
+            f"{retained(function, rows):6.0f} bytes/objeto"
+        )
+
+
+if __name__ == "__main__":
+    main()
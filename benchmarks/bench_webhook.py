@@ -0,0 +1,194 @@
+"""
+Latência do modo webhook: sobe o `http_server.py` com o uvicorn (com 1 ou mais
+workers) e um CallMeBot falso, e envia a `POST /telegram/webhook` atualizações
+gravadas a partir do corpus (`corpus.MIX`), como o Telegram faria, com várias
+conexões simultâneas. Cada evento usa um dispositivo próprio, para que o
+alerta correspondente seja identificado ao chegar ao CallMeBot falso.
+
+Mede o tempo até a confirmação (200) de cada atualização e o tempo entre o
+envio de um evento e a chegada do alerta:
+
+    python -m benchmarks.bench_webhook --workers 1,4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from sensorlog.schema import create_schema
+from sensorlog.webhook import SECRET_HEADER
+
+from .corpus import DEVICE_NAMES, MIX, message_json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = "bench-webhook"
+PROBE = re.compile(r"Sonda (\d+)")
+
+
+class FakeCallMeBot(ThreadingHTTPServer):
+    """Registra o instante (`perf_counter`) em que chega o alerta de cada sonda."""
+
+    def __init__(self):
+        self.arrivals: dict[int, float] = {}
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+    def received(self, text: str):
+        now = time.perf_counter()
+        with self.lock:
+            for probe in PROBE.findall(text):
+                self.arrivals.setdefault(int(probe), now)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        for text in parse_qs(urlparse(self.path).query).get("text", []):
+            self.server.received(text)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def recorded_updates(count: int, seed: int = 42) -> tuple[list[dict], set[int]]:
+    """Atualizações no formato da Bot API e os `update_id` que devem gerar alerta."""
+    rnd = random.Random(seed)
+    names = [name for name, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    generators = {name: generator for name, _, generator in MIX}
+    date = int(time.time()) - count
+    updates = []
+    probes = set()
+    for index in range(count):
+        name = rnd.choices(names, weights)[0]
+        if name == "event":
+            device_name = f"Sonda {index:06d}"
+            probes.add(index)
+        else:
+            device_name = rnd.choice(DEVICE_NAMES)
+        text = generators[name](rnd, device_name)
+        updates.append({"update_id": index, "channel_post": message_json(text, index, date)})
+    return updates, probes
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, db_name: str, callmebot_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DB_NAME": db_name,
+        "STATE_SNAPSHOT": "",
+        "RULES": "",
+        "WEBHOOK_SECRET": SECRET,
+        "WEBHOOK_SINKS": "sqlite,whatsapp",
+        "CALLMEBOT_URL": callmebot_url,
+        "ALERT_DEBOUNCE": "0",
+        "ALERT_RATE": "1000000",
+        "ALERT_BURST": "1000000",
+    }
+    command = [sys.executable, "-c", f"import http_server; http_server.serve('127.0.0.1', {port}, {workers}, 'warning')"]
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1).ok:
+                return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("o http_server.py não respondeu")
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run(workers: int, updates: list[dict], probes: set[int], concurrency: int, wait: float) -> dict:
+    fake = FakeCallMeBot()
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "webhook.db")
+        with sqlite3.connect(db_name) as conn:
+            create_schema(conn)
+        server = start_server(port, workers, db_name, f"http://127.0.0.1:{fake.server_address[1]}/")
+        url = f"http://127.0.0.1:{port}/telegram/webhook"
+        local = threading.local()
+        sent: dict[int, float] = {}
+
+        def post(update: dict) -> float:
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            start = time.perf_counter()
+            sent[update["update_id"]] = start
+            response = session.post(url, json=update, headers={SECRET_HEADER: SECRET}, timeout=10)
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                acks = sorted(pool.map(post, updates))
+            elapsed = time.perf_counter() - start
+            deadline = time.monotonic() + wait
+            while len(fake.arrivals) < len(probes) and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            server.terminate()
+            server.wait(30)
+            fake.shutdown()
+            fake.server_close()
+
+    alerts = sorted(fake.arrivals[probe] - sent[probe] for probe in probes if probe in fake.arrivals)
+    return {
+        "updates_per_second": len(updates) / elapsed,
+        "ack_p50_ms": percentile(acks, 0.50) * 1e3,
+        "ack_p99_ms": percentile(acks, 0.99) * 1e3,
+        "alerts": f"{len(alerts)}/{len(probes)}",
+        "alert_p50_ms": percentile(alerts, 0.50) * 1e3 if alerts else float("nan"),
+        "alert_p99_ms": percentile(alerts, 0.99) * 1e3 if alerts else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=5_000)
+    parser.add_argument("--workers", default="1,4", help="Quantidades de workers do uvicorn, separadas por vírgula")
+    parser.add_argument("--concurrency", type=int, default=4, help="Conexões simultâneas (o Telegram usa até 40)")
+    parser.add_argument("--wait", type=float, default=10.0, help="Espera máxima pelos alertas, em segundos")
+    args = parser.parse_args()
+
+    updates, probes = recorded_updates(args.updates)
+    print(f"{len(updates)} atualizações, {len(probes)} eventos, {args.concurrency} conexões")
+    for workers in (int(value) for value in args.workers.split(",")):
+        result = run(workers, updates, probes, args.concurrency, args.wait)
+        print(
+            f"{workers} worker(s): {result['updates_per_second']:7.0f} atualizações/s  "
+            f"confirmação p50 {result['ack_p50_ms']:5.1f} ms p99 {result['ack_p99_ms']:6.1f} ms  "
+            f"alertas {result['alerts']} p50 {result['alert_p50_ms']:5.1f} ms p99 {result['alert_p99_ms']:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
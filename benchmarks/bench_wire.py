@@ -0,0 +1,67 @@
+"""
+Benchmark de serialização: tamanho e custo de CPU do formato binário
+(`sensorlog.wire`) contra o JSON enviado por `http_post.py` (`Values.to_json`)
+e contra o dicionário montado por registro da versão anterior.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from sensorlog import Decode, wire
+from sensorlog.forwarder import JsonCodec
+
+from .bench_sqlite import sensor_row
+from .corpus import values_messages
+
+
+def json_payload(values) -> dict:
+    """Dicionário montado campo a campo, como `http_post.py` fazia antes de `Values.to_json`."""
+    data = sensor_row(values)
+    data["time"] = values.time.timestamp()
+    return data
+
+
+def best_of(repeat: int, function) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = [Decode(message).var_data for message in values_messages(args.records)]
+    count = len(records)
+
+    encoders = (
+        ("JSON dict", lambda: json.dumps([json_payload(values) for values in records], ensure_ascii=False).encode()),
+        ("JSON", lambda: JsonCodec.encode(records)),
+        ("binário", lambda: wire.BinaryCodec.encode(records)),
+    )
+    decoders = {
+        "JSON dict": json.loads,
+        "JSON": json.loads,
+        "binário": lambda body: [wire.decode_dict(frame) for frame in wire.iter_frames(body)],
+    }
+
+    print(f"{'':10}{'bytes/registro':>16}{'codificação':>18}{'decodificação':>18}")
+    for name, encoder in encoders:
+        body = encoder()
+        encode_time = best_of(args.repeat, encoder)
+        decode_time = best_of(args.repeat, lambda: decoders[name](body))
+        print(
+            f"{name:10}{len(body) / count:16.1f}"
+            f"{encode_time / count * 1e6:15.2f} us{decode_time / count * 1e6:15.2f} us"
+        )
+
+if __name__ == "__main__":
+    main()
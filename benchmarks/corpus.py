@@ -0,0 +1,165 @@
+"""
+Gerador de mensagens sintéticas no formato publicado pelos sensores sensor.log.
+
+`values_messages` produz apenas leituras completas; `mixed_messages` reproduz o
+tráfego de um canal real, com leituras parciais, eventos de cada flag e
+mensagens malformadas (veja `MIX`).
+"""
+
+from __future__ import annotations
+
+import random
+
+from telebot import types
+
+from sensorlog.core import _TRANSLATE, EVENT_SYMBOLS
+
+DEVICE_NAMES = ("Reservatório 01", "Poço Artesiano", "Caixa Bloco B", "Cisterna", "Rio Jacuí")
+
+VALUE_LINES = (
+    ("Nível", "{:.1f} %", lambda rnd: rnd.uniform(0, 100)),
+    ("Nível*", "{:.1f} %", lambda rnd: rnd.uniform(0, 100)),
+    ("Dist₍₀₎", "{:.0f} cm", lambda rnd: rnd.uniform(10, 400)),
+    ("T0", "{:.1f} °C", lambda rnd: rnd.uniform(-5, 45)),
+    ("T1", "{:.1f} °C", lambda rnd: rnd.uniform(-5, 45)),
+    ("V0", "{:.2f} V", lambda rnd: rnd.uniform(3.0, 4.2)),
+    ("V1", "{:.2f} V", lambda rnd: rnd.uniform(11.0, 14.0)),
+    ("SNR", "{:.0f} dB", lambda rnd: rnd.uniform(-20, 12)),
+    ("RSSI", "{:.0f} dBm", lambda rnd: rnd.uniform(-130, -40)),
+    ("SNR(gw)", "{:.0f} dB", lambda rnd: rnd.uniform(-20, 12)),
+    ("RSSI(gw)", "{:.0f} dBm", lambda rnd: rnd.uniform(-130, -40)),
+    ("Δd/Δt₍₋₁₎", "{:.0f} cm/h", lambda rnd: rnd.uniform(-30, 30)),
+    ("Δd/Δt₍₋₂₎", "{:.0f} cm/h", lambda rnd: rnd.uniform(-30, 30)),
+    ("Contador", "{:.0f}", lambda rnd: rnd.uniform(0, 100000)),
+)
+
+
+DIGITAL_LINE = ("Entrada Digital", ("Aberta", "Fechada", "1", "0"))
+
+# Todas as chaves de `SetValues` precisam aparecer no corpus.
+assert {key for key, _, _ in VALUE_LINES} | {DIGITAL_LINE[0]} == set(_TRANSLATE), "corpus desatualizado"
+
+EVENT_LINES = (
+    ("Nível baixo", "Nível alto", "Nível normalizado"),
+    ("Falha de comunicação", "Comunicação normalizada"),
+)
+
+
+def values_text(rnd: random.Random, device_name: str) -> str:
+    lines = [f'\U0001F4DF Nome: "{device_name}"']
+    for key, fmt, generator in VALUE_LINES:
+        lines.append(f"{key}: {fmt.format(generator(rnd))}")
+    lines.append(f"{DIGITAL_LINE[0]}: {rnd.choice(DIGITAL_LINE[1][:2])}")
+    return "\n".join(lines)
+
+
+def partial_values_text(rnd: random.Random, device_name: str) -> str:
+    """Leitura com um subconjunto aleatório dos campos, como a de sensores mais simples."""
+    lines = [f'\U0001F4DF Nome: "{device_name}"']
+    for key, fmt, generator in rnd.sample(VALUE_LINES, rnd.randint(1, len(VALUE_LINES))):
+        lines.append(f"{key}: {fmt.format(generator(rnd))}")
+    if rnd.random() < 0.5:
+        lines.append(f"{DIGITAL_LINE[0]}: {rnd.choice(DIGITAL_LINE[1])}")
+    return "\n".join(lines)
+
+
+def event_text(rnd: random.Random, device_name: str) -> str:
+    flags = rnd.choice(EVENT_SYMBOLS) + (rnd.choice(EVENT_SYMBOLS) if rnd.random() < 0.3 else "")
+    return f"{device_name}: {flags}\n{rnd.choice(rnd.choice(EVENT_LINES))}"
+
+
+def malformed_text(rnd: random.Random, device_name: str) -> str:
+    """Mensagens que o decodificador deve ignorar ou aceitar parcialmente."""
+    kind = rnd.randrange(8)
+    if kind == 0:
+        return ""
+    if kind == 1:
+        return "Bom dia! Manutenção programada no gateway às 14h."
+    if kind == 2:
+        # Campos com valores que o conversor não aceita.
+        return f'\U0001F4DF Nome: "{device_name}"\nNível: -- %\nRSSI: n/d\nEntrada Digital: indefinida'
+    if kind == 3:
+        # Chaves desconhecidas misturadas às conhecidas.
+        return f'\U0001F4DF Nome: "{device_name}"\nFirmware: 2.4.1\nBateria: ok\nT0: 21.5 °C'
+    if kind == 4:
+        # Quebras de linha do Windows.
+        return values_text(rnd, device_name).replace("\n", "\r\n")
+    if kind == 5:
+        # Evento sem símbolo de flag.
+        return f"{device_name}: atenção\nNível baixo"
+    if kind == 6:
+        # Evento com tipo desconhecido.
+        return f"{device_name}: {rnd.choice(EVENT_SYMBOLS)}\nPorta aberta"
+    # Cabeçalho sem aspas e mensagem truncada.
+    return f"\U0001F4DF Nome: {device_name}\nNível: 4"
+
+
+def message_json(text: str, message_id: int, date: int = 1_700_000_000) -> dict:
+    """Postagem de canal como vem da Bot API (o `channel_post` de um `Update`)."""
+    return {
+        "message_id": message_id,
+        "date": date + message_id,
+        "chat": {"id": -1001234567890, "type": "channel", "title": "SensorLog Demo"},
+        "author_signature": "SensorLogBot",
+        "text": text,
+    }
+
+
+def make_message(text: str, message_id: int, date: int = 1_700_000_000) -> types.Message:
+    return types.Message.de_json(message_json(text, message_id, date))
+
+
+def values_messages(count: int, seed: int = 42) -> list[types.Message]:
+    rnd = random.Random(seed)
+    return [make_message(values_text(rnd, rnd.choice(DEVICE_NAMES)), index) for index in range(count)]
+
+
+# Proporção aproximada de cada tipo de mensagem em um canal real.
+MIX = (
+    ("values", 0.70, values_text),
+    ("partial", 0.12, partial_values_text),
+    ("event", 0.12, event_text),
+    ("malformed", 0.06, malformed_text),
+)
+
+
+def mixed_messages(count: int, seed: int = 42) -> list[tuple[str, types.Message]]:
+    """Retorna `(categoria, mensagem)` com as categorias de `MIX`, sempre na mesma ordem para a mesma semente."""
+    rnd = random.Random(seed)
+    names = [name for name, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    generators = {name: generator for name, _, generator in MIX}
+    result = []
+    for index in range(count):
+        name = rnd.choices(names, weights)[0]
+        result.append((name, make_message(generators[name](rnd, rnd.choice(DEVICE_NAMES)), index)))
+    return result
+
+
+def write_export(path: str, count: int, seed: int = 42, channel_id: int = 1234567890):
+    """Grava uma exportação sintética no formato `result.json` do Telegram Desktop."""
+    import json
+
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(
+            json.dumps({"name": "SensorLog Demo", "type": "public_channel", "id": channel_id}, ensure_ascii=False)[:-1]
+        )
+        file.write(',\n "messages": [\n')
+        for index in range(1, count + 1):
+            message = {
+                "id": index,
+                "type": "message",
+                "date": "2023-11-14T22:13:20",
+                "date_unixtime": str(1_700_000_000 + index),
+                "from": "SensorLog Demo",
+                "from_id": f"channel{channel_id}",
+                "author": "SensorLogBot",
+                "text": values_text(rnd, rnd.choice(DEVICE_NAMES)),
+            }
+            if index % 50 == 0:
+                message["text"] = [{"type": "plain", "text": f"{rnd.choice(DEVICE_NAMES)}: ⚠⬇"}, "\nNível baixo"]
+            if index % 97 == 0:
+                del message["author"]
+            file.write(("" if index == 1 else ",\n") + json.dumps(message, ensure_ascii=False))
+        file.write("\n ]\n}\n")
@@ -0,0 +1,109 @@
+"""
+Verificação de `backfill.py`: o caminho sequencial e o paralelo (`--processes`)
+precisam gravar as mesmas linhas e contar as mesmas mensagens.
+
+A exportação sintética inclui mensagens de exportações antigas, só com `date`
+(sem `date_unixtime`), e mensagens sem data alguma, que devem ser contadas como
+`undated` e nunca gravadas com o horário da importação. Cada caminho importa a
+exportação em um banco novo e é conferido contra o esperado; qualquer diferença
+encerra com código 1:
+
+    python -m benchmarks.regress_backfill
+    python -m benchmarks.regress_backfill --messages 50000 --processes 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import backfill
+from sensorlog.export import filter_exported_message
+from sensorlog.schema import create_schema
+
+from .corpus import write_export
+
+
+def with_old_dates(path: str, every: int) -> tuple[set[int], set[int]]:
+    """
+    Regrava a exportação tirando `date_unixtime` de uma a cada `every` mensagens, e
+    também `date` da metade delas. Retorna os ids só com `date` e os ids sem data
+    (entre as mensagens aceitas pelo filtro).
+    """
+    with open(path, encoding="utf-8") as file:
+        export = json.load(file)
+    iso_only, undated = set(), set()
+    for index, message in enumerate(export["messages"]):
+        if index % every or not filter_exported_message(message):
+            continue
+        message["date"] = datetime.fromtimestamp(int(message.pop("date_unixtime"))).isoformat()
+        if index % (2 * every):
+            iso_only.add(message["id"])
+        else:
+            del message["date"]
+            undated.add(message["id"])
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(export, file, ensure_ascii=False, indent=1)
+    return iso_only, undated
+
+
+def run(path: str, db_name: str, processes: int) -> tuple[dict, list[tuple]]:
+    conn = sqlite3.connect(db_name)
+    create_schema(conn)
+    conn.close()
+    counters = backfill.backfill(path, db_name, 1000, 3600.0, processes)
+    counters.pop("seconds")
+    conn = sqlite3.connect(db_name)
+    rows = conn.execute("SELECT time, message_id, level FROM sensor_readings ORDER BY message_id").fetchall()
+    conn.close()
+    return counters, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--every", type=int, default=37, help="Uma a cada N mensagens perde `date_unixtime`")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    failures = []
+    started = int(time.time())
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "result.json")
+        write_export(path, args.messages)
+        iso_only, undated = with_old_dates(path, args.every)
+        results = {}
+        for processes in (1, args.processes):
+            counters, rows = results[processes] = run(path, os.path.join(directory, f"{processes}.db"), processes)
+            label = f"{processes} processo(s)"
+            print(f"{label}: {counters}")
+            if counters["undated"] != len(undated):
+                failures.append(f"{label}: {counters['undated']} sem data, esperado {len(undated)}")
+            stored = {message_id for _, message_id, _ in rows}
+            if stored & undated:
+                failures.append(f"{label}: mensagens sem data gravadas (ex.: {sorted(stored & undated)[:5]})")
+            if not stored & iso_only:
+                failures.append(f"{label}: nenhuma mensagem só com `date` foi gravada")
+            late = [message_id for time_, message_id, _ in rows if time_ >= started]
+            if late:
+                failures.append(f"{label}: {len(late)} leituras com o horário da importação (ex.: {late[:5]})")
+        if results[1] != results[args.processes]:
+            failures.append("caminho sequencial e paralelo divergem")
+    if failures:
+        print("FALHA:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Suíte de regressão do decodificador.
+
+Decodifica um corpus realista (`corpus.mixed_messages`: leituras completas e
+parciais com todas as chaves de `SetValues`, eventos com cada flag de
+`EVENT_SYMBOLS` e mensagens malformadas) e verifica:
+
+- a saída: a impressão digital dos registros decodificados deve ser igual à da
+  linha de base, e o corpus precisa exercitar todos os campos e flags;
+- a vazão (mensagens/segundo, no total e por categoria);
+- a latência por mensagem (p50 e p99);
+- as alocações (blocos e bytes retidos por registro e pico transitório, via
+  `tracemalloc`).
+
+Os números são comparados a `baselines/decode.json`; uma regressão acima da
+tolerância encerra com código 1. Depois de uma mudança intencional na saída ou
+ao trocar de máquina, regrave a linha de base com `--update`:
+
+    python -m benchmarks.regress_decode
+    python -m benchmarks.regress_decode --update
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from sensorlog import Decode, Events, Values
+from sensorlog.core import _VALUE_FIELDS, EVENT_SYMBOLS
+
+from .corpus import MIX, mixed_messages
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "decode.json")
+
+# Regressão tolerada em relação à linha de base: (métrica, direção, fração).
+# Tempos variam mais entre execuções que alocações, que são quase determinísticas.
+LIMITS = (
+    ("messages_per_second", "higher", 0.20),
+    ("p50_us", "lower", 0.50),
+    ("p99_us", "lower", 0.50),
+    ("blocks_per_message", "lower", 0.05),
+    ("bytes_per_message", "lower", 0.10),
+    ("peak_bytes", "lower", 0.25),
+)
+
+
+def fingerprint(record) -> list:
+    """Representação canônica (independente do fuso da máquina) de um registro decodificado."""
+    if record is None:
+        return [None]
+    head = [
+        type(record).__name__,
+        record.time.timestamp(),
+        record.channel_id,
+        record.channel_name,
+        record.message_id,
+        record.bot_name,
+        record.device_name,
+    ]
+    if isinstance(record, Events):
+        return head + [record.type, record.flag, record.text]
+    return head + [getattr(record, field) for field in _VALUE_FIELDS]
+
+
+def digest(records) -> str:
+    data = json.dumps([fingerprint(record) for record in records], ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def check_coverage(records) -> list[str]:
+    """Campos e flags que o corpus deixou de exercitar."""
+    fields = set()
+    flags = set()
+    ignored = 0
+    for record in records:
+        if record is None:
+            ignored += 1
+        elif isinstance(record, Values):
+            fields.update(field for field in _VALUE_FIELDS if getattr(record, field) is not None)
+        else:
+            flags.update(record.flag)
+    missing = [f"campo {field}" for field in _VALUE_FIELDS if field not in fields]
+    missing += [f"flag {flag}" for flag in EVENT_SYMBOLS if flag not in flags]
+    if not ignored:
+        missing.append("mensagens ignoradas")
+    return missing
+
+
+def throughput(messages, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            Decode(message)
+        best = min(best, time.perf_counter() - start)
+    return len(messages) / best
+
+
+def latency(messages, repeat: int) -> tuple[float, float]:
+    """p50 e p99 (µs) por mensagem; de cada percentil, vale a melhor rodada."""
+    clock = time.perf_counter_ns
+    p50 = p99 = float("inf")
+    for _ in range(repeat):
+        samples = []
+        append = samples.append
+        for message in messages:
+            start = clock()
+            Decode(message)
+            append(clock() - start)
+        samples.sort()
+        p50 = min(p50, samples[len(samples) // 2] / 1e3)
+        p99 = min(p99, samples[int(len(samples) * 0.99)] / 1e3)
+    return p50, p99
+
+
+def allocations(messages) -> tuple[float, float, int]:
+    """Blocos e bytes retidos por registro decodificado e pico transitório de uma decodificação."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        records = [Decode(message).var_data for message in messages]
+        after = tracemalloc.take_snapshot()
+        stats = after.compare_to(before, "filename")
+        blocks = sum(stat.count_diff for stat in stats)
+        size = sum(stat.size_diff for stat in stats)
+        del records
+
+        peak = 0
+        for message in messages:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            Decode(message)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return blocks / len(messages), size / len(messages), peak
+
+
+def measure(pairs, repeat: int) -> dict:
+    messages = [message for _, message in pairs]
+    records = [Decode(message).var_data for message in messages]
+    p50, p99 = latency(messages, repeat)
+    blocks, size, peak = allocations(messages)
+    by_category = {}
+    for name, _, _ in MIX:
+        subset = [message for category, message in pairs if category == name]
+        by_category[name] = round(throughput(subset, repeat))
+    return {
+        "digest": digest(records),
+        "missing": check_coverage(records),
+        "metrics": {
+            "messages_per_second": round(throughput(messages, repeat)),
+            "p50_us": round(p50, 2),
+            "p99_us": round(p99, 2),
+            "blocks_per_message": round(blocks, 2),
+            "bytes_per_message": round(size, 1),
+            "peak_bytes": peak,
+        },
+        "by_category": by_category,
+    }
+
+
+def compare(current: dict, baseline: dict, scale: float) -> list[str]:
+    failures = []
+    for name, direction, fraction in LIMITS:
+        expected = baseline["metrics"].get(name)
+        if not expected:
+            continue
+        value = current["metrics"][name]
+        limit = fraction * scale
+        if direction == "higher" and value < expected * (1 - limit):
+            failures.append(f"{name}: {value:,} < {expected:,} (-{limit:.0%})")
+        elif direction == "lower" and value > expected * (1 + limit):
+            failures.append(f"{name}: {value:,} > {expected:,} (+{limit:.0%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update", action="store_true", help="Grava os resultados como nova linha de base")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.0,
+        help="Multiplica as tolerâncias de LIMITS (ex.: 2 em máquinas ruidosas)",
+    )
+    args = parser.parse_args()
+
+    pairs = mixed_messages(args.messages, args.seed)
+    current = measure(pairs, args.repeat)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if (baseline["messages"], baseline["seed"]) != (args.messages, args.seed):
+            print(
+                f"Linha de base gravada com outro corpus "
+                f"({baseline['messages']} mensagens, semente {baseline['seed']})"
+            )
+            baseline = None
+
+    for name, value in current["metrics"].items():
+        reference = f"  (linha de base {baseline['metrics'][name]:,})" if baseline else ""
+        print(f"{name:22s} {value:>14,}{reference}")
+    for name, value in current["by_category"].items():
+        print(f"  {name:20s} {value:>14,} msg/s")
+
+    failures = [f"corpus não exercita: {', '.join(current['missing'])}"] if current["missing"] else []
+    if args.update:
+        if failures:
+            print(failures[0])
+            sys.exit(1)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(
+                {"messages": args.messages, "seed": args.seed, "python": sys.version.split()[0], **current},
+                file,
+                indent=2,
+                ensure_ascii=False,
+            )
+            file.write("\n")
+        print(f"Linha de base gravada em {args.baseline}")
+        return
+    if baseline is None:
+        print("Sem linha de base para comparar; execute com --update")
+        sys.exit(1)
+
+    if current["digest"] != baseline["digest"]:
+        failures.append("a saída decodificada mudou (use --update se a mudança for intencional)")
+    failures += compare(current, baseline, args.tolerance)
+    if failures:
+        print("REGRESSÃO:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
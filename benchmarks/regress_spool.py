@@ -0,0 +1,164 @@
+"""
+Verificação de recuperação do spool após queda do processo.
+
+Um processo filho grava leituras numeradas no spool (`message_id` sequencial) e
+anuncia cada uma no stdout assim que `append` retorna; uma thread do filho faz
+o papel de destino, anotando os ids entregues em um arquivo antes de confirmar
+o offset. O filho é encerrado com SIGKILL em um momento aleatório e um quadro
+incompleto é acrescentado ao fim do último segmento, como uma escrita
+interrompida. Ao reabrir o spool, todo id anunciado precisa estar entre os já
+entregues ou entre os registros após o offset confirmado, em ordem. Qualquer
+perda encerra com código 1:
+
+    python -m benchmarks.regress_spool
+    python -m benchmarks.regress_spool --rounds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from sensorlog.core import Values, _VALUE_FIELDS
+from sensorlog.spool import Spool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONSUMER = "sink"
+DELIVERED = "delivered.log"
+SEGMENT_SIZE = 256 * 2**10
+
+
+def reading(message_id: int) -> Values:
+    return Values.from_parsed(
+        1_700_000_000 + message_id,
+        -1001234567890,
+        "Canal de testes",
+        message_id,
+        "sensorlog",
+        "Reservatório 01",
+        [float(message_id)] + [None] * (len(_VALUE_FIELDS) - 1),
+        timedelta(0),
+    )
+
+
+def child(directory: str, first: int):
+    """Grava leituras a partir de `first` até ser encerrado; uma thread consome o spool."""
+    spool = Spool(directory, segment_size=SEGMENT_SIZE, sync_interval=0.05)
+    cursor = spool.cursor(CONSUMER)
+
+    def consume():
+        with open(os.path.join(directory, DELIVERED), "a", encoding="utf-8") as log:
+            while True:
+                records = cursor.read(timeout=0.1)
+                if records:
+                    log.write("".join(f"{item.record.message_id}\n" for item in records))
+                    log.flush()
+                    cursor.commit()
+
+    threading.Thread(target=consume, daemon=True).start()
+    message_id = first
+    while True:
+        spool.append(reading(message_id))
+        sys.stdout.write(f"{message_id}\n")
+        sys.stdout.flush()
+        message_id += 1
+
+
+def crash(directory: str, first: int, rnd: random.Random) -> set[int]:
+    """Executa o filho, encerra-o com SIGKILL e retorna os ids anunciados."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.regress_spool", "--child", directory, "--first", str(first)],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    acknowledged: set[int] = set()
+    reader = threading.Thread(target=lambda: acknowledged.update(int(line) for line in process.stdout))
+    reader.start()
+    time.sleep(rnd.uniform(0.3, 1.5))
+    process.send_signal(signal.SIGKILL)
+    process.wait()
+    reader.join()
+    segments = sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+    with open(os.path.join(directory, segments[-1]), "ab") as file:
+        # Cabeçalho de um quadro de 200 bytes seguido de apenas parte do conteúdo.
+        file.write(bytes([200, 0, 0, 0]) + os.urandom(rnd.randint(0, 60)))
+    return acknowledged
+
+
+def check(directory: str, acknowledged: set[int]) -> tuple[list[str], int, int]:
+    """Falhas encontradas, ids pendentes no spool e o maior id gravado."""
+    path = os.path.join(directory, DELIVERED)
+    with open(path, encoding="utf-8") as log:
+        text = log.read()
+    if not text.endswith("\n"):
+        # Linha interrompida pelo SIGKILL: o id não chegou a ser confirmado no offset.
+        text = text[: text.rfind("\n") + 1]
+        with open(path, "w", encoding="utf-8") as log:
+            log.write(text)
+    delivered = {int(line) for line in text.splitlines()}
+    pending = []
+    with Spool(directory, segment_size=SEGMENT_SIZE) as spool:
+        cursor = spool.cursor(CONSUMER)
+        while True:
+            records = cursor.read(timeout=0)
+            if not records:
+                break
+            pending.extend(item.record.message_id for item in records)
+    failures = []
+    lost = acknowledged - delivered - set(pending)
+    if lost:
+        failures.append(f"{len(lost)} registros anunciados perdidos (ex.: {sorted(lost)[:5]})")
+    if pending != sorted(pending) or len(set(pending)) != len(pending):
+        failures.append("registros pendentes fora de ordem ou repetidos")
+    if pending and delivered and pending[0] > max(delivered) + 1:
+        failures.append(f"lacuna entre o último entregue ({max(delivered)}) e o primeiro pendente ({pending[0]})")
+    last = max([*acknowledged, *delivered, *pending], default=0)
+    return failures, len(pending), last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--first", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.first)
+        return
+
+    rnd = random.Random(args.seed)
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        acknowledged: set[int] = set()
+        first = 1
+        for round_number in range(1, args.rounds + 1):
+            acknowledged |= crash(directory, first, rnd)
+            round_failures, pending, last = check(directory, acknowledged)
+            segments = len([name for name in os.listdir(directory) if name.endswith(".seg")])
+            print(
+                f"Rodada {round_number}: {len(acknowledged):>9,} anunciados, {pending:>7,} pendentes, "
+                f"{segments} segmentos"
+            )
+            failures.extend(f"rodada {round_number}: {failure}" for failure in round_failures)
+            first = last + 1
+    if failures:
+        print("FALHA:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
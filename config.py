@@ -18,9 +18,34 @@ class Settings:
     telegram_token: str = _env("TELEGRAM_TOKEN", "SEU_TOKEN_AQUI")
     event_url: str = _env("EVENT_URL", "http://localhost:9001/events")
     values_url: str = _env("VALUES_URL", "http://localhost:9001/values")
+    event_bulk_url: str = _env("EVENT_BULK_URL", "")
+    values_bulk_url: str = _env("VALUES_BULK_URL", "")
+    http_workers: int = int(_env("HTTP_WORKERS", "4"))
+    http_format: str = _env("HTTP_FORMAT", "json")
     db_name: str = _env("DB_NAME", "sensordata.db")
+    db_partitioned: bool = _env("DB_PARTITIONED", "0") == "1"
+    db_rollups: bool = _env("DB_ROLLUPS", "1") == "1"
+    raw_retention_days: int = int(_env("RAW_RETENTION_DAYS", "0"))
+    minute_retention_days: int = int(_env("MINUTE_RETENTION_DAYS", "0"))
     callmebot_api_key: str = _env("CALLMEBOT_API_KEY", "SEU_API_KEY_CALLMEBOT")
     callmebot_phone: str = _env("CALLMEBOT_PHONE", "SEU_NUMERO_TELEFONE")
+    callmebot_url: str = _env("CALLMEBOT_URL", "https://api.callmebot.com/whatsapp.php")
+    alert_rate: float = float(_env("ALERT_RATE", "10"))
+    alert_burst: int = int(_env("ALERT_BURST", "3"))
+    alert_debounce: float = float(_env("ALERT_DEBOUNCE", "30"))
+    workers: int = int(_env("WORKERS", "4"))
+    state_snapshot: str = _env("STATE_SNAPSHOT", "")
+    state_snapshot_interval: float = float(_env("STATE_SNAPSHOT_INTERVAL", "60"))
+    dedup_dir: str = _env("DEDUP_DIR", ".dedup")
+    rules: str = _env("RULES", "")
+    metrics_port: int = int(_env("METRICS_PORT", "0"))
+    sinks: str = _env("SINKS", "console,http,sqlite,whatsapp")
+    webhook_url: str = _env("WEBHOOK_URL", "")
+    webhook_secret: str = _env("WEBHOOK_SECRET", "")
+    webhook_sinks: str = _env("WEBHOOK_SINKS", "sqlite,state")
+    server_workers: int = int(_env("SERVER_WORKERS", "1"))
+    spool_dir: str = _env("SPOOL_DIR", "")
+    spool_sync_interval: float = float(_env("SPOOL_SYNC_INTERVAL", "0.2"))
 
 
 settings = Settings()
@@ -1,33 +1,360 @@
 """
 SensorLog-TelegramBot
 
-Este script recebe os dados enviados por http_post.py.
+Este script recebe os dados enviados por http_post.py e, opcionalmente, as
+atualizações do Telegram por webhook (`POST /telegram/webhook`), como
+alternativa ao long polling dos demais scripts.
 """
 
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 import logging
+import os
+
+from sensorlog import Events, Values, metrics, wire
+from sensorlog.dedup import Deduplicator
+from sensorlog.jsonstream import JsonRecordStream
+from sensorlog.pipeline import DROP_OLDEST, Pipeline
+from sensorlog.rules import RuleEngine
+from sensorlog.spool import Spool
+from sensorlog.sinks import ConsoleSink, SQLiteSink, StateSink, WhatsAppSink
+from sensorlog.state import DeviceStateCache
+from sensorlog.storage import SQLiteWriter
+from sensorlog.webhook import SECRET_HEADER, WebhookReceiver, set_webhook
+from config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+MAX_REPORTED_ERRORS = 10
+
+INGESTED = metrics.counter("sensorlog_ingest_records_total", "Registros recebidos pela API.", ("path", "result"))
+
+
+class IdRecord(BaseModel):
+    time: float
+    timezone_offset: float = 0
+    channel_id: Optional[int] = None
+    channel_name: Optional[str] = None
+    message_id: Optional[int] = None
+    bot_name: Optional[str] = None
+    device_name: str
+
+
+class EventRecord(IdRecord):
+    type: int
+    flag: str = ""
+    text: str
+
+
+class ValuesRecord(IdRecord):
+    level: Optional[float] = None
+    raw_level: Optional[float] = None
+    distance: Optional[float] = None
+    t0: Optional[float] = None
+    t1: Optional[float] = None
+    v0: Optional[float] = None
+    v1: Optional[float] = None
+    snr: Optional[int] = None
+    rssi: Optional[int] = None
+    snr_gw: Optional[int] = None
+    rssi_gw: Optional[int] = None
+    speed1: Optional[int] = None
+    speed2: Optional[int] = None
+    counter: Optional[int] = None
+    digital_input: Optional[int] = None
+
+
+# Mesmas colunas, na mesma ordem, de `Events.as_tuple()`/`Values.as_tuple()`.
+EVENT_COLUMNS = Events.COLUMNS
+VALUES_COLUMNS = Values.COLUMNS
+# Campos de leitura (sem os de identificação) mantidos no estado dos dispositivos.
+STATE_FIELDS = tuple(name for name in ValuesRecord.model_fields if name not in IdRecord.model_fields)
+
+
+def remember_values(devices: Optional[DeviceStateCache], item: ValuesRecord):
+    if devices is None:
+        return
+    devices.update_values(
+        item.time,
+        item.channel_id,
+        item.channel_name,
+        item.device_name,
+        item.bot_name,
+        {field: getattr(item, field) for field in STATE_FIELDS},
+    )
+
+
+def remember_event(devices: Optional[DeviceStateCache], item: EventRecord):
+    if devices is None:
+        return
+    devices.update_event(
+        item.time, item.channel_id, item.channel_name, item.device_name, item.bot_name, item.type, item.flag, item.text
+    )
+
+
+def server_workers() -> int:
+    """
+    Quantidade de workers do uvicorn. `serve` a publica no ambiente, que é lido aqui
+    (e não em `settings`, criado na importação de `config`) tanto neste processo
+    quanto nos processos filhos.
+    """
+    return int(os.environ.get("SERVER_WORKERS", settings.server_workers))
+
+
+def webhook_pipeline(writer: SQLiteWriter, devices: Optional[DeviceStateCache]) -> Pipeline:
+    """
+    Destinos das mensagens recebidas por webhook (`WEBHOOK_SINKS`). O SQLite e o
+    estado dos dispositivos são os mesmos usados pelas rotas `/events` e `/values`.
+
+    Com `SPOOL_DIR`, as atualizações aceitas são gravadas no spool antes da
+    resposta ao Telegram. O spool e o estado dos dispositivos (`devices` é `None`
+    com vários workers) não podem ser compartilhados entre processos, então só
+    são usados com `SERVER_WORKERS=1`.
+    """
+    spool = None
+    if settings.spool_dir and server_workers() > 1:
+        logger.warning("SPOOL_DIR ignorado: o spool exige SERVER_WORKERS=1")
+    elif settings.spool_dir:
+        spool = Spool(settings.spool_dir, sync_interval=settings.spool_sync_interval)
+    pipeline = Pipeline(rules=RuleEngine.parse(settings.rules) if settings.rules else None, spool=spool)
+    enabled = {name.strip() for name in settings.webhook_sinks.split(",") if name.strip()}
+    if "console" in enabled:
+        pipeline.register(ConsoleSink(), policy=DROP_OLDEST)
+    if "sqlite" in enabled:
+        pipeline.register(SQLiteSink(settings.db_name, writer=writer), queue_size=10_000)
+    if "state" in enabled and devices is None:
+        logger.warning("Destino state ignorado: o estado dos dispositivos exige SERVER_WORKERS=1")
+    elif "state" in enabled:
+        pipeline.register(StateSink(cache=devices), queue_size=10_000)
+    if "whatsapp" in enabled:
+        pipeline.register(
+            WhatsAppSink(
+                settings.callmebot_phone,
+                settings.callmebot_api_key,
+                settings.callmebot_url,
+                rate=settings.alert_rate / 60,
+                burst=settings.alert_burst,
+                debounce=settings.alert_debounce,
+            )
+        )
+    return pipeline
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.writer = SQLiteWriter(settings.db_name)
+    if server_workers() > 1:
+        # Cada processo veria só parte das leituras, e todos gravariam o mesmo snapshot.
+        if settings.state_snapshot:
+            logger.warning("STATE_SNAPSHOT ignorado: o estado dos dispositivos exige SERVER_WORKERS=1")
+        app.state.devices = None
+    else:
+        app.state.devices = DeviceStateCache.restore(settings.state_snapshot)
+        if settings.state_snapshot:
+            app.state.devices.start_snapshots(settings.state_snapshot, settings.state_snapshot_interval)
+    app.state.webhook = WebhookReceiver(
+        webhook_pipeline(app.state.writer, app.state.devices),
+        secret=settings.webhook_secret,
+        dedup=Deduplicator(),
+    )
+    try:
+        yield
+    finally:
+        app.state.webhook.pipeline.close()
+        logger.info(f"Estatísticas do webhook: {app.state.webhook.stats()}")
+        try:
+            app.state.writer.close()
+        except RuntimeError as e:
+            logger.error(f"Erro ao encerrar o SQLiteWriter: {e}")
+        if app.state.devices is not None:
+            app.state.devices.close(settings.state_snapshot or None)
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def count_ingested(path: str, accepted: int, rejected: int):
+    if accepted:
+        INGESTED.labels(path, "accepted").inc(accepted)
+    if rejected:
+        INGESTED.labels(path, "rejected").inc(rejected)
+
+
+async def ingest_bulk(
+    request: Request, model: type[BaseModel], table: str, columns: tuple, kind: int, remember
+) -> dict:
+    """
+    Lê NDJSON, um array JSON ou quadros `sensorlog.wire` (conforme o Content-Type)
+    do corpo da requisição, valida cada registro com `model`, enfileira os
+    válidos no `SQLiteWriter`, à medida que chegam, e atualiza o estado dos
+    dispositivos com `remember`. A leitura e a gravação de cada pedaço rodam em uma
+    thread do pool: com a fila do `SQLiteWriter` cheia, `write` espera sem parar o
+    loop de eventos.
+    """
+    writer: SQLiteWriter = request.app.state.writer
+    devices: Optional[DeviceStateCache] = request.app.state.devices
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    stream = wire.RecordStream(kind) if content_type == wire.CONTENT_TYPE else JsonRecordStream()
+    accepted = 0
+    errors = []
+    index = 0
+
+    def consume(records: list):
+        nonlocal accepted, index
+        for record in records:
+            try:
+                item = model.model_validate(record)
+            except ValidationError as e:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"index": index, "error": e.errors(include_url=False)})
+            else:
+                writer.write(table, columns, [getattr(item, column) for column in columns])
+                remember(devices, item)
+                accepted += 1
+            index += 1
+
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(lambda: consume(stream.feed(chunk)))
+        await run_in_threadpool(lambda: consume(stream.close()))
+    except ValueError as e:
+        logger.error("Corpo inválido em %s: %s", request.url.path, e)
+        count_ingested(request.url.path, accepted, index - accepted)
+        return {"success": False, "accepted": accepted, "rejected": index - accepted, "error": str(e)}
+
+    count_ingested(request.url.path, accepted, index - accepted)
+    logger.info("%s: %d registros aceitos, %d rejeitados", request.url.path, accepted, index - accepted)
+    return {"success": not errors, "accepted": accepted, "rejected": index - accepted, "errors": errors}
 
 
 @app.post("/events")
 async def receive_event(request: Request):
     data = await request.json()
-    logger.info("Evento recebido: %s", data)
+    logger.debug("Evento recebido: %s", data)
+    try:
+        remember_event(request.app.state.devices, EventRecord.model_validate(data))
+    except ValidationError as e:
+        count_ingested(request.url.path, 0, 1)
+        logger.error(f"Erro ao atualizar o estado do dispositivo: {e}")
+    else:
+        count_ingested(request.url.path, 1, 0)
     return {"success": True}
 
 
 @app.post("/values")
 async def receive_values(request: Request):
     data = await request.json()
-    logger.info("Valores recebidos: %s", data)
+    logger.debug("Valores recebidos: %s", data)
+    try:
+        remember_values(request.app.state.devices, ValuesRecord.model_validate(data))
+    except ValidationError as e:
+        count_ingested(request.url.path, 0, 1)
+        logger.error(f"Erro ao atualizar o estado do dispositivo: {e}")
+    else:
+        count_ingested(request.url.path, 1, 0)
     return {"success": True}
 
 
-if __name__ == "__main__":
+@app.post("/events/bulk")
+async def receive_events_bulk(request: Request):
+    return await ingest_bulk(request, EventRecord, "events", EVENT_COLUMNS, wire.KIND_EVENT, remember_event)
+
+
+@app.post("/values/bulk")
+async def receive_values_bulk(request: Request):
+    return await ingest_bulk(request, ValuesRecord, "sensor_values", VALUES_COLUMNS, wire.KIND_VALUES, remember_values)
+
+
+@app.post("/telegram/webhook")
+async def telegram_webhook(request: Request):
+    """
+    Recebe um `Update` do Telegram. A mensagem é decodificada e entregue às filas
+    dos destinos antes da resposta (em uma thread do pool, sem ocupar o loop de
+    eventos), mas sem esperar pela gravação; atualizações
+    ignoradas ou inválidas também são confirmadas, para que o Telegram não as
+    reenvie.
+    """
+    receiver: WebhookReceiver = request.app.state.webhook
+    if not receiver.authorized(request.headers.get(SECRET_HEADER)):
+        raise HTTPException(status_code=403, detail="Token secreto inválido")
+    try:
+        update = await request.json()
+    except ValueError as e:
+        update = None
+        logger.error(f"Erro ao ler a atualização do webhook: {e}")
+    # Fora do loop de eventos: com a fila de um destino cheia (política `block`) ou
+    # durante a gravação no spool, `accept` espera, e as demais rotas não podem parar.
+    result = await run_in_threadpool(receiver.accept, update)
+    logger.debug("Atualização do webhook: %s", result)
+    return {"ok": True}
+
+
+@app.get("/devices/latest")
+async def devices_latest(request: Request, device_name: Optional[str] = None, channel_id: Optional[int] = None):
+    """
+    Estado mais recente dos dispositivos, servido da memória (sem acessar o SQLite).
+
+    Sem parâmetros, retorna a lista de todos os dispositivos; com `device_name`
+    (e, opcionalmente, `channel_id`), apenas o dispositivo pedido. Disponível apenas
+    com `SERVER_WORKERS=1` (503 com vários workers).
+    """
+    devices: Optional[DeviceStateCache] = request.app.state.devices
+    if devices is None:
+        raise HTTPException(status_code=503, detail="Estado dos dispositivos indisponível com SERVER_WORKERS > 1")
+    if device_name is None:
+        return Response(content=devices.to_json(), media_type="application/json")
+    state = devices.get(device_name, channel_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Dispositivo não encontrado")
+    return state.as_dict()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas no formato texto do Prometheus (`sensorlog.metrics`)."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def serve(host: str = "0.0.0.0", port: int = 9001, workers: int = 1, log_level: str = "info"):
+    """
+    Executa o servidor com o uvicorn. Com vários workers, cada processo tem seu
+    próprio pipeline e limite de alertas; o estado dos dispositivos (`/devices/latest`,
+    `STATE_SNAPSHOT`, destino `state`) e o spool ficam desativados.
+
+    O socket compartilhado pelos workers é criado aqui com `IPPROTO_TCP`: o que o
+    uvicorn cria tem `proto` 0, e o asyncio só ativa `TCP_NODELAY` nas conexões
+    aceitas quando `proto` é TCP. Sem isso, o corpo de cada resposta espera o ACK
+    atrasado do cliente (~40 ms por requisição).
+    """
+    import socket
+
     import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    # O uvicorn importa `http_server:app` de novo (e cada worker, em um processo novo);
+    # o ambiente é o que chega a todos eles (veja `server_workers`).
+    os.environ["SERVER_WORKERS"] = str(workers)
+    config = uvicorn.Config("http_server:app", host=host, port=port, workers=workers, log_level=log_level)
+    server = uvicorn.Server(config)
+    if workers <= 1:
+        server.run()
+        return
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    Multiprocess(config, target=server.run, sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    from telebot import TeleBot
 
-    uvicorn.run(app, host="0.0.0.0", port=9001)
+    if settings.webhook_url:
+        set_webhook(TeleBot(token=settings.telegram_token), settings.webhook_url, settings.webhook_secret)
+        logger.info(f"Webhook registrado em {settings.webhook_url}")
+    serve(workers=settings.server_workers)
@@ -0,0 +1,58 @@
+"""
+SensorLog-TelegramBot
+
+Este script converte um banco criado pelo `create_db.py` original (tabelas
+`events` e `sensor_values` sem índices) para o esquema versionado de
+`sensorlog.schema`.
+
+Uso:
+    python3 migrate_db.py [sensordata.db] [--partitioned] [--drop-legacy]
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+from sensorlog.schema import migrate
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte o banco SQLite para o esquema versionado.")
+    parser.add_argument("db", nargs="?", default=settings.db_name, help="Banco SQLite a converter")
+    parser.add_argument(
+        "--partitioned",
+        action="store_true",
+        default=settings.db_partitioned,
+        help="Grava as leituras em uma tabela por mês",
+    )
+    parser.add_argument(
+        "--drop-legacy",
+        action="store_true",
+        help="Remove as tabelas originais em vez de mantê-las como legacy_*",
+    )
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    start = time.perf_counter()
+    try:
+        report = migrate(conn, partitioned=args.partitioned, drop_legacy=args.drop_legacy)
+    except Exception as e:
+        logger.error(f"Erro ao migrar o banco de dados: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+    for table in ("sensor_values", "events"):
+        if table in report:
+            logger.info(f"{table}: {report[table]['copied']:,} linhas copiadas, {report[table]['skipped']:,} ignoradas")
+    logger.info(
+        f"Banco '{args.db}' na versão {report['to_version']} "
+        f"(era {report['from_version']}) em {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+SensorLog-TelegramBot
+
+Este script alimenta vários destinos (console, HTTP, SQLite e WhatsApp) a partir
+de um único bot: cada mensagem é decodificada uma vez e distribuída para os
+destinos habilitados em `SINKS`.
+"""
+
+import logging
+from telebot import TeleBot
+from sensorlog import filter_direct_channel_text_signed, metrics
+from sensorlog.dedup import Deduplicator
+from sensorlog.forwarder import JsonCodec
+from sensorlog.pipeline import DROP_OLDEST, Pipeline
+from sensorlog.rules import RuleEngine
+from sensorlog.runner import Runner
+from sensorlog.spool import Spool
+from sensorlog.sinks import ConsoleSink, HttpSink, SQLiteSink, WhatsAppSink
+from sensorlog.wire import BinaryCodec
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+bot = TeleBot(token=settings.telegram_token)
+pipeline = Pipeline(
+    rules=RuleEngine.parse(settings.rules) if settings.rules else None,
+    spool=Spool(settings.spool_dir, sync_interval=settings.spool_sync_interval) if settings.spool_dir else None,
+)
+enabled = {name.strip() for name in settings.sinks.split(",") if name.strip()}
+
+if "console" in enabled:
+    pipeline.register(ConsoleSink(), policy=DROP_OLDEST)
+if "http" in enabled:
+    pipeline.register(
+        HttpSink(
+            settings.event_url,
+            settings.values_url,
+            settings.event_bulk_url,
+            settings.values_bulk_url,
+            workers=settings.http_workers,
+            codec=BinaryCodec if settings.http_format == "binary" else JsonCodec,
+        )
+    )
+if "sqlite" in enabled:
+    pipeline.register(SQLiteSink(settings.db_name))
+if "whatsapp" in enabled:
+    pipeline.register(
+        WhatsAppSink(
+            settings.callmebot_phone,
+            settings.callmebot_api_key,
+            settings.callmebot_url,
+            rate=settings.alert_rate / 60,
+            burst=settings.alert_burst,
+            debounce=settings.alert_debounce,
+        )
+    )
+
+runner = Runner(
+    bot,
+    pipeline.handle,
+    func=filter_direct_channel_text_signed,
+    workers=settings.workers,
+    dedup=Deduplicator.for_consumer(settings.dedup_dir, "multi_sink"),
+)
+
+if settings.metrics_port:
+    metrics.serve(settings.metrics_port)
+
+logger.info(f"Bot iniciado com os destinos {sorted(enabled)}. Aguardando mensagens do canal")
+try:
+    runner.infinity_polling(skip_pending=False)
+finally:
+    pipeline.close()
+    logger.info(f"Estatísticas dos destinos: {pipeline.stats()}")
@@ -0,0 +1,66 @@
+"""
+SensorLog-TelegramBot
+
+Este script administra os agregados de `sensorlog.rollup` (janelas de 1 minuto,
+1 hora e 1 dia) de um banco no esquema versionado.
+
+Uso:
+    python3 rollup_db.py create [--raw-retention 90] [--minute-retention 30]
+    python3 rollup_db.py rebuild [--since 2024-01-01]
+    python3 rollup_db.py prune
+"""
+
+import argparse
+import logging
+import sqlite3
+from datetime import datetime
+from sensorlog.rollup import ROLLUP_FIELDS, Rollups, create_rollups, rebuild
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Administra os agregados do banco SQLite.")
+    parser.add_argument("command", choices=("create", "rebuild", "prune"))
+    parser.add_argument("--db", default=settings.db_name, help="Banco SQLite")
+    parser.add_argument("--fields", default=",".join(ROLLUP_FIELDS), help="Campos agregados (create)")
+    parser.add_argument(
+        "--raw-retention",
+        type=int,
+        default=settings.raw_retention_days,
+        help="Dias de leituras brutas mantidos; 0 mantém todas (create)",
+    )
+    parser.add_argument(
+        "--minute-retention",
+        type=int,
+        default=settings.minute_retention_days,
+        help="Dias de agregados de 1 minuto mantidos; 0 mantém todos (create)",
+    )
+    parser.add_argument("--since", help="Data (AAAA-MM-DD) a partir da qual reconstruir (rebuild)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "create":
+            fields = [field.strip() for field in args.fields.split(",") if field.strip()]
+            create_rollups(conn, fields, args.raw_retention, args.minute_retention)
+        elif args.command == "rebuild":
+            since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+            logger.info(f"{rebuild(conn, since):,} janelas de 1 minuto gravadas")
+        else:
+            rollups = Rollups.load(conn)
+            if rollups is None:
+                logger.error("Agregados não configurados; execute 'rollup_db.py create'")
+                raise SystemExit(1)
+            rollups.prune(conn)
+    except (ValueError, sqlite3.Error) as e:
+        logger.error(f"Erro ao processar os agregados: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,64 @@
 """
 SensorLog-TelegramBot
+
+Os nomes do pacote são carregados sob demanda (`__getattr__`): `import sensorlog`
+não importa nenhum submódulo, e `from sensorlog import Decode` carrega apenas
+`sensorlog.core`. Processos curtos e workers pagam só pelo que usam; o tempo de
+importação é acompanhado por `python -m benchmarks.bench_import`.
 """
 
 from __future__ import annotations
 
 import sys
+from importlib import import_module
 from types import ModuleType
+from typing import TYPE_CHECKING
 
-from .core import (
-    Decode,
-    Events,
-    Values,
-    SetValues,
-    Id,
-    EVENT_LEVEL,
-    EVENT_COMMUNICATION,
-    EVENT_UNKNOWN,
-    SYMBOL_CHECK,
-    SYMBOL_WARNING,
-    SYMBOL_DOWN_ARROW,
-    SYMBOL_UP_ARROW,
-)
+if TYPE_CHECKING:
+    from .core import (
+        Decode,
+        Events,
+        Values,
+        SetValues,
+        Id,
+        EVENT_LEVEL,
+        EVENT_COMMUNICATION,
+        EVENT_RULE,
+        EVENT_UNKNOWN,
+        SYMBOL_CHECK,
+        SYMBOL_WARNING,
+        SYMBOL_DOWN_ARROW,
+        SYMBOL_UP_ARROW,
+        filter_direct_channel_text_signed,
+    )
+    from .batch import Batch, decode_batch
+    from .message import ChannelMessage
+
+# Nome exportado → submódulo que o define.
+_LAZY = {
+    **dict.fromkeys(
+        (
+            "Decode",
+            "Events",
+            "Values",
+            "SetValues",
+            "Id",
+            "EVENT_LEVEL",
+            "EVENT_COMMUNICATION",
+            "EVENT_RULE",
+            "EVENT_UNKNOWN",
+            "SYMBOL_CHECK",
+            "SYMBOL_WARNING",
+            "SYMBOL_DOWN_ARROW",
+            "SYMBOL_UP_ARROW",
+            "filter_direct_channel_text_signed",
+        ),
+        ".core",
+    ),
+    "Batch": ".batch",
+    "decode_batch": ".batch",
+    "ChannelMessage": ".message",
+}
 
 __all__ = [
     "Decode",
@@ -30,31 +68,63 @@ __all__ = [
     "Id",
     "EVENT_LEVEL",
     "EVENT_COMMUNICATION",
+    "EVENT_RULE",
     "EVENT_UNKNOWN",
+    "filter_direct_channel_text_signed",
+    "Batch",
+    "decode_batch",
+    "ChannelMessage",
 ]
 
 
-def _register_compat_module(name: str, attrs: dict):
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    # Acessos seguintes não passam mais por aqui.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY))
+
+
+def _register_compat_module(name: str, attrs: tuple[str, ...]):
+    """
+    Registra `sensorlog.<name>` (módulos da versão original do pacote) em
+    `sys.modules`. O conteúdo vem de `sensorlog.core` apenas no primeiro acesso.
+    """
     full_name = f"{__name__}.{name}"
     module = ModuleType(full_name)
-    module.__dict__.update(attrs)
+
+    def __getattr__(attr: str):
+        if attr not in attrs:
+            raise AttributeError(f"module {full_name!r} has no attribute {attr!r}")
+        value = getattr(import_module(".core", __name__), attr)
+        setattr(module, attr, value)
+        return value
+
+    module.__getattr__ = __getattr__
+    module.__all__ = list(attrs)
     sys.modules[full_name] = module
 
 
-_register_compat_module("Values", {"Values": Values})
-_register_compat_module("Events", {"Events": Events})
-_register_compat_module("Id", {"Id": Id})
-_register_compat_module("SetValues", {"SetValues": SetValues})
+_register_compat_module("Values", ("Values",))
+_register_compat_module("Events", ("Events",))
+_register_compat_module("Id", ("Id",))
+_register_compat_module("SetValues", ("SetValues",))
 _register_compat_module(
     "Post",
-    {
-        "Decode": Decode,
-        "EVENT_LEVEL": EVENT_LEVEL,
-        "EVENT_COMMUNICATION": EVENT_COMMUNICATION,
-        "EVENT_UNKNOWN": EVENT_UNKNOWN,
-        "SYMBOL_CHECK": SYMBOL_CHECK,
-        "SYMBOL_WARNING": SYMBOL_WARNING,
-        "SYMBOL_DOWN_ARROW": SYMBOL_DOWN_ARROW,
-        "SYMBOL_UP_ARROW": SYMBOL_UP_ARROW,
-    },
+    (
+        "Decode",
+        "EVENT_LEVEL",
+        "EVENT_COMMUNICATION",
+        "EVENT_UNKNOWN",
+        "SYMBOL_CHECK",
+        "SYMBOL_WARNING",
+        "SYMBOL_DOWN_ARROW",
+        "SYMBOL_UP_ARROW",
+    ),
 )
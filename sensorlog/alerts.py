@@ -0,0 +1,319 @@
+"""
+Envio de alertas com agrupamento e limite de taxa.
+
+`AlertDispatcher` recebe `Events` sem bloquear o handler e, em uma thread
+própria:
+
+- descarta eventos que não mudam a `flag` do dispositivo (por tipo de evento e,
+  nos eventos de regras, por regra), como vários "⚠️ comunicação" seguidos
+  enquanto o gateway continua fora;
+- envia de imediato o primeiro evento de uma rajada e agrupa os seguintes do
+  mesmo dispositivo em uma janela (`debounce`), enviando um único resumo quando
+  ela fecha;
+- respeita um balde de fichas (`TokenBucket`) para não ser bloqueado pelo
+  serviço de mensagens;
+- tenta novamente, com espera exponencial, os envios que falharem.
+
+O envio em si fica a cargo de um `AlertClient` (`CallMeBotClient` por padrão),
+que pode apontar para um servidor local de testes ou ser substituído.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import requests
+
+from . import metrics
+from .core import EVENT_RULE, Events
+from .rules import rule_of
+
+logger = logging.getLogger(__name__)
+
+ALERTS = metrics.counter("sensorlog_alerts_total", "Eventos e envios do AlertDispatcher, por resultado.", ("result",))
+
+CALLMEBOT_API_URL = "https://api.callmebot.com/whatsapp.php"
+
+# Eventos mais antigos que isto (por exemplo, após uma queda do bot) trazem a data completa.
+LATE_EVENT = timedelta(minutes=5)
+
+
+class TokenBucket:
+    """
+    Balde de fichas: até `burst` envios imediatos, repostos à taxa de `rate` por segundo.
+
+    Não é seguro para várias threads; `AlertDispatcher` o usa apenas em sua thread.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate deve ser positivo")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Segundos até a próxima ficha disponível (0 se já houver uma)."""
+        self._refill(time.monotonic())
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self) -> bool:
+        """Consome uma ficha, se houver."""
+        self._refill(time.monotonic())
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+class AlertClient:
+    """Destino dos alertas; `send` deve levantar uma exceção quando o envio falhar."""
+
+    def send(self, text: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CallMeBotClient(AlertClient):
+    """
+    Envia mensagens de WhatsApp pela API do CallMeBot.
+
+    Args:
+        phone (str): Número autorizado no CallMeBot.
+        api_key (str): Chave do CallMeBot.
+        url (str): Endereço da API (pode apontar para um servidor local de testes).
+        timeout (float): Tempo limite de cada requisição, em segundos.
+    """
+
+    def __init__(self, phone: str, api_key: str, url: str = CALLMEBOT_API_URL, timeout: float = 10):
+        self.phone = phone
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, text: str):
+        data = {"phone": self.phone, "apikey": self.api_key, "text": text}
+        # As exceções do `requests` trazem a URL completa; a chave não deve ir para o log.
+        try:
+            response = self.session.get(self.url, params=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ConnectionError(f"falha ao acessar o CallMeBot ({type(e).__name__})") from None
+        if not response.ok:
+            raise ConnectionError(f"CallMeBot respondeu {response.status_code}")
+        logger.debug("Resposta do CallMeBot: %s", response.status_code)
+
+    def close(self):
+        self.session.close()
+
+
+class _Window:
+    __slots__ = ("channel_name", "device_name", "events")
+
+    def __init__(self, channel_name: Optional[str], device_name: Optional[str]):
+        self.channel_name = channel_name
+        self.device_name = device_name
+        self.events: list[Events] = []
+
+
+def _stamp(event: Events, now: datetime) -> str:
+    return event.time.strftime("\n%d/%m/%Y %H:%M:%S") if now - event.time > LATE_EVENT else ""
+
+
+def format_digest(
+    channel_name: Optional[str], device_name: Optional[str], events: list[Events], max_lines: int = 10
+) -> str:
+    """
+    Texto do alerta: um evento isolado mantém o formato de `whatsapp.py`; vários
+    eventos viram um resumo com o horário, a `flag` e a descrição dos `max_lines`
+    mais recentes.
+    """
+    now = datetime.now()
+    if len(events) == 1:
+        event = events[0]
+        return f"*{channel_name}*\n{event.text}{_stamp(event, now)}"
+    first, last = events[0].time, events[-1].time
+    span = f"{first:%H:%M:%S}–{last:%H:%M:%S}"
+    if now - first > LATE_EVENT:
+        span = f"{first:%d/%m/%Y} {span}"
+    lines = [f"*{channel_name}*", f"*{device_name}*: {len(events)} eventos ({span})"]
+    if len(events) > max_lines:
+        lines.append(f"… {len(events) - max_lines} eventos anteriores")
+    for event in events[-max_lines:]:
+        description = event.text.split("\n", 1)[-1]
+        lines.append(f"{event.time:%H:%M:%S} {event.flag} {description}")
+    return "\n".join(lines)
+
+
+class AlertDispatcher:
+    """
+    Fila de alertas com agrupamento por dispositivo, limite de taxa e novas tentativas.
+
+    Args:
+        client (AlertClient): Destino das mensagens.
+        rate (float): Mensagens por segundo permitidas em regime (ex.: `10 / 60`).
+        burst (int): Mensagens que podem sair de imediato após um período ocioso.
+        debounce (float): Duração, em segundos, da janela que agrupa os eventos de um dispositivo
+            após o primeiro, que é enviado de imediato (0 envia cada evento assim que possível).
+        max_retries (int): Novas tentativas de um envio que falhou antes de descartá-lo.
+        retry_delay (float): Espera inicial entre tentativas, dobrada a cada falha (máximo de 5 min).
+        max_lines (int): Eventos listados em um resumo.
+    """
+
+    def __init__(
+        self,
+        client: AlertClient,
+        rate: float = 10 / 60,
+        burst: int = 3,
+        debounce: float = 30.0,
+        max_retries: int = 5,
+        retry_delay: float = 5.0,
+        max_lines: int = 10,
+    ):
+        self.client = client
+        self.bucket = TokenBucket(rate, burst)
+        self.debounce = debounce
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_lines = max_lines
+        self.counters = {"received": 0, "repeated": 0, "sent": 0, "merged": 0, "retries": 0, "failed": 0}
+        self._flags: dict[tuple, str] = {}
+        self._windows: dict[tuple, _Window] = {}
+        # Janelas abertas e mensagens prontas, ordenadas pelo horário (monotônico) de vencimento.
+        self._timers: list[tuple[float, int, tuple]] = []
+        self._outbox: list[tuple[float, int, str, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, event: Events) -> bool:
+        """
+        Enfileira um evento; retorna `False` se ele não altera a `flag` do dispositivo
+        (ou, para eventos de regras, a da regra que o gerou).
+        """
+        flag_key = (event.channel_id, event.device_name, event.type)
+        if event.type == EVENT_RULE:
+            flag_key += (rule_of(event),)
+        with self._condition:
+            self.counters["received"] += 1
+            ALERTS.labels("received").inc()
+            if self._flags.get(flag_key) == event.flag:
+                self.counters["repeated"] += 1
+                ALERTS.labels("repeated").inc()
+                return False
+            self._flags[flag_key] = event.flag
+            key = (event.channel_id, event.device_name)
+            window = self._windows.get(key)
+            if window is None:
+                # Primeiro evento da rajada: sai já; a janela reúne apenas os seguintes.
+                now = time.monotonic()
+                text = format_digest(event.channel_name, event.device_name, [event], self.max_lines)
+                heapq.heappush(self._outbox, (now, next(self._sequence), text, 0))
+                if self.debounce > 0:
+                    self._open_window(key, event.channel_name, event.device_name, now)
+                self._condition.notify()
+            else:
+                self.counters["merged"] += 1
+                ALERTS.labels("merged").inc()
+                window.events.append(event)
+        return True
+
+    def close(self, timeout: Optional[float] = 30.0):
+        """
+        Fecha as janelas abertas, tenta enviar o que estiver pendente por até `timeout`
+        segundos e encerra a thread.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        with self._condition:
+            pending = len(self._outbox) + sum(1 for window in self._windows.values() if window.events)
+        if pending:
+            logger.error(f"Erro ao encerrar o envio de alertas: {pending} mensagens não enviadas")
+        self.client.close()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {**self.counters, "pending": len(self._outbox), "windows": len(self._windows)}
+
+    def _open_window(self, key: tuple, channel_name: Optional[str], device_name: Optional[str], now: float):
+        self._windows[key] = _Window(channel_name, device_name)
+        heapq.heappush(self._timers, (now + self.debounce, next(self._sequence), key))
+
+    def _close_windows(self, now: float, everything: bool = False):
+        while self._timers and (everything or self._timers[0][0] <= now):
+            _, _, key = heapq.heappop(self._timers)
+            window = self._windows.pop(key)
+            if not window.events:
+                continue
+            text = format_digest(window.channel_name, window.device_name, window.events, self.max_lines)
+            heapq.heappush(self._outbox, (now, next(self._sequence), text, 0))
+            if not everything:
+                # A rajada continua: o próximo evento entra em uma nova janela, não sai sozinho.
+                self._open_window(key, window.channel_name, window.device_name, now)
+
+    def _next(self) -> Optional[tuple[str, int]]:
+        """Aguarda a próxima mensagem pronta para envio; `None` ao encerrar sem pendências."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._close_windows(now, everything=self._closing)
+                if self._outbox and self._outbox[0][0] <= now:
+                    _, _, text, attempt = heapq.heappop(self._outbox)
+                    return text, attempt
+                if self._closing and not self._outbox:
+                    return None
+                due = [queue[0][0] for queue in (self._timers, self._outbox) if queue]
+                self._condition.wait(min(due) - now if due else None)
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            text, attempt = item
+            while not self.bucket.take():
+                time.sleep(self.bucket.delay())
+            try:
+                self.client.send(text)
+                with self._condition:
+                    self.counters["sent"] += 1
+                    ALERTS.labels("sent").inc()
+            except Exception as e:
+                with self._condition:
+                    if attempt < self.max_retries:
+                        delay = min(self.retry_delay * 2**attempt, 300.0)
+                        self.counters["retries"] += 1
+                        ALERTS.labels("retries").inc()
+                        heapq.heappush(self._outbox, (time.monotonic() + delay, next(self._sequence), text, attempt + 1))
+                        logger.error(f"Erro ao enviar alerta: {e}; nova tentativa em {delay:g}s")
+                    else:
+                        self.counters["failed"] += 1
+                        ALERTS.labels("failed").inc()
+                        logger.error(f"Erro ao enviar alerta após {attempt + 1} tentativas: {e}")
+
+
+__all__ = [
+    "AlertClient",
+    "AlertDispatcher",
+    "CallMeBotClient",
+    "TokenBucket",
+    "format_digest",
+    "CALLMEBOT_API_URL",
+]
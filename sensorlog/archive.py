@@ -0,0 +1,394 @@
+"""
+Arquivo colunar do histórico de leituras: um arquivo por dispositivo e mês (UTC).
+
+Cada arquivo guarda a coluna `time` (segundos da época, `int64`) e uma coluna
+por campo de `_VALUE_FIELDS` (`float64`, NaN para campos ausentes, como em
+`sensorlog.batch`), todas little-endian e alinhadas em páginas de 4 KiB:
+
+    <raiz>/index.json                 dispositivos exportados
+    <raiz>/<device_id>/<AAAA-MM>.col  cabeçalho JSON (1ª página) + colunas
+
+O leitor mapeia o arquivo com `mmap` e devolve `memoryview`s de cada coluna,
+sem cópia: percorrer um campo lê apenas as páginas dessa coluna (mais algumas
+da coluna `time`, para a busca binária do intervalo). Os deslocamentos ficam no
+cabeçalho, portanto os arquivos também podem ser lidos com
+`numpy.memmap(caminho, "<f8", "r", offset, (rows,))` ou `numpy.frombuffer`.
+"""
+
+from __future__ import annotations
+
+import calendar
+import json
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import time as _time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+from .query import Device, SensorQuery
+from .schema import VALUE_FIELDS, to_epoch
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MAGIC = b"SLARCH\x00\x01"
+PAGE_SIZE = 4096
+INDEX_FILE = "index.json"
+SUFFIX = ".col"
+TIME_TYPE = "q"
+VALUE_TYPE = "d"
+
+_HEADER_LENGTH = struct.Struct("<I")
+_NAN = math.nan
+_NO_END = 2**62
+
+
+class Segment(NamedTuple):
+    """Leituras de um mês no intervalo pedido: `time` e `columns[campo]` são `memoryview`s sem cópia."""
+
+    time: memoryview
+    columns: dict[str, memoryview]
+
+
+def _align(offset: int) -> int:
+    return -(-offset // PAGE_SIZE) * PAGE_SIZE
+
+
+def month_bounds(epoch: int) -> tuple[int, int]:
+    """Intervalo `[início, fim)` (UTC) do mês que contém `epoch`."""
+    moment = _time.gmtime(epoch)
+    year, month = moment.tm_year, moment.tm_mon
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return calendar.timegm((year, month, 1, 0, 0, 0)), calendar.timegm((next_year, next_month, 1, 0, 0, 0))
+
+
+def month_name(epoch: int) -> str:
+    moment = _time.gmtime(epoch)
+    return f"{moment.tm_year:04d}-{moment.tm_mon:02d}"
+
+
+def write_month(path: str, device: Device, month: str, times: array, columns: dict[str, array]):
+    """
+    Grava um arquivo mensal (em um temporário, renomeado ao final).
+
+    Raises:
+        ValueError: Se as colunas não tiverem o mesmo tamanho de `times`.
+    """
+    rows = len(times)
+    layout = {"time": {"type": TIME_TYPE, "offset": PAGE_SIZE}}
+    offset = _align(PAGE_SIZE + rows * times.itemsize)
+    for name, column in columns.items():
+        if len(column) != rows:
+            raise ValueError(f"Coluna {name} com {len(column)} valores; esperados {rows}")
+        layout[name] = {"type": column.typecode, "offset": offset}
+        offset = _align(offset + rows * column.itemsize)
+    header = json.dumps(
+        {
+            "version": FORMAT_VERSION,
+            "device_id": device.id,
+            "device_name": device.name,
+            "channel_id": device.channel_id,
+            "channel_name": device.channel_name,
+            "month": month,
+            "rows": rows,
+            "columns": layout,
+        },
+        ensure_ascii=False,
+    ).encode()
+    if len(MAGIC) + _HEADER_LENGTH.size + len(header) > PAGE_SIZE:
+        raise ValueError(f"Cabeçalho de {len(header)} bytes não cabe em uma página")
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        for name, column in (("time", times), *columns.items()):
+            file.seek(layout[name]["offset"])
+            if sys.byteorder != "little":
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(file)
+        file.truncate(offset)
+    os.replace(temporary, path)
+
+
+class ColumnFile:
+    """
+    Um arquivo mensal mapeado em memória.
+
+    As colunas são `memoryview`s sobre o `mmap`; só as páginas da coluna pedida
+    são lidas do disco (`MADV_RANDOM` desliga a leitura antecipada do arquivo
+    inteiro). `close()` libera o mapeamento assim que não
+    houver mais `memoryview`s em uso.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise ValueError("Arquivos colunares exigem uma máquina little-endian")
+        self.path = path
+        with open(path, "rb") as file:
+            head = file.read(PAGE_SIZE)
+            if head[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} não é um arquivo colunar do sensorlog")
+            (length,) = _HEADER_LENGTH.unpack_from(head, len(MAGIC))
+            start = len(MAGIC) + _HEADER_LENGTH.size
+            self.header = json.loads(head[start : start + length])
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self.header["rows"] else None
+        if self._mmap is not None and hasattr(mmap, "MADV_RANDOM"):
+            # Sem leitura antecipada: as colunas vizinhas não são trazidas junto.
+            self._mmap.madvise(mmap.MADV_RANDOM)
+        self.rows: int = self.header["rows"]
+        self.month: str = self.header["month"]
+        self.fields = tuple(name for name in self.header["columns"] if name != "time")
+        self._views: dict[str, memoryview] = {}
+
+    def column(self, name: str) -> memoryview:
+        """Coluna `name` inteira, sem cópia."""
+        view = self._views.get(name)
+        if view is None:
+            spec = self.header["columns"].get(name)
+            if spec is None:
+                raise KeyError(name)
+            if self._mmap is None:
+                view = memoryview(array(spec["type"]))
+            else:
+                length = self.rows * array(spec["type"]).itemsize
+                if hasattr(mmap, "MADV_WILLNEED"):
+                    self._mmap.madvise(mmap.MADV_WILLNEED, spec["offset"], length)
+                view = memoryview(self._mmap)[spec["offset"] : spec["offset"] + length].cast(spec["type"])
+            self._views[name] = view
+        return view
+
+    @property
+    def time(self) -> memoryview:
+        return self.column("time")
+
+    def span(self, start: Optional[int] = None, end: Optional[int] = None) -> tuple[int, int]:
+        """Índices `[lo, hi)` das leituras em `[start, end)` (busca binária na coluna `time`)."""
+        times = self.time
+        lo = bisect_left(times, start) if start is not None else 0
+        hi = bisect_left(times, end, lo) if end is not None else self.rows
+        return lo, hi
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Ainda há fatias em uso; o mapeamento é liberado junto com elas.
+                pass
+
+    def __enter__(self) -> ColumnFile:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Archive:
+    """
+    Leitura de um arquivo colunar criado por `export_archive`.
+
+    Dispositivos podem ser informados pelo `id` ou pelo nome (com `channel_id`
+    quando o nome se repete entre canais), como em `SensorQuery`; horários, como
+    `datetime` ou segundos desde a época.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._files: dict[str, ColumnFile] = {}
+
+    def devices(self) -> list[Device]:
+        return [Device(**entry) for entry in _load_index(self.root).values()]
+
+    def device_id(self, device: int | str, channel_id: Optional[int] = None) -> int:
+        """
+        Resolve o `id` de um dispositivo.
+
+        Raises:
+            KeyError: Se o dispositivo não existir.
+            ValueError: Se o nome existir em mais de um canal e `channel_id` não for informado.
+        """
+        if isinstance(device, int):
+            return device
+        found = [
+            entry.id
+            for entry in self.devices()
+            if entry.name == device and (channel_id is None or entry.channel_id == channel_id)
+        ]
+        if not found:
+            raise KeyError(device)
+        if len(found) > 1:
+            raise ValueError(f"Dispositivo '{device}' existe em {len(found)} canais; informe channel_id")
+        return found[0]
+
+    def months(self, device: int | str, channel_id: Optional[int] = None) -> list[str]:
+        """Meses (`AAAA-MM`) arquivados do dispositivo, em ordem."""
+        directory = os.path.join(self.root, str(self.device_id(device, channel_id)))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[: -len(SUFFIX)] for name in os.listdir(directory) if name.endswith(SUFFIX))
+
+    def open(self, device: int | str, month: str, channel_id: Optional[int] = None) -> ColumnFile:
+        """Arquivo de um mês, mantido aberto até `close()`."""
+        path = os.path.join(self.root, str(self.device_id(device, channel_id)), month + SUFFIX)
+        column_file = self._files.get(path)
+        if column_file is None:
+            column_file = self._files[path] = ColumnFile(path)
+        return column_file
+
+    def range(
+        self,
+        device: int | str,
+        start: datetime | float,
+        end: Optional[datetime | float] = None,
+        fields: Sequence[str] = VALUE_FIELDS,
+        channel_id: Optional[int] = None,
+    ) -> list[Segment]:
+        """Leituras de `device` em `[start, end)`, um `Segment` por mês, em ordem de horário."""
+        unknown = set(fields) - set(VALUE_FIELDS)
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+        device_id = self.device_id(device, channel_id)
+        start = to_epoch(start)
+        end = to_epoch(end) if end is not None else _NO_END
+        first, last = month_name(start), month_name(min(end, 2**40) - 1)
+        segments = []
+        for month in self.months(device_id):
+            if not first <= month <= last:
+                continue
+            column_file = self.open(device_id, month)
+            lo, hi = column_file.span(start, end)
+            if lo < hi:
+                segments.append(
+                    Segment(column_file.time[lo:hi], {field: column_file.column(field)[lo:hi] for field in fields})
+                )
+        return segments
+
+    def column(
+        self,
+        device: int | str,
+        field: str,
+        start: datetime | float,
+        end: Optional[datetime | float] = None,
+        channel_id: Optional[int] = None,
+    ) -> list[memoryview]:
+        """Apenas os valores de `field` em `[start, end)`, um `memoryview` por mês."""
+        return [segment.columns[field] for segment in self.range(device, start, end, (field,), channel_id)]
+
+    def close(self):
+        for column_file in self._files.values():
+            column_file.close()
+        self._files.clear()
+
+    def __enter__(self) -> Archive:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _load_index(root: str) -> dict[str, dict]:
+    try:
+        with open(os.path.join(root, INDEX_FILE), encoding="utf-8") as file:
+            return json.load(file)["devices"]
+    except FileNotFoundError:
+        return {}
+
+
+def _save_index(root: str, devices: dict[str, dict]):
+    path = os.path.join(root, INDEX_FILE)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump({"version": FORMAT_VERSION, "devices": devices}, file, ensure_ascii=False, indent=1)
+    os.replace(temporary, path)
+
+
+def _month_columns(rows: list[tuple], fields: Sequence[str]) -> tuple[array, dict[str, array]]:
+    columns = list(zip(*rows))
+    times = array(TIME_TYPE, columns[0])
+    values = {
+        field: array(VALUE_TYPE, [_NAN if value is None else value for value in column])
+        for field, column in zip(fields, columns[1:])
+    }
+    return times, values
+
+
+def export_archive(
+    db: str | sqlite3.Connection,
+    root: str,
+    since: Optional[datetime | float] = None,
+    devices: Optional[Iterable[int | str]] = None,
+) -> dict:
+    """
+    Exporta as leituras de um banco no esquema versão 1 para `root`, um arquivo
+    por dispositivo e mês.
+
+    Args:
+        db (str | sqlite3.Connection): Banco ou conexão já aberta.
+        root (str): Diretório do arquivo colunar (criado se não existir).
+        since (datetime | float | None): Regrava apenas os meses a partir do que contém
+            `since`; os anteriores já exportados são mantidos. `None` exporta tudo.
+        devices: Dispositivos (ids ou nomes) a exportar; `None` exporta todos.
+
+    Returns:
+        dict: Quantidade de `devices`, `months` e `rows` gravados.
+    """
+    os.makedirs(root, exist_ok=True)
+    index = _load_index(root)
+    since = to_epoch(since)
+    report = {"devices": 0, "months": 0, "rows": 0}
+    with SensorQuery(db) as query:
+        known = query.devices()
+        if devices is not None:
+            wanted = {query.device_id(device) for device in devices}
+            known = [device for device in known if device.id in wanted]
+        for device in known:
+            bounds = query.bounds(device.id)
+            if bounds is None:
+                continue
+            first, last = bounds
+            if since is not None:
+                first = max(first, month_bounds(since)[0])
+            directory = os.path.join(root, str(device.id))
+            os.makedirs(directory, exist_ok=True)
+            index[str(device.id)] = device._asdict()
+            report["devices"] += 1
+            month_start = month_bounds(first)[0]
+            while month_start <= last:
+                month_end = month_bounds(month_start)[1]
+                rows = query.range(device.id, month_start, month_end)
+                if rows:
+                    times, values = _month_columns(rows, VALUE_FIELDS)
+                    name = month_name(month_start)
+                    write_month(os.path.join(directory, name + SUFFIX), device, name, times, values)
+                    report["months"] += 1
+                    report["rows"] += len(rows)
+                month_start = month_end
+    _save_index(root, index)
+    logger.info(
+        f"Arquivo colunar em {root}: {report['rows']:,} leituras, "
+        f"{report['months']} meses de {report['devices']} dispositivos"
+    )
+    return report
+
+
+__all__ = [
+    "Archive",
+    "ColumnFile",
+    "Segment",
+    "export_archive",
+    "write_month",
+    "month_bounds",
+    "FORMAT_VERSION",
+    "PAGE_SIZE",
+]
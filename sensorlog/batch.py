@@ -0,0 +1,165 @@
+"""
+Decodificação em lote para colunas (struct-of-arrays).
+
+Em vez de um objeto `Values` por leitura, `decode_batch` acumula cada campo de
+`_VALUE_FIELDS` em um `array('d')` (NaN para campos ausentes) e mantém arrays
+paralelos para horário, canal, mensagem e código do dispositivo. Os arrays
+expõem o protocolo de buffer, portanto `numpy.frombuffer(batch.columns["level"])`
+não copia dados.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from .core import (
+    DECODE_FAILURES,
+    DECODE_TOTAL,
+    FIELD_PATTERN,
+    Decode,
+    Events,
+    _FIELD_TABLE,
+    _VALUE_FIELDS,
+    _coerce_time,
+    _normalize_lines,
+    _scan_header,
+)
+
+if TYPE_CHECKING:
+    from telebot import types
+
+_WIDTH = len(_VALUE_FIELDS)
+_EMPTY_ROW = array("d", [float("nan")]) * _WIDTH
+
+
+class Batch:
+    """Leituras decodificadas em formato colunar e os eventos encontrados no lote."""
+
+    __slots__ = (
+        "time",
+        "channel_id",
+        "message_id",
+        "device_code",
+        "device_names",
+        "bot_code",
+        "bot_names",
+        "channel_names",
+        "columns",
+        "events",
+    )
+
+    def __init__(self):
+        self.time = array("q")
+        self.channel_id = array("q")
+        self.message_id = array("q")
+        self.device_code = array("l")
+        self.device_names: list[str] = []
+        self.bot_code = array("l")
+        self.bot_names: list[Optional[str]] = []
+        self.channel_names: dict[int, Optional[str]] = {}
+        self.columns: dict[str, array] = {field: array("d") for field in _VALUE_FIELDS}
+        self.events: list[Events] = []
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def device_name(self, row: int) -> str:
+        return self.device_names[self.device_code[row]]
+
+    def bot_name(self, row: int) -> Optional[str]:
+        return self.bot_names[self.bot_code[row]]
+
+
+def decode_batch(messages: Iterable[types.Message]) -> Batch:
+    """
+    Decodifica `messages` com as mesmas regras de `Decode`, sem criar `Values`.
+
+    Mensagens que não são leituras nem eventos são ignoradas.
+    """
+    batch = Batch()
+    append_time = batch.time.append
+    append_channel = batch.channel_id.append
+    append_message = batch.message_id.append
+    append_device = batch.device_code.append
+    append_bot = batch.bot_code.append
+    device_codes: dict[str, int] = {}
+    bot_codes: dict[Optional[str], int] = {}
+    channel_names = batch.channel_names
+    table = _FIELD_TABLE
+    # Linhas acumuladas em um único array (row-major) e transpostas ao final.
+    rows = array("d")
+    empty_row = _EMPTY_ROW
+    # Contadores locais, publicados em `sensorlog.metrics` uma única vez ao final.
+    ignored = no_header = unknown_key = caster_error = 0
+
+    for message in messages:
+        text = message.text
+        if not text:
+            ignored += 1
+            continue
+        text = _normalize_lines(text)
+        header = _scan_header(text)
+        if header is None:
+            event = Decode._parse_event(text.splitlines(), message)
+            if event is not None:
+                batch.events.append(event)
+            else:
+                ignored += 1
+                no_header += 1
+            continue
+        device_name, start = header
+
+        base = len(rows)
+        rows.extend(empty_row)
+        for field in FIELD_PATTERN.finditer(text, start):
+            entry = table.get(field[1].strip())
+            if entry is None:
+                unknown_key += 1
+                continue
+            index, caster = entry
+            value = field[2]
+            if value is None:
+                value = Decode._extract_value(field[3])
+            try:
+                rows[base + index] = caster(value)
+            except (ValueError, TypeError):
+                caster_error += 1
+                continue
+
+        code = device_codes.get(device_name)
+        if code is None:
+            code = device_codes[device_name] = len(batch.device_names)
+            batch.device_names.append(device_name)
+        bot_name = message.author_signature
+        bot = bot_codes.get(bot_name)
+        if bot is None:
+            bot = bot_codes[bot_name] = len(batch.bot_names)
+            batch.bot_names.append(bot_name)
+        chat = message.chat
+        if chat.id not in channel_names:
+            channel_names[chat.id] = chat.title
+        date = message.date
+        # Mesmas regras do `Decode`: `datetime`, época inteira ou `None` (horário atual).
+        append_time(date if date.__class__ is int else int(_coerce_time(date).timestamp()))
+        append_channel(chat.id)
+        append_message(message.message_id)
+        append_device(code)
+        append_bot(bot)
+
+    for index, field in enumerate(_VALUE_FIELDS):
+        batch.columns[field] = rows[index::_WIDTH]
+    for metric, label, count in (
+        (DECODE_TOTAL, "values", len(batch.time)),
+        (DECODE_TOTAL, "event", len(batch.events)),
+        (DECODE_TOTAL, "ignored", ignored),
+        (DECODE_FAILURES, "no_header", no_header),
+        (DECODE_FAILURES, "unknown_key", unknown_key),
+        (DECODE_FAILURES, "caster_error", caster_error),
+    ):
+        if count:
+            metric.labels(label).inc(count)
+    return batch
+
+
+__all__ = ["Batch", "decode_batch"]
@@ -4,11 +4,21 @@ Núcleo compacto da biblioteca sensorlog.
 
 from __future__ import annotations
 
+import json
 import re
+import sys
 from datetime import datetime, timedelta
-from typing import Callable, Optional
+from json.encoder import encode_basestring as _json_string
+from operator import attrgetter
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
 
-from telebot import types
+from . import metrics
+from .message import ChannelMessage
+
+if TYPE_CHECKING:
+    from telebot import types
+
+    from .batch import Batch
 
 SYMBOL_CHECK = "\u2705"
 SYMBOL_WARNING = "\u26A0"
@@ -19,8 +29,16 @@ EVENT_SYMBOLS = (SYMBOL_CHECK, SYMBOL_WARNING, SYMBOL_DOWN_ARROW, SYMBOL_UP_ARRO
 EVENT_UNKNOWN = 0
 EVENT_LEVEL = 1
 EVENT_COMMUNICATION = 2
+# Eventos sintéticos gerados no servidor por `sensorlog.rules`.
+EVENT_RULE = 3
 
 VALUE_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+HEADER_PATTERN = re.compile(r'Nome:\s*"([^"]+)"')
+# Uma única varredura por mensagem: chave, número logo após ":" (caso comum) e
+# o restante da linha, usado quando o valor não começa por um número.
+FIELD_PATTERN = re.compile(r"^([^:\n]*):[^\S\n]*(-?\d+(?:\.\d+)?)?(.*)", re.MULTILINE)
+# Separadores aceitos por str.splitlines() além de "\n".
+LINE_BREAK_PATTERN = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
 
 _IDENTIFICATION_FIELDS = (
     "time",
@@ -52,6 +70,38 @@ _VALUE_FIELDS = (
 )
 
 
+# Colunas de identificação serializadas por `as_tuple`/`to_json`, na ordem das tabelas.
+_ID_COLUMNS = ("time", "timezone_offset", "channel_id", "channel_name", "message_id", "bot_name", "device_name")
+
+_ZERO_OFFSET = timedelta()
+_INFINITY = float("inf")
+_new_object = object.__new__
+
+
+def _json_value(value) -> str:
+    """Escalar em JSON, com a mesma saída de `json.dumps` (inclusive `NaN` e `Infinity`)."""
+    if value is None:
+        return "null"
+    cls = value.__class__
+    if cls is float:
+        if value != value:
+            return "NaN"
+        if value == _INFINITY:
+            return "Infinity"
+        if value == -_INFINITY:
+            return "-Infinity"
+        return repr(value)
+    if cls is int:
+        return repr(value)
+    if cls is str:
+        return _json_string(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _json_template(columns: tuple[str, ...]) -> str:
+    return "{" + ",".join(f"{_json_string(column)}:%s" for column in columns) + "}"
+
+
 def _coerce_time(value: datetime | int | None) -> datetime:
     if value is None:
         return datetime.now()
@@ -73,7 +123,19 @@ def _coerce_tz(value: timedelta | int | None) -> timedelta:
 
 
 class Id:
-    """Metadados comuns a valores e eventos."""
+    """
+    Metadados comuns a valores e eventos.
+
+    `time` recebido como época inteira (caso do `Decode`) é guardado como `int` e
+    só vira `datetime` no primeiro acesso; `epoch` lê o horário sem criá-lo.
+
+    `COLUMNS` é a lista de colunas de cada classe; `as_tuple()` e `to_json()`
+    serializam nessa ordem direto dos slots, sem montar dicionários.
+    """
+
+    COLUMNS: tuple[str, ...] = _ID_COLUMNS
+    _get_columns = attrgetter(*COLUMNS[2:])
+    _json = _json_template(COLUMNS)
 
     __slots__ = (
         "__time",
@@ -111,11 +173,20 @@ class Id:
 
     @property
     def time(self) -> datetime:
-        return self.__time
+        value = self.__time
+        if value.__class__ is int:
+            value = self.__time = datetime.fromtimestamp(value)
+        return value
 
     @time.setter
     def time(self, value):
-        self.__time = _coerce_time(value)
+        self.__time = value if value.__class__ is int else _coerce_time(value)
+
+    @property
+    def epoch(self) -> float:
+        """Horário em segundos desde a época (equivale a `time.timestamp()`, sem materializar o `datetime`)."""
+        value = self.__time
+        return float(value) if value.__class__ is int else value.timestamp()
 
     @property
     def timezone_offset(self) -> timedelta:
@@ -125,6 +196,14 @@ class Id:
     def timezone_offset(self, value):
         self.__timezone_offset = _coerce_tz(value)
 
+    def as_tuple(self) -> tuple:
+        """Valores de `COLUMNS` (`time` em segundos desde a época), prontos para parâmetros SQL."""
+        return (self.epoch, self.__timezone_offset.total_seconds(), *self._get_columns(self))
+
+    def to_json(self) -> str:
+        """Objeto JSON com as chaves de `COLUMNS`, mesmo formato enviado por `http_post.py`."""
+        return self._json % tuple(map(_json_value, self.as_tuple()))
+
     def __str__(self):
         return "".join(f"  {field}: {getattr(self, field)}\n" for field in _IDENTIFICATION_FIELDS)
 
@@ -134,6 +213,10 @@ class Events(Id):
 
     __slots__ = ("type", "flag", "text")
 
+    COLUMNS = _ID_COLUMNS + ("type", "flag", "text")
+    _get_columns = attrgetter(*COLUMNS[2:])
+    _json = _json_template(COLUMNS)
+
     def __init__(self, event_type: int, event_text: str, event_flag: str = "", **kwargs):
         super().__init__(**kwargs)
         self.type = event_type
@@ -154,19 +237,73 @@ class Values(Id):
 
     __slots__ = _VALUE_FIELDS
 
+    COLUMNS = _ID_COLUMNS + _VALUE_FIELDS
+    _get_columns = attrgetter(*COLUMNS[2:])
+    _json = _json_template(COLUMNS)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         for field in _VALUE_FIELDS:
             setattr(self, field, None)
 
+    @classmethod
+    def from_parsed(
+        cls,
+        time: int | datetime,
+        channel_id: Optional[int],
+        channel_name: Optional[str],
+        message_id: Optional[int],
+        bot_name: Optional[str],
+        device_name: Optional[str],
+        fields: list | tuple,
+        timezone_offset: timedelta = _ZERO_OFFSET,
+    ) -> Values:
+        """
+        Construtor rápido para dados já validados, sem passar pelas propriedades e
+        conversões de `__init__`.
+
+        Args:
+            time (int | datetime): Segundos desde a época (convertidos em `datetime` apenas
+                quando lidos) ou um `datetime` já pronto.
+            fields: Os 15 valores na ordem de `_VALUE_FIELDS` (`None` para ausentes).
+        """
+        self = _new_object(cls)
+        self._Id__time = time
+        self._Id__timezone_offset = timezone_offset
+        self.channel_id = channel_id
+        self.channel_name = channel_name
+        self.message_id = message_id
+        self.bot_id = None
+        self.bot_name = bot_name
+        self.device_id = None
+        self.device_name = device_name
+        # Atribuição única por desempacotamento; a ordem precisa seguir _VALUE_FIELDS.
+        (
+            self.level,
+            self.raw_level,
+            self.distance,
+            self.t0,
+            self.t1,
+            self.v0,
+            self.v1,
+            self.snr,
+            self.rssi,
+            self.snr_gw,
+            self.rssi_gw,
+            self.speed1,
+            self.speed2,
+            self.counter,
+            self.digital_input,
+        ) = fields
+        return self
+
     def __str__(self):
         id_repr = "".join(f"  {field}: {getattr(self, field)}\n" for field in _IDENTIFICATION_FIELDS)
         value_repr = "".join(f"  {field}: {getattr(self, field)}\n" for field in _VALUE_FIELDS)
         return f"{id_repr}{value_repr.rstrip()}"
 
 
-def _float(value) -> float:
-    return float(value)
+_float = float
 
 
 def _int(value) -> int:
@@ -182,28 +319,31 @@ def _digital(value) -> int:
     return _int(normalized)
 
 
+_TRANSLATE: dict[str, tuple[str, Callable]] = {
+    "Nível": ("level", _float),
+    "Nível*": ("raw_level", _float),
+    "Dist₍₀₎": ("distance", _float),
+    "T0": ("t0", _float),
+    "T1": ("t1", _float),
+    "V0": ("v0", _float),
+    "V1": ("v1", _float),
+    "SNR": ("snr", _int),
+    "RSSI": ("rssi", _int),
+    "SNR(gw)": ("snr_gw", _int),
+    "RSSI(gw)": ("rssi_gw", _int),
+    "Δd/Δt₍₋₁₎": ("speed1", _int),
+    "Δd/Δt₍₋₂₎": ("speed2", _int),
+    "Contador": ("counter", _int),
+    "Entrada Digital": ("digital_input", _digital),
+}
+
+
 class SetValues(Values):
     """Traduz pares texto→atributo."""
 
     __slots__ = ()
 
-    __TRANSLATE: dict[str, tuple[str, Callable]] = {
-        "Nível": ("level", _float),
-        "Nível*": ("raw_level", _float),
-        "Dist₍₀₎": ("distance", _float),
-        "T0": ("t0", _float),
-        "T1": ("t1", _float),
-        "V0": ("v0", _float),
-        "V1": ("v1", _float),
-        "SNR": ("snr", _int),
-        "RSSI": ("rssi", _int),
-        "SNR(gw)": ("snr_gw", _int),
-        "RSSI(gw)": ("rssi_gw", _int),
-        "Δd/Δt₍₋₁₎": ("speed1", _int),
-        "Δd/Δt₍₋₂₎": ("speed2", _int),
-        "Contador": ("counter", _int),
-        "Entrada Digital": ("digital_input", _digital),
-    }
+    __TRANSLATE = _TRANSLATE
 
     def set_value(self, key: str, value) -> bool:
         entry = self.__TRANSLATE.get(key)
@@ -214,50 +354,157 @@ class SetValues(Values):
         return True
 
 
+DECODE_TOTAL = metrics.counter("sensorlog_decode_total", "Mensagens decodificadas, por resultado.", ("result",))
+DECODE_FAILURES = metrics.counter(
+    "sensorlog_decode_failures_total", "Falhas de decodificação, por motivo.", ("reason",)
+)
+_DECODED_VALUES = DECODE_TOTAL.labels("values")
+_DECODED_EVENT = DECODE_TOTAL.labels("event")
+_DECODED_IGNORED = DECODE_TOTAL.labels("ignored")
+# Mensagem com texto que não é leitura (sem `Nome:`) nem evento reconhecido.
+_NO_HEADER = DECODE_FAILURES.labels("no_header")
+# Linha `chave: valor` com chave fora de `_TRANSLATE` (campo ignorado).
+_UNKNOWN_KEY = DECODE_FAILURES.labels("unknown_key")
+# Valor que o conversor do campo não aceitou (campo ignorado).
+_CASTER_ERROR = DECODE_FAILURES.labels("caster_error")
+
+
+# Tabela chave → (índice em _VALUE_FIELDS, conversor), montada uma única vez
+# para evitar getattr/setattr por campo no caminho quente.
+_FIELD_TABLE: dict[str, tuple[int, Callable]] = {
+    key: (_VALUE_FIELDS.index(attr), caster) for key, (attr, caster) in _TRANSLATE.items()
+}
+_EMPTY_FIELDS = [None] * len(_VALUE_FIELDS)
+
+
+def filter_direct_channel_text_signed(m: types.Message) -> bool:
+    """
+    Filtra mensagens de texto diretas assinadas em um canal.
+
+    Args:
+        m (types.Message): A mensagem recebida do canal do Telegram.
+
+    Returns:
+        bool: True se a mensagem atender aos critérios de filtro, False caso contrário.
+    """
+    return (
+        m.reply_to_message is None
+        and m.forward_from_chat is None
+        and m.author_signature is not None
+        and m.content_type == "text"
+        and m.chat.type == "channel"
+    )
+
+
+def _normalize_lines(text: str) -> str:
+    if LINE_BREAK_PATTERN.search(text):
+        return "\n".join(text.splitlines())
+    return text
+
+
+def _scan_header(text: str) -> Optional[tuple[str, int]]:
+    """Retorna o nome do dispositivo e a posição onde começam os pares chave/valor."""
+    end = text.find("\n")
+    if end < 0:
+        end = len(text)
+    match = HEADER_PATTERN.search(text, 0, end)
+    if not match:
+        return None
+    # Poucos dispositivos e milhões de leituras: um único objeto str por nome.
+    return sys.intern(match.group(1).strip()), end + 1
+
+
 class Decode:
     """
     Interpreta mensagens do Telegram e produz Values ou Events.
+
+    Aceita um `types.Message` ou qualquer objeto com `text`, `date`, `message_id`,
+    `author_signature`, `chat.id` e `chat.title` (como `ChannelMessage`); para o
+    JSON da Bot API, use `from_dict` ou `from_json`.
     """
 
     __slots__ = ("var_data",)
 
-    def __init__(self, message: types.Message):
+    def __init__(self, message: types.Message | ChannelMessage):
         self.var_data: Optional[Values | Events] = None
         self._decode(message)
 
+    @classmethod
+    def from_dict(cls, data: dict) -> Decode:
+        """
+        Decodifica um `Message` da Bot API ou um `Update` (JSON já carregado), lendo
+        apenas as chaves usadas. Um `Update` sem `channel_post` resulta em `var_data` `None`.
+        """
+        if "update_id" in data:
+            data = data.get("channel_post")
+            if data is None:
+                _DECODED_IGNORED.inc()
+                decoded = _new_object(cls)
+                decoded.var_data = None
+                return decoded
+        return cls(ChannelMessage.from_dict(data))
+
+    @classmethod
+    def from_json(cls, raw: bytes | str) -> Decode:
+        """Como `from_dict`, a partir do corpo JSON (ex.: o POST de um webhook)."""
+        return cls.from_dict(json.loads(raw))
+
+    @staticmethod
+    def batch(messages: Iterable[types.Message]) -> "Batch":
+        """Decodifica várias mensagens em colunas; veja `sensorlog.batch.decode_batch`."""
+        from .batch import decode_batch
+
+        return decode_batch(messages)
+
     def _decode(self, message: types.Message):
-        lines = (message.text or "").splitlines()
-        if not lines:
+        text = message.text
+        if not text:
+            _DECODED_IGNORED.inc()
             return
-        self.var_data = self._parse_values(lines, message) or self._parse_event(lines, message)
+        text = _normalize_lines(text)
+        values = self._parse_values(text, message)
+        if values is not None:
+            self.var_data = values
+            _DECODED_VALUES.inc()
+            return
+        self.var_data = self._parse_event(text.splitlines(), message)
+        if self.var_data is None:
+            _DECODED_IGNORED.inc()
+            _NO_HEADER.inc()
+        else:
+            _DECODED_EVENT.inc()
 
     @staticmethod
-    def _parse_values(lines: list[str], message: types.Message) -> Optional[Values]:
-        match = re.search(r'Nome:\s*"([^"]+)"', lines[0])
-        if not match:
+    def _parse_values(text: str, message: types.Message) -> Optional[Values]:
+        header = _scan_header(text)
+        if header is None:
             return None
-
-        result = SetValues(
-            device_name=match.group(1).strip(),
-            time=message.date,
-            channel_id=message.chat.id,
-            channel_name=message.chat.title,
-            message_id=message.message_id,
-            bot_name=message.author_signature,
-        )
-
-        for line in lines[1:]:
-            key_value = line.split(":", 1)
-            if len(key_value) != 2:
+        device_name, start = header
+
+        fields = _EMPTY_FIELDS.copy()
+        table = _FIELD_TABLE
+        for field in FIELD_PATTERN.finditer(text, start):
+            entry = table.get(field[1].strip())
+            if entry is None:
+                _UNKNOWN_KEY.inc()
                 continue
-            key = key_value[0].strip()
-            raw_value = key_value[1].strip()
-            parsed_value = Decode._extract_value(raw_value)
+            index, caster = entry
+            value = field[2]
+            if value is None:
+                value = Decode._extract_value(field[3])
             try:
-                result.set_value(key, parsed_value)
+                fields[index] = caster(value)
             except (ValueError, TypeError):
+                _CASTER_ERROR.inc()
                 continue
-        return result
+
+        date = message.date
+        if date.__class__ is not int:
+            date = _coerce_time(date)
+        chat = message.chat
+        return SetValues.from_parsed(
+            date, chat.id, chat.title, message.message_id, message.author_signature, device_name, fields
+        )
 
     @staticmethod
     def _parse_event(lines: list[str], message: types.Message) -> Optional[Events]:
@@ -305,12 +552,14 @@ class Decode:
 
 __all__ = [
     "Decode",
+    "filter_direct_channel_text_signed",
     "Events",
     "Values",
     "SetValues",
     "Id",
     "EVENT_LEVEL",
     "EVENT_COMMUNICATION",
+    "EVENT_RULE",
     "EVENT_UNKNOWN",
     "SYMBOL_CHECK",
     "SYMBOL_WARNING",
@@ -0,0 +1,172 @@
+"""
+Supressão de mensagens duplicadas ou reentregues, por `(channel_id, message_id)`.
+
+`Deduplicator` combina um LRU limitado com as chaves já aceitas e, por canal, a
+marca d'água (maior `message_id` já processado), persistida em disco. Uma
+mensagem é descartada se estiver no LRU ou se seu `message_id` não passar da
+marca do canal, o que cobre reinícios com `skip_pending=False` e reentregas do
+Telegram. Como os ids de um canal são crescentes, a marca só é confiável quando
+as mensagens de um canal são processadas em ordem (`Runner` com `by_channel`).
+
+Para reimportações, `ingest_progress` guarda a marca no próprio banco SQLite,
+na mesma transação das linhas gravadas (veja `backfill.py`).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+PROGRESS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ingest_progress (
+    source TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+PROGRESS_COLUMNS = ("source", "channel_id", "message_id")
+
+
+class Deduplicator:
+    """
+    Filtro de mensagens já vistas.
+
+    Args:
+        path (str | None): Arquivo JSON com as marcas por canal (None = apenas em memória).
+        capacity (int): Quantidade máxima de chaves no LRU.
+        save_interval (float): Intervalo mínimo, em segundos, entre gravações da marca em disco.
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 100_000, save_interval: float = 5.0):
+        self.path = path
+        self.capacity = capacity
+        self.save_interval = save_interval
+        self.duplicates = 0
+        self._recent: OrderedDict[tuple[int, int], None] = OrderedDict()
+        self._marks: dict[int, int] = {}
+        self._saved_marks: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._next_save = 0.0
+        if path:
+            self._load()
+
+    @classmethod
+    def for_consumer(cls, directory: str, name: str, **kwargs) -> Deduplicator:
+        """Deduplicador com marcas em `<directory>/<name>.json` (apenas em memória se `directory` for vazio)."""
+        return cls(os.path.join(directory, f"{name}.json") if directory else None, **kwargs)
+
+    def seen(self, channel_id: Optional[int], message_id: Optional[int]) -> bool:
+        """Indica se a mensagem já foi aceita ou processada (sem registrá-la)."""
+        if channel_id is None or message_id is None:
+            return False
+        key = (channel_id, message_id)
+        with self._lock:
+            return key in self._recent or message_id <= self._marks.get(channel_id, -1)
+
+    def admit(self, channel_id: Optional[int], message_id: Optional[int]) -> bool:
+        """
+        Registra a mensagem e retorna `True` se ela ainda não foi vista.
+
+        Mensagens sem `channel_id` ou `message_id` são sempre aceitas.
+        """
+        if channel_id is None or message_id is None:
+            return True
+        key = (channel_id, message_id)
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                self.duplicates += 1
+                return False
+            if message_id <= self._marks.get(channel_id, -1):
+                self.duplicates += 1
+                return False
+            self._recent[key] = None
+            if len(self._recent) > self.capacity:
+                self._recent.popitem(last=False)
+            return True
+
+    def commit(self, channel_id: Optional[int], message_id: Optional[int]):
+        """Marca a mensagem como processada, avançando a marca do canal."""
+        if channel_id is None or message_id is None:
+            return
+        with self._lock:
+            if message_id > self._marks.get(channel_id, -1):
+                self._marks[channel_id] = message_id
+        if self.path and time.monotonic() >= self._next_save:
+            self.save()
+
+    def mark(self, channel_id: int) -> Optional[int]:
+        """Maior `message_id` processado no canal, ou `None`."""
+        return self._marks.get(channel_id)
+
+    def save(self):
+        """Grava as marcas em disco (arquivo temporário + rename), se mudaram."""
+        if not self.path:
+            return
+        with self._lock:
+            self._next_save = time.monotonic() + self.save_interval
+            if self._marks == self._saved_marks:
+                return
+            marks = dict(self._marks)
+        data = {"version": STATE_VERSION, "channels": {str(channel): mark for channel, mark in marks.items()}}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temporary, self.path)
+            self._saved_marks = marks
+        except OSError as e:
+            logger.error(f"Erro ao gravar as marcas de deduplicação em {self.path}: {e}")
+
+    def close(self):
+        self.save()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") != STATE_VERSION:
+                raise ValueError(f"versão {data.get('version')} não suportada")
+            self._marks = {int(channel): int(mark) for channel, mark in data["channels"].items()}
+            self._saved_marks = dict(self._marks)
+            logger.info(f"Marcas de deduplicação de {len(self._marks)} canais carregadas de {self.path}")
+        except Exception as e:
+            logger.error(f"Erro ao carregar as marcas de deduplicação de {self.path}: {e}")
+
+
+def create_progress_table(conn: sqlite3.Connection):
+    conn.execute(PROGRESS_TABLE_SQL)
+    conn.commit()
+
+
+def load_progress(conn: sqlite3.Connection, source: str, channel_id: int) -> Optional[int]:
+    """Maior `message_id` registrado em `ingest_progress` para a origem e o canal."""
+    row = conn.execute(
+        "SELECT MAX(message_id) FROM ingest_progress WHERE source = ? AND channel_id = ?", (source, channel_id)
+    ).fetchone()
+    return row[0]
+
+
+__all__ = [
+    "Deduplicator",
+    "PROGRESS_TABLE_SQL",
+    "PROGRESS_COLUMNS",
+    "create_progress_table",
+    "load_progress",
+]
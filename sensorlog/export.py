@@ -0,0 +1,234 @@
+"""
+Leitura de exportações de canal do Telegram Desktop (`result.json`).
+
+O arquivo é lido em blocos: o cabeçalho (nome, tipo e id do canal) é extraído
+do início e o array `messages` é decodificado de forma incremental, portanto
+exportações com milhões de mensagens não precisam caber em memória.
+`open_export_slices` entrega o mesmo array em fatias de texto ainda não
+decodificadas, para que outros processos façam a decodificação.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import re
+from datetime import datetime
+from typing import Iterator, Optional
+
+from .jsonstream import JsonRecordStream
+from .message import ChannelMessage, Chat
+
+CHANNEL_TYPES = ("public_channel", "private_channel")
+# Campos que indicam mídia ou conteúdo diferente de texto puro.
+_NON_TEXT_KEYS = (
+    "photo",
+    "file",
+    "media_type",
+    "sticker_emoji",
+    "poll",
+    "location_information",
+    "contact_information",
+)
+_MESSAGES_KEY = re.compile(r'"messages"\s*:\s*\[')
+_CHUNK_SIZE = 1 << 20
+_WHITESPACE = " \t\r\n"
+
+
+# Mensagens exportadas usam o mesmo registro mínimo das atualizações da Bot API.
+ExportedMessage = ChannelMessage
+
+
+def _bot_api_id(export_id: int) -> int:
+    return int(f"-100{export_id}")
+
+
+def _text(value) -> str:
+    if isinstance(value, str):
+        return value
+    return "".join(part if isinstance(part, str) else part.get("text", "") for part in value)
+
+
+def filter_exported_message(raw: dict) -> bool:
+    """
+    Equivalente de `filter_direct_channel_text_signed` para mensagens exportadas:
+    texto puro, assinado, sem resposta nem encaminhamento.
+    """
+    return (
+        raw.get("type") == "message"
+        and "reply_to_message_id" not in raw
+        and "forwarded_from" not in raw
+        and raw.get("author") is not None
+        and bool(raw.get("text"))
+        and not any(key in raw for key in _NON_TEXT_KEYS)
+    )
+
+
+def exported_date(raw: dict) -> Optional[int]:
+    """
+    Horário da mensagem em segundos desde a época: `date_unixtime` ou, em exportações
+    antigas que não o trazem, `date` (ISO 8601 no fuso local de quem exportou,
+    interpretado no fuso local desta máquina). `None` se nenhum dos dois for válido.
+    """
+    value = raw.get("date_unixtime")
+    if value is not None:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            pass
+    value = raw.get("date")
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            pass
+    return None
+
+
+def to_message(raw: dict, chat: Chat) -> Optional[ExportedMessage]:
+    """
+    Converte uma mensagem exportada; retorna `None` se ela não tiver data (veja
+    `exported_date`), em vez de registrá-la com o horário da importação.
+    """
+    date = exported_date(raw)
+    if date is None:
+        return None
+    return ExportedMessage(
+        message_id=raw["id"],
+        date=date,
+        text=_text(raw["text"]),
+        author_signature=raw.get("author"),
+        chat=chat,
+    )
+
+
+def _chunks(file, size: int) -> Iterator[str]:
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _open(path: str, chunk_size: int):
+    """Lê o cabeçalho; retorna o canal, o arquivo, os blocos restantes e o texto a partir do `[`."""
+    file = open(path, encoding="utf-8")
+    chunks = _chunks(file, chunk_size)
+    head = ""
+    match = None
+    for chunk in chunks:
+        head += chunk
+        match = _MESSAGES_KEY.search(head)
+        if match:
+            break
+    if not match:
+        file.close()
+        raise ValueError(f"{path}: array 'messages' não encontrado")
+
+    info = json.loads(head[: match.start()].rstrip().rstrip(",") + "}")
+    if info.get("type") not in CHANNEL_TYPES:
+        file.close()
+        raise ValueError(f"{path}: exportação do tipo {info.get('type')!r} não é de um canal")
+    chat = Chat(_bot_api_id(info["id"]), info.get("name"), "channel")
+    return chat, file, chunks, head[match.end() - 1 :]
+
+
+def open_export(path: str, chunk_size: int = _CHUNK_SIZE) -> tuple[Chat, Iterator[dict]]:
+    """
+    Abre uma exportação e retorna o canal e um gerador das mensagens brutas.
+
+    Raises:
+        ValueError: Se o arquivo não for a exportação de um canal.
+    """
+    chat, file, chunks, rest = _open(path, chunk_size)
+
+    def messages() -> Iterator[dict]:
+        with file:
+            stream = JsonRecordStream(strict=False)
+            yield from stream.feed(rest)
+            for chunk in chunks:
+                yield from stream.feed(chunk)
+            yield from stream.close()
+
+    return chat, messages()
+
+
+def open_export_slices(path: str, chunk_size: int = _CHUNK_SIZE) -> tuple[Chat, Iterator[str]]:
+    """
+    Como `open_export`, mas sem decodificar as mensagens: gera o array `messages`
+    em fatias de cerca de `chunk_size` caracteres, cada uma com mensagens completas
+    no formato do conteúdo de um array (`{...},\n {...}`). A última fatia pode
+    trazer o restante do documento após o `]`, que `json.JSONDecoder.raw_decode`
+    ignora ao ler `"[" + fatia + "]"`.
+
+    As fronteiras são encontradas sem decodificar o JSON: uma quebra de linha nunca
+    aparece dentro de uma string, e cada mensagem começa em uma linha com a mesma
+    indentação da primeira (objetos aninhados ficam mais indentados). Exportações
+    sem quebras de linha entre as mensagens são decodificadas aqui e as fatias,
+    reconstruídas com `json.dumps`.
+
+    Raises:
+        ValueError: Se o arquivo não for a exportação de um canal.
+    """
+    chat, file, chunks, rest = _open(path, chunk_size)
+
+    def slices() -> Iterator[str]:
+        with file:
+            buffer = rest[1:]
+            while not buffer.strip(_WHITESPACE):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                buffer += chunk
+            start = len(buffer) - len(buffer.lstrip(_WHITESPACE))
+            if buffer[start] == "]":
+                return
+            line = buffer.rfind("\n", 0, start)
+            if buffer[start] != "{" or line < 0:
+                yield from _reencoded("[" + buffer, chunks)
+                return
+            # "\n" + indentação + "{": o início de cada mensagem a partir da segunda.
+            delimiter = buffer[line : start + 1]
+            buffer = buffer[start:]
+            for chunk in chunks:
+                buffer += chunk
+                cut = buffer.rfind(delimiter)
+                if cut > 0:
+                    yield buffer[:cut].rstrip(_WHITESPACE).rstrip(",")
+                    buffer = buffer[cut + 1 :]
+            yield buffer
+
+    return chat, slices()
+
+
+def _reencoded(text: str, chunks: Iterator[str]) -> Iterator[str]:
+    stream = JsonRecordStream(strict=False)
+    for chunk in itertools.chain((text,), chunks):
+        records = stream.feed(chunk)
+        if records:
+            yield json.dumps(records, ensure_ascii=False)[1:-1]
+    records = stream.close()
+    if records:
+        yield json.dumps(records, ensure_ascii=False)[1:-1]
+
+
+def iter_messages(path: str, chunk_size: int = _CHUNK_SIZE) -> Iterator[ExportedMessage]:
+    """Gera as mensagens datadas da exportação que passam por `filter_exported_message`."""
+    chat, raw_messages = open_export(path, chunk_size)
+    for raw in raw_messages:
+        if filter_exported_message(raw):
+            message = to_message(raw, chat)
+            if message is not None:
+                yield message
+
+
+__all__ = [
+    "Chat",
+    "ExportedMessage",
+    "exported_date",
+    "filter_exported_message",
+    "iter_messages",
+    "open_export",
+    "open_export_slices",
+    "to_message",
+]
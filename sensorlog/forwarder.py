@@ -0,0 +1,220 @@
+"""
+Encaminhamento HTTP fora da thread do bot.
+
+`HttpForwarder` recebe registros (`Values`/`Events` ou dicionários), guarda-os em uma fila
+limitada e os envia a partir de um conjunto de threads que compartilham uma
+`requests.Session` (conexões keep-alive). Falhas transitórias são repetidas
+com backoff exponencial e, se o destino aceitar listas (`bulk_url`), vários
+registros seguem em um único POST. O corpo é gerado por um codec (`JsonCodec`
+por padrão; `sensorlog.wire.BinaryCodec` para o formato binário).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+from .core import Id
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_RETRY_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+HTTP_RECORDS = metrics.counter(
+    "sensorlog_http_records_total", "Registros encaminhados por HTTP, por endpoint e resultado.", ("url", "result")
+)
+HTTP_RETRIES = metrics.counter("sensorlog_http_retries_total", "Novas tentativas de POST, por endpoint.", ("url",))
+HTTP_SECONDS = metrics.histogram("sensorlog_http_request_seconds", "Duração de cada POST, por endpoint.", ("url",))
+HTTP_QUEUE_DEPTH = metrics.gauge("sensorlog_http_queue_depth", "Registros aguardando envio, por endpoint.", ("url",))
+
+
+def _json(record) -> str:
+    return record.to_json() if isinstance(record, Id) else json.dumps(record, ensure_ascii=False)
+
+
+class JsonCodec:
+    """
+    Serializa um registro ou uma lista de registros em JSON UTF-8.
+
+    `Values`/`Events` são escritos direto dos slots (`to_json`); dicionários, com `json.dumps`.
+    """
+
+    content_type = "application/json"
+
+    @staticmethod
+    def encode(payload) -> bytes:
+        if isinstance(payload, list):
+            return ("[" + ",".join([_json(record) for record in payload]) + "]").encode("utf-8")
+        return _json(payload).encode("utf-8")
+
+
+def new_session(pool_size: int = 4) -> requests.Session:
+    """Cria uma sessão com pool de conexões dimensionado para `pool_size` envios simultâneos."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HttpForwarder:
+    """
+    Fila de envio HTTP/POST com concorrência configurável.
+
+    Args:
+        url (str): Endpoint que recebe um registro por requisição.
+        bulk_url (str | None): Endpoint que aceita uma lista de registros; quando
+            definido, todos os envios usam este endpoint, com até `max_batch`
+            registros pendentes por POST.
+        workers (int): Quantidade de envios simultâneos.
+        queue_size (int): Limite da fila; com a fila cheia, `send` descarta o registro.
+        max_batch (int): Máximo de registros por POST em `bulk_url`.
+        retries (int): Novas tentativas após uma falha transitória.
+        backoff (float): Espera inicial, em segundos, entre tentativas (dobra a cada falha).
+        timeout (float): Timeout de cada requisição.
+        session (requests.Session | None): Sessão compartilhada entre encaminhadores.
+        codec: Objeto com `content_type` e `encode(payload) -> bytes`.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        bulk_url: Optional[str] = None,
+        workers: int = 4,
+        queue_size: int = 10_000,
+        max_batch: int = 100,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10,
+        session: Optional[requests.Session] = None,
+        codec=JsonCodec,
+    ):
+        self.url = url
+        self.bulk_url = bulk_url or None
+        self.max_batch = max_batch if self.bulk_url else 1
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or new_session(workers)
+        self.codec = codec
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._sent = HTTP_RECORDS.labels(url, "sent")
+        self._failed = HTTP_RECORDS.labels(url, "failed")
+        self._dropped = HTTP_RECORDS.labels(url, "dropped")
+        HTTP_QUEUE_DEPTH.labels(url).set_function(self._queue.qsize)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"http-forwarder-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def send(self, data: dict) -> bool:
+        """Enfileira `data` sem bloquear; retorna False se a fila estiver cheia."""
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+            self._dropped.inc()
+            logger.error(f"Fila de envio para {self.url} cheia; registro descartado")
+            return False
+        return True
+
+    def flush(self):
+        """Aguarda até que todos os registros enfileirados tenham sido processados."""
+        self._queue.join()
+
+    def close(self):
+        """Envia os registros pendentes e encerra as threads."""
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    # Devolve o sinal de parada para a próxima iteração.
+                    self._queue.task_done()
+                    self._queue.put(_STOP)
+                    break
+                batch.append(item)
+            try:
+                if self.bulk_url:
+                    sent = len(batch) if self._deliver(self.bulk_url, batch) else 0
+                else:
+                    sent = sum(self._deliver(self.url, data) for data in batch)
+                failed = len(batch) - sent
+                if sent:
+                    self.sent += sent
+                    self._sent.inc(sent)
+                if failed:
+                    self.failed += failed
+                    self._failed.inc(failed)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver(self, url: str, payload) -> bool:
+        """`_post` que nunca encerra a thread: erros do codec ou da requisição contam como falha."""
+        try:
+            return self._post(url, payload)
+        except Exception as e:
+            logger.error(f"Erro ao enviar solicitação POST para {url}: {type(e).__name__}: {e}")
+            return False
+
+    def _post(self, url: str, payload) -> bool:
+        body = self.codec.encode(payload)
+        headers = {"Content-Type": self.codec.content_type}
+        seconds = HTTP_SECONDS.labels(url)
+        for attempt in range(self.retries + 1):
+            try:
+                started = time.perf_counter()
+                response = self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+                seconds.observe(time.perf_counter() - started)
+                if response.status_code < 400:
+                    logger.debug(f"HTTP/POST {url}: {response.status_code}")
+                    return True
+                if response.status_code not in _RETRY_STATUS:
+                    logger.error(f"Resposta do servidor {url}: {response.status_code}, {response.text}")
+                    return False
+                reason = f"status {response.status_code}"
+            except requests.RequestException as e:
+                reason = str(e)
+            if attempt < self.retries:
+                delay = self.backoff * (2**attempt)
+                HTTP_RETRIES.labels(url).inc()
+                logger.warning(f"Falha ao enviar para {url} ({reason}); nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+        logger.error(f"Erro ao enviar solicitação POST para {url} após {self.retries + 1} tentativas: {reason}")
+        return False
+
+
+__all__ = ["HttpForwarder", "JsonCodec", "new_session"]
@@ -0,0 +1,148 @@
+"""
+Leitura incremental de registros JSON.
+
+`JsonRecordStream` recebe o corpo em pedaços (`feed`) e devolve os registros
+completos assim que chegam, sem manter o corpo inteiro em memória. Aceita
+NDJSON (um objeto por linha) ou um array JSON (`[{...}, {...}]`); o formato é
+detectado pelo primeiro caractere não branco.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+_WHITESPACE = " \t\r\n"
+_NDJSON = "ndjson"
+_ARRAY = "array"
+# Final de um número que o próximo pedaço ainda pode continuar ("1" → "12", "1." → "1.5").
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+# Restos de um valor interrompido no fim do buffer: número, escape `\\uXXXX` ou literal.
+_TRUNCATED = re.compile(r"[0-9.eE+-]*\Z|u[0-9a-fA-F]{0,3}\Z")
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+
+def _truncated(error: json.JSONDecodeError, buffer: str) -> bool:
+    """Se o erro pode vir apenas de o valor estar incompleto no fim do buffer."""
+    if error.msg.startswith("Unterminated string"):
+        return True
+    rest = buffer[error.pos :]
+    if len(rest) > 16:
+        return False
+    return _TRUNCATED.match(rest) is not None or any(literal.startswith(rest) for literal in _LITERALS)
+
+
+class JsonRecordStream:
+    """
+    Decodificador incremental de NDJSON ou array JSON.
+
+    Args:
+        strict (bool): Se False, o conteúdo após o fim do array é ignorado (útil
+            para ler um array aninhado em um documento maior).
+    """
+
+    __slots__ = ("_decoder", "_text", "_buffer", "_mode", "_closed", "_strict")
+
+    def __init__(self, strict: bool = True):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._text = json.JSONDecoder()
+        self._buffer = ""
+        self._mode = None
+        self._closed = False
+        self._strict = strict
+
+    def feed(self, chunk: bytes | str) -> list:
+        """
+        Acrescenta `chunk` e retorna os registros que ficaram completos.
+
+        Raises:
+            ValueError: Se um elemento do array já for inválido, sem esperar pelo `close`.
+        """
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self._buffer += chunk
+        return self._drain(final=False)
+
+    def close(self) -> list:
+        """Finaliza o fluxo; levanta `ValueError` se sobrar conteúdo incompleto."""
+        self._buffer += self._decoder.decode(b"", final=True)
+        records = self._drain(final=True)
+        if self._mode == _ARRAY and not self._closed:
+            raise ValueError("Array JSON não terminado")
+        return records
+
+    def _drain(self, final: bool) -> list:
+        if self._mode is None:
+            stripped = self._buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                self._buffer = ""
+                return []
+            if stripped[0] == "[":
+                self._mode = _ARRAY
+                self._buffer = stripped[1:]
+            else:
+                self._mode = _NDJSON
+                self._buffer = stripped
+        if self._mode == _NDJSON:
+            return self._drain_lines(final)
+        return self._drain_array(final)
+
+    def _drain_lines(self, final: bool) -> list:
+        lines = self._buffer.split("\n")
+        self._buffer = "" if final else lines.pop()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def _drain_array(self, final: bool) -> list:
+        buffer = self._buffer
+        size = len(buffer)
+        position = 0
+        records = []
+        while True:
+            if self._closed and not self._strict:
+                position = size
+                break
+            while position < size and (buffer[position] in _WHITESPACE or buffer[position] == ","):
+                position += 1
+            if position >= size:
+                break
+            if buffer[position] == "]":
+                if self._closed:
+                    raise ValueError("Conteúdo após o fim do array JSON")
+                self._closed = True
+                position += 1
+                continue
+            if self._closed:
+                raise ValueError("Conteúdo após o fim do array JSON")
+            try:
+                record, end = self._text.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                # Um elemento inválido antes do fim do buffer não será corrigido por mais
+                # dados; esperar por eles só o faria ser lido de novo a cada `feed`.
+                if final or not _truncated(e, buffer):
+                    raise
+                break
+            if (
+                not final
+                and isinstance(record, (int, float))
+                and not isinstance(record, bool)
+                and _NUMBER_TAIL.match(buffer, end)
+            ):
+                # Número no fim do buffer: só é emitido quando o delimitador chegar.
+                break
+            records.append(record)
+            position = end
+        self._buffer = buffer[position:]
+        return records
+
+
+def iter_json_records(chunks: Iterable[bytes | str]) -> Iterator:
+    """Gera os registros de um fluxo síncrono de pedaços (arquivo, socket...)."""
+    stream = JsonRecordStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.close()
+
+
+__all__ = ["JsonRecordStream", "iter_json_records"]
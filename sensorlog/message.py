@@ -0,0 +1,87 @@
+"""
+Mensagens de canal sem `telebot`.
+
+`Decode` lê apenas `text`, `date`, `message_id`, `author_signature`, `chat.id` e
+`chat.title`; qualquer objeto com esses atributos serve. `ChannelMessage` é o
+registro mínimo com eles, montado diretamente do JSON da Bot API (webhooks,
+gravações de atualizações) ou de uma exportação do Telegram Desktop, sem os
+objetos aninhados que `types.Message.de_json` cria para cada atualização.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Optional
+
+# Origens de encaminhamento que `types.Message.forward_from_chat` reconhece.
+_FORWARDED_FROM_CHAT = ("chat", "channel")
+
+
+class Chat:
+    """Dados do canal, com o `id` no formato da Bot API (-100…)."""
+
+    __slots__ = ("id", "title", "type")
+
+    def __init__(self, id: int, title: Optional[str], type: Optional[str]):
+        self.id = id
+        self.title = title
+        self.type = type
+
+
+class ChannelMessage:
+    """Mensagem de canal com apenas os atributos de `types.Message` usados por `Decode`."""
+
+    __slots__ = ("message_id", "date", "text", "author_signature", "chat")
+
+    def __init__(
+        self,
+        message_id: Optional[int],
+        date: int | datetime | None,
+        text: Optional[str],
+        author_signature: Optional[str],
+        chat: Chat,
+    ):
+        self.message_id = message_id
+        self.date = date
+        self.text = text
+        self.author_signature = author_signature
+        self.chat = chat
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ChannelMessage:
+        """Monta a mensagem a partir de um `Message` da Bot API (JSON já carregado)."""
+        chat = data["chat"]
+        return cls(
+            data.get("message_id"),
+            data.get("date"),
+            data.get("text"),
+            data.get("author_signature"),
+            Chat(chat["id"], chat.get("title"), chat.get("type")),
+        )
+
+
+def filter_channel_post(data: dict) -> bool:
+    """
+    Equivalente de `filter_direct_channel_text_signed` para um `Message` da Bot API
+    (JSON já carregado): texto, assinado, em um canal, sem resposta nem encaminhamento
+    de outro chat.
+    """
+    origin = data.get("forward_origin")
+    return (
+        "reply_to_message" not in data
+        and (origin is None or origin.get("type") not in _FORWARDED_FROM_CHAT)
+        and data.get("author_signature") is not None
+        and isinstance(data.get("text"), str)
+        and data.get("chat", {}).get("type") == "channel"
+    )
+
+
+def channel_post(update: dict | bytes | str) -> Optional[dict]:
+    """`channel_post` de um `Update` (dict ou o corpo JSON), ou `None` se ele não tiver um."""
+    if not isinstance(update, dict):
+        update = json.loads(update)
+    return update.get("channel_post")
+
+
+__all__ = ["Chat", "ChannelMessage", "channel_post", "filter_channel_post"]
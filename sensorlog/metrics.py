@@ -0,0 +1,309 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências externas.
+
+`counter`, `gauge` e `histogram` criam (ou reutilizam) métricas no registro
+global `REGISTRY`; `labels(...)` devolve a série de uma combinação de rótulos.
+As operações do caminho quente (`inc`, `observe`) usam uma trava por série e
+nenhuma formatação de texto: a exposição só é montada em `render()`, chamada
+pelo endpoint `/metrics` (`serve` para os bots, `http_server.py` para a API).
+
+Métricas publicadas pelo pacote:
+
+| Métrica | Origem |
+| --- | --- |
+| `sensorlog_updates_total{result}` | `Runner`: mensagens recebidas, filtradas, repetidas e enfileiradas. |
+| `sensorlog_queue_wait_seconds`, `sensorlog_handler_seconds` | `Runner`: espera na fila e duração do handler. |
+| `sensorlog_handler_errors_total` | `Runner`: handlers que levantaram exceção. |
+| `sensorlog_queue_depth{worker}` | `Runner`: profundidade de cada fila. |
+| `sensorlog_decode_total{result}` | `Decode`: `values`, `event` ou `ignored`. |
+| `sensorlog_decode_failures_total{reason}` | `Decode`: `no_header`, `unknown_key`, `caster_error`. |
+| `sensorlog_decode_seconds` | `Pipeline`: duração da decodificação. |
+| `sensorlog_sink_seconds{sink}` | `Pipeline`: da decodificação até a confirmação do destino. |
+| `sensorlog_sink_records_total{sink,result}` | `Pipeline`: `delivered`, `dropped`, `error`. |
+| `sensorlog_sink_queue_depth{sink}` | `Pipeline`: profundidade da fila de cada destino. |
+| `sensorlog_http_records_total{url,result}`, `sensorlog_http_retries_total{url}` | `HttpForwarder`: registros `sent`, `failed`, `dropped` e novas tentativas. |
+| `sensorlog_http_request_seconds{url}`, `sensorlog_http_queue_depth{url}` | `HttpForwarder`: duração de cada POST e fila pendente. |
+| `sensorlog_sqlite_rows_total`, `sensorlog_sqlite_errors_total`, `sensorlog_sqlite_commit_seconds` | `SQLiteWriter`: linhas gravadas, lotes com erro e duração das transações. |
+| `sensorlog_sqlite_queue_depth{db}` | `SQLiteWriter`: itens aguardando gravação. |
+| `sensorlog_alerts_total{result}` | `AlertDispatcher`: `received`, `repeated`, `merged`, `sent`, `retries`, `failed`. |
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites em segundos, de 0,1 ms a 10 s.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """Série de uma combinação de rótulos (posicionais ou nomeados), criada na primeira chamada."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera os rótulos {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(value) for value in values), None)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    kind = "counter"
+    _new_child = _CounterChild
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    @property
+    def value(self) -> float:
+        return self._default.value
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Valor calculado no momento da coleta (ex.: profundidade de uma fila)."""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """Valor instantâneo, atribuído diretamente ou calculado na coleta."""
+
+    kind = "gauge"
+    _new_child = _GaugeChild
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            try:
+                value = float(child.get())
+            except Exception as e:
+                logger.error(f"Erro ao coletar a métrica {self.name}: {e}")
+                continue
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Histogram(_Metric):
+    """Distribuição em faixas cumulativas (`_bucket`, `_sum` e `_count`)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Conjunto de métricas expostas em `render()`."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, documentation: str, labelnames: Iterable[str], **options) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Métrica {name} já registrada com outro tipo ou rótulos")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def serve(port: int, addr: str = "", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Expõe `GET /metrics` em uma thread própria; retorna o servidor (use `shutdown()` para parar)."""
+    # Importado aqui: `http.server` custa mais que o restante de `import sensorlog`.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Métricas disponíveis em http://{addr or '0.0.0.0'}:{server.server_port}/metrics")
+    return server
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "CONTENT_TYPE",
+    "LATENCY_BUCKETS",
+    "counter",
+    "gauge",
+    "histogram",
+    "serve",
+]
@@ -0,0 +1,141 @@
+"""
+Decodificação em múltiplos processos para cargas grandes.
+
+O processo principal envia blocos de tuplas simples (texto + metadados) para um
+pool de processos; cada worker aplica `decode_batch` e devolve um `Batch`
+colunar, cujos arrays são serializados como bytes. Nenhum objeto `Values` é
+criado ou transferido entre processos.
+
+Para exportações do Telegram Desktop, `decode_export_parallel` vai além: os
+workers recebem fatias do texto da exportação (`open_export_slices`) e fazem
+também a leitura do JSON e o filtro das mensagens, de modo que o processo
+principal apenas separa as fatias e grava os lotes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from .batch import Batch, decode_batch
+from .export import filter_exported_message, to_message
+from .message import ChannelMessage, Chat
+
+# (text, date, chat_id, chat_title, message_id, author_signature)
+RawMessage = tuple
+
+_DECODER = json.JSONDecoder()
+
+
+def as_raw(message) -> RawMessage:
+    """Converte um `types.Message` (ou equivalente) na tupla enviada aos workers."""
+    chat = message.chat
+    return (message.text, message.date, chat.id, chat.title, message.message_id, message.author_signature)
+
+
+def _decode_chunk(chunk: list[RawMessage]) -> Batch:
+    chats: dict[tuple, Chat] = {}
+    messages = []
+    for text, date, chat_id, chat_title, message_id, author_signature in chunk:
+        chat = chats.get((chat_id, chat_title))
+        if chat is None:
+            chat = chats[(chat_id, chat_title)] = Chat(chat_id, chat_title, "channel")
+        messages.append(ChannelMessage(message_id, date, text, author_signature, chat))
+    return decode_batch(messages)
+
+
+def _decode_export_slice(task: tuple) -> tuple[Batch, dict]:
+    text, chat_id, chat_title, after = task
+    chat = Chat(chat_id, chat_title, "channel")
+    # `raw_decode` ignora o que vier depois do array (o fim do documento, na última fatia).
+    raw_messages, _ = _DECODER.raw_decode(f"[{text}]")
+    counts = {"read": len(raw_messages), "skipped": 0, "accepted": 0, "undated": 0, "last": -1}
+    messages = []
+    for raw in raw_messages:
+        if raw.get("id", -1) <= after:
+            counts["skipped"] += 1
+        elif filter_exported_message(raw):
+            # Mesmas regras do caminho sequencial de `backfill.py`.
+            message = to_message(raw, chat)
+            if message is None:
+                counts["undated"] += 1
+                continue
+            messages.append(message)
+            counts["last"] = max(counts["last"], raw["id"])
+    counts["accepted"] = len(messages)
+    return decode_batch(messages), counts
+
+
+def _in_order(function, tasks: Iterable, processes: Optional[int], max_pending: Optional[int]) -> Iterator:
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 2 * processes
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(function, task))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _chunks(records: Iterable[RawMessage], size: int) -> Iterator[list[RawMessage]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def decode_parallel(
+    records: Iterable[RawMessage],
+    processes: Optional[int] = None,
+    chunk_size: int = 5000,
+    max_pending: Optional[int] = None,
+) -> Iterator[Batch]:
+    """
+    Decodifica `records` em paralelo, gerando um `Batch` por bloco, na ordem de entrada.
+
+    Args:
+        records: Tuplas `(text, date, chat_id, chat_title, message_id, author_signature)`
+            (veja `as_raw`).
+        processes (int | None): Processos do pool (padrão: `os.cpu_count()`).
+        chunk_size (int): Mensagens por bloco enviado a um worker.
+        max_pending (int | None): Blocos em andamento ao mesmo tempo (padrão: 2 × processos);
+            limita a memória usada quando a entrada é maior que a RAM.
+    """
+    yield from _in_order(_decode_chunk, _chunks(records, chunk_size), processes, max_pending)
+
+
+def decode_export_parallel(
+    slices: Iterable[str],
+    chat: Chat,
+    after: int = -1,
+    processes: Optional[int] = None,
+    max_pending: Optional[int] = None,
+) -> Iterator[tuple[Batch, dict]]:
+    """
+    Lê, filtra e decodifica fatias de uma exportação em paralelo, na ordem de entrada.
+
+    Args:
+        slices: Fatias geradas por `open_export_slices`.
+        chat (Chat): Canal retornado por `open_export_slices`.
+        after (int): Mensagens com `id` até este valor são ignoradas (ponto de retomada).
+        processes (int | None): Processos do pool (padrão: `os.cpu_count()`).
+        max_pending (int | None): Fatias em andamento ao mesmo tempo (padrão: 2 × processos).
+
+    Returns:
+        Iterator[tuple[Batch, dict]]: Para cada fatia, o `Batch` e os contadores `read`,
+        `skipped`, `accepted`, `undated` (sem data, veja `to_message`) e `last` (maior
+        `id` aceito, ou -1).
+    """
+    tasks = ((text, chat.id, chat.title, after) for text in slices)
+    yield from _in_order(_decode_export_slice, tasks, processes, max_pending)
+
+
+__all__ = ["RawMessage", "as_raw", "decode_export_parallel", "decode_parallel"]
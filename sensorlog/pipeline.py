@@ -0,0 +1,347 @@
+"""
+Pipeline de destinos: decodifica cada mensagem uma única vez e distribui o
+`Values`/`Events` resultante para vários destinos (console, HTTP, SQLite,
+WhatsApp...), cada um com sua própria fila, thread e política de contrapressão.
+
+Com um `RuleEngine` (`sensorlog.rules`), cada leitura também é avaliada pelas
+regras do servidor e os eventos sintéticos gerados são publicados logo após ela.
+
+Com um `Spool` (`sensorlog.spool`), os destinos com a política `block` deixam de
+ter fila em memória: cada registro é gravado uma vez no spool e cada um desses
+destinos o lê no seu ritmo, a partir do offset confirmado. O recebimento nunca
+espera por um destino lento, e nada se perde se o processo cair.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+from . import metrics
+from .core import Decode, Events, Values
+from .rules import RuleEngine
+from .spool import Spool, SpoolCursor
+
+if TYPE_CHECKING:
+    from telebot import types
+
+    from .message import ChannelMessage
+
+logger = logging.getLogger(__name__)
+
+BLOCK = "block"
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+POLICIES = (BLOCK, DROP_NEWEST, DROP_OLDEST)
+
+_STOP = object()
+
+# Espera máxima, em segundos, de um destino com spool por novos registros.
+COMMIT_INTERVAL = 0.5
+# Espera inicial e máxima, em segundos, antes de repetir uma entrega que falhou.
+RETRY_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+DECODE_SECONDS = metrics.histogram("sensorlog_decode_seconds", "Duração da decodificação no Pipeline.")
+SINK_SECONDS = metrics.histogram(
+    "sensorlog_sink_seconds", "Tempo do início da decodificação até a confirmação do destino.", ("sink",)
+)
+SINK_RECORDS = metrics.counter("sensorlog_sink_records_total", "Registros por destino e resultado.", ("sink", "result"))
+SINK_QUEUE_DEPTH = metrics.gauge("sensorlog_sink_queue_depth", "Registros aguardando em cada destino.", ("sink",))
+
+
+class Sink:
+    """
+    Destino de leituras e eventos.
+
+    Subclasses sobrescrevem `on_values` e/ou `on_event`; ambos são chamados na
+    thread do destino, nunca na thread que recebe as mensagens.
+    """
+
+    name = "sink"
+
+    def on_values(self, values: Values):
+        pass
+
+    def on_event(self, event: Events):
+        pass
+
+    def flush(self):
+        """
+        Conclui a entrega dos registros já recebidos (ex.: grava o lote pendente).
+        Com spool, é chamado antes de confirmar o offset do destino.
+        """
+
+    def close(self):
+        pass
+
+
+class _SinkWorker:
+    __slots__ = (
+        "sink",
+        "policy",
+        "queue",
+        "thread",
+        "delivered",
+        "dropped",
+        "errors",
+        "_seconds",
+        "_delivered",
+        "_dropped",
+        "_errors",
+    )
+
+    def __init__(self, sink: Sink, queue_size: int, policy: str):
+        self.sink = sink
+        self.policy = policy
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._seconds = SINK_SECONDS.labels(sink.name)
+        self._delivered = SINK_RECORDS.labels(sink.name, "delivered")
+        self._dropped = SINK_RECORDS.labels(sink.name, "dropped")
+        self._errors = SINK_RECORDS.labels(sink.name, "error")
+        SINK_QUEUE_DEPTH.labels(sink.name).set_function(self.queue.qsize)
+        self.thread = threading.Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+        self.thread.start()
+
+    def put(self, record, started: float):
+        item = (started, record)
+        if self.policy == BLOCK:
+            self.queue.put(item)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                self.dropped += 1
+                self._dropped.inc()
+                if self.policy == DROP_NEWEST:
+                    return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+    def stop(self):
+        self.queue.put(_STOP)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    def _deliver(self, record: Values | Events) -> bool:
+        try:
+            if isinstance(record, Values):
+                self.sink.on_values(record)
+            else:
+                self.sink.on_event(record)
+        except Exception as e:
+            self.errors += 1
+            self._errors.inc()
+            logger.error(f"Erro no destino {self.sink.name}: {e}")
+            return False
+        self.delivered += 1
+        self._delivered.inc()
+        return True
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            started, record = item
+            if self._deliver(record):
+                self._seconds.observe(time.perf_counter() - started)
+
+
+class _SpoolWorker(_SinkWorker):
+    """
+    Destino alimentado pelo spool: lê a partir do offset confirmado e o avança após `Sink.flush()`.
+
+    O offset nunca passa de um registro não entregue: se `on_values`/`on_event` ou
+    `flush` falharem, a leitura volta ao último offset confirmado e é repetida com
+    espera crescente (`RETRY_BACKOFF` até `MAX_BACKOFF` segundos).
+    """
+
+    __slots__ = ("cursor", "_stop")
+
+    def __init__(self, sink: Sink, cursor: SpoolCursor):
+        self.cursor = cursor
+        self._stop = threading.Event()
+        super().__init__(sink, 0, BLOCK)
+
+    def put(self, record, started: float):
+        raise TypeError("Destinos com spool leem os registros do próprio spool")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(queue_depth=0, offset=self.cursor.committed, lag_bytes=self.cursor.lag)
+        return stats
+
+    def _run(self):
+        cursor = self.cursor
+        backoff = 0.0
+        while True:
+            # Ao parar, entrega tudo o que foi gravado até aqui antes de sair.
+            stopping = self._stop.is_set()
+            if self._step(0.0 if stopping else COMMIT_INTERVAL):
+                backoff = 0.0
+                if stopping and cursor.position >= cursor.spool.end:
+                    return
+                continue
+            cursor.position = cursor.committed
+            if stopping:
+                logger.error(
+                    f"Destino {self.sink.name} encerrado com {cursor.lag} bytes não entregues; "
+                    "serão lidos do spool no próximo início"
+                )
+                return
+            backoff = min(max(backoff * 2, RETRY_BACKOFF), MAX_BACKOFF)
+            self._stop.wait(backoff)
+
+    def _step(self, timeout: float) -> bool:
+        """Lê, entrega e confirma um lote; retorna `False` se algo precisar ser repetido."""
+        cursor = self.cursor
+        confirmed = cursor.position
+        try:
+            records = cursor.read(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Erro ao ler o spool do destino {self.sink.name}: {e}")
+            return False
+        if not records:
+            confirmed = cursor.position
+        delivered = True
+        for offset, appended, record in records:
+            if not self._deliver(record):
+                # O offset fica no registro que falhou; os seguintes esperam por ele.
+                delivered = False
+                break
+            confirmed = offset
+            self._seconds.observe(max(time.time() - appended, 0.0))
+        if confirmed == cursor.committed:
+            return delivered
+        try:
+            self.sink.flush()
+        except Exception as e:
+            logger.error(f"Erro ao concluir a entrega do destino {self.sink.name}: {e}")
+            return False
+        try:
+            cursor.commit(confirmed)
+        except OSError as e:
+            logger.error(f"Erro ao gravar o offset do destino {self.sink.name}: {e}")
+            return False
+        return delivered
+
+
+class Pipeline:
+    """
+    Decodificação única com distribuição para os destinos registrados.
+
+    Use `handle` como handler do `Runner` (ou de `channel_post_handler`).
+
+    Args:
+        rules (RuleEngine | None): Regras avaliadas sobre cada `Values` publicado.
+        spool (Spool | None): Spool dos destinos com a política `block`; fechado por `close()`.
+    """
+
+    def __init__(self, rules: Optional[RuleEngine] = None, spool: Optional[Spool] = None):
+        self._workers: list[_SinkWorker] = []
+        self._spooled = False
+        self.rules = rules
+        self.spool = spool
+        self.decoded = 0
+        self.ignored = 0
+
+    def register(self, sink: Sink, queue_size: int = 1000, policy: str = BLOCK) -> Sink:
+        """
+        Registra um destino.
+
+        Args:
+            sink (Sink): Destino a ser alimentado.
+            queue_size (int): Limite da fila do destino.
+            policy (str): O que fazer com a fila cheia: `block` (aguarda), `drop_newest`
+                (descarta o novo registro) ou `drop_oldest` (descarta o mais antigo).
+                Com spool, destinos `block` leem do spool (com offset `sink.name`) e
+                `queue_size` é ignorado.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconhecida: {policy}")
+        if self.spool is not None and policy == BLOCK:
+            self._workers.append(_SpoolWorker(sink, self.spool.cursor(sink.name)))
+            self._spooled = True
+        else:
+            self._workers.append(_SinkWorker(sink, queue_size, policy))
+        return sink
+
+    def handle(self, message: types.Message | ChannelMessage) -> Optional[Values | Events]:
+        """Decodifica `message` e publica o resultado em todos os destinos."""
+        started = time.perf_counter()
+        record = Decode(message).var_data
+        DECODE_SECONDS.observe(time.perf_counter() - started)
+        if record is None:
+            self.ignored += 1
+            return None
+        self.decoded += 1
+        self.publish(record, started)
+        return record
+
+    def publish(self, record: Values | Events, started: Optional[float] = None):
+        """
+        Entrega um registro já decodificado a todos os destinos, seguido dos eventos das regras.
+
+        `started` (`time.perf_counter()`) marca o início da medição de `sensorlog_sink_seconds`.
+        """
+        if started is None:
+            started = time.perf_counter()
+        records = [record]
+        if self.rules is not None and isinstance(record, Values):
+            records.extend(self.rules.evaluate(record))
+        if self._spooled:
+            if len(records) == 1:
+                self.spool.append(record)
+            else:
+                self.spool.append_many(records)
+        for worker in self._workers:
+            if not isinstance(worker, _SpoolWorker):
+                for item in records:
+                    worker.put(item, started)
+
+    def close(self):
+        """Entrega os registros pendentes e fecha os destinos e o spool."""
+        for worker in self._workers:
+            worker.stop()
+        if self.spool is not None:
+            self.spool.sync()
+        for worker in self._workers:
+            worker.thread.join()
+            try:
+                worker.sink.close()
+            except Exception as e:
+                logger.error(f"Erro ao fechar o destino {worker.sink.name}: {e}")
+        if self.spool is not None:
+            self.spool.close()
+
+    def stats(self) -> dict:
+        return {
+            "decoded": self.decoded,
+            "ignored": self.ignored,
+            "rules": self.rules.stats() if self.rules is not None else None,
+            "spool": self.spool.stats() if self.spool is not None else None,
+            "sinks": {worker.sink.name: worker.stats() for worker in self._workers},
+        }
+
+
+__all__ = ["Pipeline", "Sink", "BLOCK", "DROP_NEWEST", "DROP_OLDEST"]
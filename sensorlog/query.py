@@ -0,0 +1,229 @@
+"""
+Consultas de leituras e eventos no esquema versão 1 (`sensorlog.schema`).
+
+As consultas por dispositivo e intervalo usam o índice `(device_id, time)`; com
+partições mensais, apenas as tabelas que cobrem o intervalo são lidas.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from typing import NamedTuple, Optional, Sequence
+
+from .rollup import Rollups, rollup_table
+from .schema import (
+    EVENTS_TABLE,
+    READINGS_TABLE,
+    SCHEMA_VERSION,
+    VALUE_FIELDS,
+    is_partitioned,
+    list_partitions,
+    partition_bounds,
+    schema_version,
+    to_epoch,
+)
+
+# Limite superior usado quando `end` não é informado.
+_NO_END = 2**62
+
+
+class Device(NamedTuple):
+    id: int
+    channel_id: Optional[int]
+    channel_name: Optional[str]
+    name: str
+
+
+class SensorQuery:
+    """
+    Consultas de intervalo e de última leitura por dispositivo.
+
+    Os horários podem ser informados como `datetime` (ingênuo = horário local) ou
+    segundos desde a época; nos resultados, `time` é sempre em segundos desde a
+    época. Dispositivos podem ser informados pelo `id` ou pelo nome.
+
+    Args:
+        db (str | sqlite3.Connection): Caminho do banco ou conexão já aberta.
+    """
+
+    def __init__(self, db: str | sqlite3.Connection):
+        self._owned = not isinstance(db, sqlite3.Connection)
+        self.conn = sqlite3.connect(db, check_same_thread=False) if self._owned else db
+        version = schema_version(self.conn)
+        if version < SCHEMA_VERSION:
+            raise ValueError(f"Esquema versão {version}; execute migrate_db.py antes de consultar")
+        self.partitioned = is_partitioned(self.conn)
+
+    def close(self):
+        if self._owned:
+            self.conn.close()
+
+    def __enter__(self) -> SensorQuery:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def devices(self) -> list[Device]:
+        rows = self.conn.execute(
+            "SELECT d.id, NULLIF(d.channel_id, 0), c.name, d.name "
+            "FROM devices AS d LEFT JOIN channels AS c ON c.id = d.channel_id ORDER BY d.id"
+        )
+        return [Device(*row) for row in rows]
+
+    def device_id(self, device: int | str, channel_id: Optional[int] = None) -> int:
+        """
+        Resolve o `id` de um dispositivo.
+
+        Raises:
+            KeyError: Se o dispositivo não existir.
+            ValueError: Se o nome existir em mais de um canal e `channel_id` não for informado.
+        """
+        if isinstance(device, int):
+            return device
+        if channel_id is None:
+            rows = self.conn.execute("SELECT id FROM devices WHERE name = ?", (device,)).fetchall()
+        else:
+            rows = self.conn.execute(
+                "SELECT id FROM devices WHERE name = ? AND channel_id = ?", (device, channel_id)
+            ).fetchall()
+        if not rows:
+            raise KeyError(device)
+        if len(rows) > 1:
+            raise ValueError(f"Dispositivo '{device}' existe em {len(rows)} canais; informe channel_id")
+        return rows[0][0]
+
+    def range(
+        self,
+        device: int | str,
+        start: datetime | float,
+        end: Optional[datetime | float] = None,
+        fields: Sequence[str] = VALUE_FIELDS,
+        channel_id: Optional[int] = None,
+    ) -> list[tuple]:
+        """
+        Leituras de `device` no intervalo `[start, end)`, em ordem de horário.
+
+        Returns:
+            list[tuple]: Tuplas `(time, *fields)`.
+        """
+        selected = _columns(fields)
+        device_id = self.device_id(device, channel_id)
+        start = to_epoch(start)
+        end = to_epoch(end) if end is not None else _NO_END
+        rows = []
+        for table in self._tables(start, end):
+            rows.extend(
+                self.conn.execute(
+                    f"SELECT time, {selected} FROM {table} WHERE device_id = ? AND time >= ? AND time < ? ORDER BY time",
+                    (device_id, start, end),
+                )
+            )
+        return rows
+
+    def latest(
+        self,
+        device: int | str,
+        fields: Sequence[str] = VALUE_FIELDS,
+        channel_id: Optional[int] = None,
+    ) -> Optional[tuple]:
+        """Última leitura de `device` como `(time, *fields)`, ou `None`."""
+        selected = _columns(fields)
+        device_id = self.device_id(device, channel_id)
+        for table in reversed(self._tables()):
+            row = self.conn.execute(
+                f"SELECT time, {selected} FROM {table} WHERE device_id = ? ORDER BY time DESC LIMIT 1",
+                (device_id,),
+            ).fetchone()
+            if row is not None:
+                return row
+        return None
+
+    def bounds(self, device: int | str, channel_id: Optional[int] = None) -> Optional[tuple[int, int]]:
+        """Horários da primeira e da última leitura de `device`, ou `None` se não houver leituras."""
+        device_id = self.device_id(device, channel_id)
+        first = last = None
+        for table in self._tables():
+            low, high = self.conn.execute(
+                f"SELECT MIN(time), MAX(time) FROM {table} WHERE device_id = ?", (device_id,)
+            ).fetchone()
+            if low is not None:
+                first = low if first is None else min(first, low)
+                last = high if last is None else max(last, high)
+        return None if first is None else (first, last)
+
+    def latest_all(self, fields: Sequence[str] = VALUE_FIELDS) -> dict[int, tuple]:
+        """Última leitura de cada dispositivo: `device_id` → `(time, *fields)`."""
+        selected = _columns(fields)
+        latest: dict[int, tuple] = {}
+        for table in reversed(self._tables()):
+            # Com MAX(), o SQLite devolve as demais colunas da própria linha máxima.
+            for device_id, *row in self.conn.execute(
+                f"SELECT device_id, MAX(time), {selected} FROM {table} GROUP BY device_id"
+            ):
+                latest.setdefault(device_id, tuple(row))
+        return latest
+
+    def rollup(
+        self,
+        device: int | str,
+        field: str,
+        start: datetime | float,
+        end: Optional[datetime | float] = None,
+        resolution: str = "1h",
+        channel_id: Optional[int] = None,
+    ) -> list[tuple]:
+        """
+        Agregados de `field` em janelas de `resolution` (`1m`, `1h` ou `1d`) em `[start, end)`.
+
+        Returns:
+            list[tuple]: Tuplas `(bucket, count, min, max, avg)`, com `bucket` no início da janela.
+        """
+        rollups = Rollups.load(self.conn)
+        if rollups is None or field not in rollups.fields:
+            raise ValueError(f"Campo sem agregados: {field}")
+        table = rollup_table(resolution)
+        device_id = self.device_id(device, channel_id)
+        end = to_epoch(end) if end is not None else _NO_END
+        return self.conn.execute(
+            f"SELECT bucket, {field}_count, {field}_min, {field}_max, {field}_sum / {field}_count FROM {table} "
+            f"WHERE device_id = ? AND bucket >= ? AND bucket < ? AND {field}_count > 0 ORDER BY bucket",
+            (device_id, to_epoch(start), end),
+        ).fetchall()
+
+    def events(
+        self,
+        device: int | str,
+        start: datetime | float,
+        end: Optional[datetime | float] = None,
+        channel_id: Optional[int] = None,
+    ) -> list[tuple]:
+        """Eventos de `device` no intervalo `[start, end)` como `(time, type, flag, text)`."""
+        device_id = self.device_id(device, channel_id)
+        end = to_epoch(end) if end is not None else _NO_END
+        return self.conn.execute(
+            f"SELECT time, type, flag, text FROM {EVENTS_TABLE} "
+            "WHERE device_id = ? AND time >= ? AND time < ? ORDER BY time",
+            (device_id, to_epoch(start), end),
+        ).fetchall()
+
+    def _tables(self, start: Optional[int] = None, end: Optional[int] = None) -> list[str]:
+        if not self.partitioned:
+            return [READINGS_TABLE]
+        tables = []
+        for name in list_partitions(self.conn):
+            first, last = partition_bounds(name)
+            if (start is None or last > start) and (end is None or first < end):
+                tables.append(name)
+        return tables
+
+
+def _columns(fields: Sequence[str]) -> str:
+    unknown = set(fields) - set(VALUE_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+    return ", ".join(fields)
+
+
+__all__ = ["Device", "SensorQuery"]
@@ -0,0 +1,374 @@
+"""
+Agregados por dispositivo em janelas de 1 minuto, 1 hora e 1 dia.
+
+As tabelas `rollup_1m`, `rollup_1h` e `rollup_1d` têm uma linha por
+`(device_id, bucket)` e, para cada campo agregado, as colunas `<campo>_count`,
+`<campo>_sum`, `<campo>_min` e `<campo>_max` (a média é `sum / count`). São
+atualizadas pelo `SQLiteWriter` na mesma transação que grava as leituras, podem
+ser reconstruídas a partir das leituras brutas (`rebuild`) e permitem descartar
+leituras antigas (`Rollups.prune`) sem perder o histórico agregado.
+
+As janelas são alinhadas em UTC.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time as _time
+from typing import Optional, Sequence
+
+from .schema import (
+    READINGS_TABLE,
+    READING_COLUMNS,
+    VALUE_FIELDS,
+    is_partitioned,
+    list_partitions,
+    partition_bounds,
+    _rebuild_readings_view,
+)
+
+logger = logging.getLogger(__name__)
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = {"1m": MINUTE, "1h": HOUR, "1d": DAY}
+ROLLUP_FIELDS = VALUE_FIELDS
+
+# Intervalo mínimo, em segundos, entre duas execuções automáticas de `prune`.
+PRUNE_INTERVAL = 3600
+
+
+def rollup_table(resolution: str) -> str:
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolução desconhecida: {resolution} (use {', '.join(RESOLUTIONS)})")
+    return f"rollup_{resolution}"
+
+
+def _aggregate_columns(fields: Sequence[str]) -> list[str]:
+    return [f"{field}_{suffix}" for field in fields for suffix in ("count", "sum", "min", "max")]
+
+
+def _table_sql(resolution: str, fields: Sequence[str]) -> str:
+    columns = []
+    for field in fields:
+        columns += [
+            f"{field}_count INTEGER NOT NULL DEFAULT 0",
+            f"{field}_sum REAL NOT NULL DEFAULT 0",
+            f"{field}_min REAL",
+            f"{field}_max REAL",
+        ]
+    body = ",\n        ".join(columns)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {rollup_table(resolution)} (
+        device_id INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        {body},
+        PRIMARY KEY (device_id, bucket)
+    ) WITHOUT ROWID
+    """
+
+
+def _upsert_sql(resolution: str, fields: Sequence[str]) -> str:
+    columns = ["device_id", "bucket"] + _aggregate_columns(fields)
+    updates = []
+    for field in fields:
+        # MIN()/MAX() com vários argumentos retornam NULL se algum for NULL.
+        updates += [
+            f"{field}_count = {field}_count + excluded.{field}_count",
+            f"{field}_sum = {field}_sum + excluded.{field}_sum",
+            f"{field}_min = COALESCE(MIN({field}_min, excluded.{field}_min), {field}_min, excluded.{field}_min)",
+            f"{field}_max = COALESCE(MAX({field}_max, excluded.{field}_max), {field}_max, excluded.{field}_max)",
+        ]
+    return (
+        f"INSERT INTO {rollup_table(resolution)} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT (device_id, bucket) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value):
+    conn.execute("INSERT OR REPLACE INTO schema_meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM schema_meta WHERE key = ?", (key,)).fetchone()
+    return None if row is None else row[0]
+
+
+def create_rollups(
+    conn: sqlite3.Connection,
+    fields: Sequence[str] = ROLLUP_FIELDS,
+    raw_retention_days: int = 0,
+    minute_retention_days: int = 0,
+):
+    """
+    Cria as tabelas de agregados, grava a política de retenção no banco e agrega
+    as leituras já existentes com `rebuild`.
+
+    Se as tabelas já existirem com outros campos, elas são recriadas.
+
+    Args:
+        conn (sqlite3.Connection): Conexão com um banco no esquema versão 1.
+        fields (Sequence[str]): Campos de `Values` agregados.
+        raw_retention_days (int): Dias de leituras brutas mantidos (0 = todas).
+        minute_retention_days (int): Dias de agregados de 1 minuto mantidos (0 = todos).
+    """
+    fields = tuple(fields)
+    unknown = set(fields) - set(VALUE_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+    current = Rollups.load(conn)
+    for resolution in RESOLUTIONS:
+        if current is not None and current.fields != fields:
+            conn.execute(f"DROP TABLE IF EXISTS {rollup_table(resolution)}")
+        conn.execute(_table_sql(resolution, fields))
+    _set_meta(conn, "rollup_fields", ",".join(fields))
+    _set_meta(conn, "raw_retention_days", int(raw_retention_days))
+    _set_meta(conn, "minute_retention_days", int(minute_retention_days))
+    conn.commit()
+    rebuild(conn)
+
+
+def _readings_tables(conn: sqlite3.Connection) -> list[str]:
+    return list_partitions(conn) if is_partitioned(conn) else [READINGS_TABLE]
+
+
+def _floor(epoch: int, size: int) -> int:
+    return epoch - epoch % size
+
+
+def rebuild(conn: sqlite3.Connection, since: Optional[int] = None) -> int:
+    """
+    Recalcula os agregados a partir das leituras brutas.
+
+    Sem `since`, reconstrói a partir do dia (UTC) da leitura bruta mais antiga;
+    agregados anteriores a esse dia, cujas leituras já foram descartadas, são
+    preservados.
+
+    Returns:
+        int: Quantidade de janelas de 1 minuto gravadas.
+    """
+    rollups = Rollups.load(conn)
+    if rollups is None:
+        raise ValueError("Agregados não configurados; use create_rollups")
+    tables = _readings_tables(conn)
+    if since is None:
+        oldest = [conn.execute(f"SELECT MIN(time) FROM {table}").fetchone()[0] for table in tables]
+        oldest = [value for value in oldest if value is not None]
+        if not oldest:
+            return 0
+        since = min(oldest)
+    since = _floor(int(since), DAY)
+
+    fields = rollups.fields
+    columns = ", ".join(["device_id", "bucket"] + _aggregate_columns(fields))
+    from_raw = ", ".join(
+        f"COUNT({field}), TOTAL({field}), MIN({field}), MAX({field})" for field in fields
+    )
+    merged = ", ".join(
+        f"SUM({field}_count), SUM({field}_sum), MIN({field}_min), MAX({field}_max)" for field in fields
+    )
+    written = 0
+    with conn:
+        for resolution in RESOLUTIONS:
+            conn.execute(f"DELETE FROM {rollup_table(resolution)} WHERE bucket >= ?", (since,))
+        for table in tables:
+            cursor = conn.execute(
+                f"""
+                INSERT INTO rollup_1m ({columns})
+                SELECT device_id, time - time % {MINUTE}, {from_raw}
+                FROM {table}
+                WHERE time >= ?
+                GROUP BY device_id, time - time % {MINUTE}
+                """,
+                (since,),
+            )
+            written += cursor.rowcount
+        for source, target in (("1m", "1h"), ("1h", "1d")):
+            size = RESOLUTIONS[target]
+            conn.execute(
+                f"""
+                INSERT INTO {rollup_table(target)} ({columns})
+                SELECT device_id, bucket - bucket % {size}, {merged}
+                FROM {rollup_table(source)}
+                WHERE bucket >= ?
+                GROUP BY device_id, bucket - bucket % {size}
+                """,
+                (since,),
+            )
+    logger.info(f"Agregados reconstruídos a partir de {_time.strftime('%Y-%m-%d', _time.gmtime(since))}")
+    return written
+
+
+class Rollups:
+    """
+    Atualização incremental dos agregados e política de retenção.
+
+    Use `Rollups.load(conn)`; a instância é mantida pelo `Schema` do
+    `SQLiteWriter` e recebe as linhas de cada lote já no formato de
+    `READING_COLUMNS`.
+    """
+
+    def __init__(self, fields: Sequence[str], raw_retention_days: int = 0, minute_retention_days: int = 0):
+        self.fields = tuple(fields)
+        self.raw_retention_days = raw_retention_days
+        self.minute_retention_days = minute_retention_days
+        # (posição do contador na linha agregada, posição do campo na leitura)
+        self._positions = tuple((4 * slot, READING_COLUMNS.index(field)) for slot, field in enumerate(self.fields))
+        self._empty = [0, 0.0, None, None] * len(self.fields)
+        self._upserts = {resolution: _upsert_sql(resolution, self.fields) for resolution in RESOLUTIONS}
+        self._next_prune = 0.0
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> Optional[Rollups]:
+        """Retorna a configuração gravada por `create_rollups`, ou `None`."""
+        try:
+            fields = _get_meta(conn, "rollup_fields")
+        except sqlite3.OperationalError:
+            return None
+        if fields is None:
+            return None
+        return cls(
+            [field for field in fields.split(",") if field],
+            int(_get_meta(conn, "raw_retention_days") or 0),
+            int(_get_meta(conn, "minute_retention_days") or 0),
+        )
+
+    def update(self, conn: sqlite3.Connection, rows: Sequence[Sequence]):
+        """Soma as linhas (formato de `READING_COLUMNS`) às janelas de 1 min, 1 h e 1 dia."""
+        minute: dict[tuple, list] = {}
+        positions = self._positions
+        empty = self._empty
+        for row in rows:
+            key = (row[0], row[1] - row[1] % MINUTE)
+            partial = minute.get(key)
+            if partial is None:
+                partial = minute[key] = empty.copy()
+            for slot, index in positions:
+                value = row[index]
+                # `value != value` descarta NaN (campos ausentes em um `Batch`).
+                if value is None or value != value:
+                    continue
+                if partial[slot]:
+                    partial[slot] += 1
+                    partial[slot + 1] += value
+                    if value < partial[slot + 2]:
+                        partial[slot + 2] = value
+                    elif value > partial[slot + 3]:
+                        partial[slot + 3] = value
+                else:
+                    partial[slot] = 1
+                    partial[slot + 1] = partial[slot + 2] = partial[slot + 3] = value
+
+        partials = minute
+        for resolution, size in RESOLUTIONS.items():
+            if size != MINUTE:
+                partials = self._coarsen(partials, size)
+            conn.executemany(
+                self._upserts[resolution],
+                [(device, bucket, *partial) for (device, bucket), partial in partials.items()],
+            )
+
+    def _coarsen(self, partials: dict[tuple, list], size: int) -> dict[tuple, list]:
+        merged: dict[tuple, list] = {}
+        slots = [slot for slot, _ in self._positions]
+        for (device, bucket), partial in partials.items():
+            key = (device, bucket - bucket % size)
+            current = merged.get(key)
+            if current is None:
+                merged[key] = partial.copy()
+                continue
+            for slot in slots:
+                if not partial[slot]:
+                    continue
+                if current[slot]:
+                    current[slot] += partial[slot]
+                    current[slot + 1] += partial[slot + 1]
+                    if partial[slot + 2] < current[slot + 2]:
+                        current[slot + 2] = partial[slot + 2]
+                    if partial[slot + 3] > current[slot + 3]:
+                        current[slot + 3] = partial[slot + 3]
+                else:
+                    current[slot : slot + 4] = partial[slot : slot + 4]
+        return merged
+
+    def prune(self, conn: sqlite3.Connection, now: Optional[float] = None) -> dict:
+        """
+        Descarta leituras brutas e agregados de 1 minuto além da retenção.
+
+        Os cortes são alinhados ao início do dia (UTC), para que `rebuild`
+        continue produzindo dias completos.
+
+        Returns:
+            dict: Linhas removidas por tabela.
+        """
+        now = int(now if now is not None else _time.time())
+        removed = {}
+        devices = [device for (device,) in conn.execute("SELECT id FROM devices")]
+        with conn:
+            if self.raw_retention_days:
+                cutoff = _floor(now - self.raw_retention_days * DAY, DAY)
+                removed["raw"] = self._prune_raw(conn, devices, cutoff)
+            if self.minute_retention_days:
+                cutoff = _floor(now - self.minute_retention_days * DAY, DAY)
+                removed["rollup_1m"] = sum(
+                    conn.execute("DELETE FROM rollup_1m WHERE device_id = ? AND bucket < ?", (device, cutoff)).rowcount
+                    for device in devices
+                )
+        if removed:
+            logger.info(f"Retenção aplicada: {removed}")
+        return removed
+
+    def maybe_prune(self, conn: sqlite3.Connection) -> bool:
+        """
+        Executa `prune` se houver retenção configurada e a última execução tiver
+        sido há mais de `PRUNE_INTERVAL` segundos.
+
+        Returns:
+            bool: `True` se `prune` foi executado.
+        """
+        if not (self.raw_retention_days or self.minute_retention_days):
+            return False
+        now = _time.monotonic()
+        if now < self._next_prune:
+            return False
+        self._next_prune = now + PRUNE_INTERVAL
+        try:
+            self.prune(conn)
+        except Exception as e:
+            logger.error(f"Erro ao aplicar a retenção: {e}")
+        return True
+
+    def _prune_raw(self, conn: sqlite3.Connection, devices: list[int], cutoff: int) -> int:
+        count = 0
+        partitioned = is_partitioned(conn)
+        dropped = False
+        for table in _readings_tables(conn):
+            if partitioned:
+                start, end = partition_bounds(table)
+                if start >= cutoff:
+                    continue
+                if end <= cutoff:
+                    count += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    conn.execute(f"DROP TABLE {table}")
+                    dropped = True
+                    continue
+            # O índice (device_id, time) torna cada DELETE uma busca por intervalo.
+            for device in devices:
+                count += conn.execute(
+                    f"DELETE FROM {table} WHERE device_id = ? AND time < ?", (device, cutoff)
+                ).rowcount
+        if dropped:
+            _rebuild_readings_view(conn, list_partitions(conn))
+        return count
+
+
+__all__ = [
+    "RESOLUTIONS",
+    "ROLLUP_FIELDS",
+    "PRUNE_INTERVAL",
+    "Rollups",
+    "create_rollups",
+    "rebuild",
+    "rollup_table",
+]
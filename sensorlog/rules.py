@@ -0,0 +1,371 @@
+"""
+Regras avaliadas no servidor sobre as leituras decodificadas.
+
+Cada regra é compilada uma vez (`compile_rule`) e mantém, por dispositivo, um
+estado de tamanho fixo: contadores, buffers circulares e somas acumuladas,
+atualizados em O(1) a cada leitura. Quando uma condição passa a valer, ou deixa
+de valer, `RuleEngine.evaluate` gera um `Events` sintético no mesmo formato dos
+alertas do firmware (`"<dispositivo>: <flag>\\n<descrição>"`), que segue pelo
+mesmo `Pipeline` dos demais registros.
+
+Sintaxe (uma regra por texto, várias separadas por `;` em `parse_rules`):
+
+- `rssi < -110 for 3`: condição em 3 leituras seguidas (`for N` é opcional);
+- `avg(t0, 10) > 40`: média móvel das últimas 10 leituras;
+- `rate(level, 6) > 5`: inclinação, em unidades por minuto, da reta ajustada às
+  últimas 6 leituras (mínimos quadrados);
+- `change(digital_input)`: qualquer mudança de valor.
+
+Os operadores aceitos são `<`, `<=`, `>` e `>=`, e os campos são os de `Values`.
+"""
+
+from __future__ import annotations
+
+import logging
+import operator
+import re
+import threading
+from typing import Callable, Iterable, Optional
+
+from .core import (
+    _VALUE_FIELDS,
+    EVENT_RULE,
+    SYMBOL_CHECK,
+    SYMBOL_DOWN_ARROW,
+    SYMBOL_UP_ARROW,
+    SYMBOL_WARNING,
+    Events,
+    Values,
+)
+
+logger = logging.getLogger(__name__)
+
+_OPERATORS: dict[str, Callable[[float, float], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_NUMBER = r"-?\d+(?:\.\d+)?"
+_THRESHOLD = re.compile(rf"^(\w+)\s*(<=|>=|<|>)\s*({_NUMBER})(?:\s+for\s+(\d+))?$")
+_WINDOW = re.compile(rf"^(avg|rate)\(\s*(\w+)\s*,\s*(\d+)\s*\)\s*(<=|>=|<|>)\s*({_NUMBER})$")
+_CHANGE = re.compile(r"^change\(\s*(\w+)\s*\)$")
+# Descrição dos eventos gerados: "Regra <texto>: ..." ou "Regra <texto> normalizada: ...".
+_DESCRIPTION = re.compile(r"Regra (.+?)(?: normalizada)?: ")
+
+
+def _number(value: float) -> str:
+    return f"{value:g}"
+
+
+class Rule:
+    """
+    Regra compilada. Subclasses implementam `new_state` e `update`, que recebe o
+    estado do dispositivo, o horário (segundos desde a época) e o valor do campo e
+    retorna `(flag, descrição)` quando um evento deve ser gerado.
+    """
+
+    __slots__ = ("text", "field")
+
+    def __init__(self, text: str, field: str):
+        if field not in _VALUE_FIELDS:
+            raise ValueError(f"Campo desconhecido na regra {text!r}: {field}")
+        self.text = text
+        self.field = field
+
+    def new_state(self) -> list:
+        raise NotImplementedError
+
+    def update(self, state: list, time: float, value: float) -> Optional[tuple[str, str]]:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.text!r})"
+
+
+class Threshold(Rule):
+    """`campo <op> limite`, válida após `count` leituras seguidas. Estado: `[seguidas, ativa]`."""
+
+    __slots__ = ("compare", "limit", "count")
+
+    def __init__(self, text: str, field: str, op: str, limit: float, count: int = 1):
+        super().__init__(text, field)
+        self.compare = _OPERATORS[op]
+        self.limit = limit
+        self.count = max(1, count)
+
+    def new_state(self) -> list:
+        return [0, False]
+
+    def update(self, state, time, value):
+        if self.compare(value, self.limit):
+            state[0] += 1
+            if not state[1] and state[0] >= self.count:
+                state[1] = True
+                return SYMBOL_WARNING, f"Regra {self.text}: {self.field} = {_number(value)}"
+        else:
+            state[0] = 0
+            if state[1]:
+                state[1] = False
+                return SYMBOL_CHECK, f"Regra {self.text} normalizada: {self.field} = {_number(value)}"
+        return None
+
+
+class Average(Rule):
+    """
+    `avg(campo, N) <op> limite` com soma acumulada sobre um buffer circular.
+    Estado: `[buffer, posição, quantidade, soma, ativa]`.
+    """
+
+    __slots__ = ("compare", "limit", "size")
+
+    def __init__(self, text: str, field: str, size: int, op: str, limit: float):
+        super().__init__(text, field)
+        if size < 1:
+            raise ValueError(f"Janela inválida na regra {text!r}")
+        self.compare = _OPERATORS[op]
+        self.limit = limit
+        self.size = size
+
+    def new_state(self) -> list:
+        return [[0.0] * self.size, 0, 0, 0.0, False]
+
+    def update(self, state, time, value):
+        buffer, position, count, total, active = state
+        if count == self.size:
+            total -= buffer[position]
+        else:
+            count += 1
+        buffer[position] = value
+        total += value
+        position += 1
+        if position == self.size:
+            position = 0
+            # Recalcula a soma a cada volta para não acumular erro de arredondamento.
+            total = sum(buffer[:count])
+        state[1], state[2], state[3] = position, count, total
+        if count < self.size:
+            return None
+        average = total / count
+        if self.compare(average, self.limit):
+            if not active:
+                state[4] = True
+                return SYMBOL_WARNING, f"Regra {self.text}: média {_number(round(average, 3))}"
+        elif active:
+            state[4] = False
+            return SYMBOL_CHECK, f"Regra {self.text} normalizada: média {_number(round(average, 3))}"
+        return None
+
+
+class Rate(Rule):
+    """
+    `rate(campo, N) <op> limite`: inclinação (unidades por minuto) da reta de mínimos
+    quadrados sobre as últimas `N` leituras, mantida com somas acumuladas de t, v, t² e t·v.
+    Estado: `[tempos, valores, posição, quantidade, origem, Σt, Σv, Σt², Σtv, ativa]`.
+    """
+
+    __slots__ = ("compare", "limit", "size")
+
+    def __init__(self, text: str, field: str, size: int, op: str, limit: float):
+        super().__init__(text, field)
+        if size < 2:
+            raise ValueError(f"A regra {text!r} precisa de uma janela de pelo menos 2 leituras")
+        self.compare = _OPERATORS[op]
+        self.limit = limit
+        self.size = size
+
+    def new_state(self) -> list:
+        return [[0.0] * self.size, [0.0] * self.size, 0, 0, None, 0.0, 0.0, 0.0, 0.0, False]
+
+    def update(self, state, time, value):
+        times, values, position, count, origin, st, sv, stt, stv, active = state
+        if origin is None:
+            origin = state[4] = time
+        # Tempos em minutos a partir da origem, para manter as somas pequenas.
+        t = (time - origin) / 60.0
+        if count == self.size:
+            old_t, old_v = times[position], values[position]
+            st -= old_t
+            sv -= old_v
+            stt -= old_t * old_t
+            stv -= old_t * old_v
+        else:
+            count += 1
+        times[position], values[position] = t, value
+        st += t
+        sv += value
+        stt += t * t
+        stv += t * value
+        position += 1
+        if position == self.size:
+            position = 0
+            # Recalcula as somas a cada volta e reposiciona a origem na leitura mais antiga,
+            # evitando erro de arredondamento acumulado e tempos grandes em t².
+            shift = min(times[:count])
+            if shift:
+                times[:count] = [t - shift for t in times[:count]]
+                state[4] = origin + shift * 60.0
+            pairs = list(zip(times, values))[:count]
+            st = sum(t for t, _ in pairs)
+            sv = sum(v for _, v in pairs)
+            stt = sum(t * t for t, _ in pairs)
+            stv = sum(t * v for t, v in pairs)
+        state[2:4] = position, count
+        state[5:9] = st, sv, stt, stv
+        if count < self.size:
+            return None
+        denominator = count * stt - st * st
+        if denominator <= 1e-12:
+            return None
+        slope = (count * stv - st * sv) / denominator
+        if self.compare(slope, self.limit):
+            if not active:
+                state[9] = True
+                flag = SYMBOL_UP_ARROW if slope > 0 else SYMBOL_DOWN_ARROW
+                return flag, f"Regra {self.text}: {_number(round(slope, 3))} por minuto"
+        elif active:
+            state[9] = False
+            return SYMBOL_CHECK, f"Regra {self.text} normalizada: {_number(round(slope, 3))} por minuto"
+        return None
+
+
+class Change(Rule):
+    """`change(campo)`: gera um evento a cada mudança de valor. Estado: `[último valor]`."""
+
+    __slots__ = ()
+
+    def new_state(self) -> list:
+        return [None]
+
+    def update(self, state, time, value):
+        previous, state[0] = state[0], value
+        if previous is None or value == previous:
+            return None
+        flag = SYMBOL_UP_ARROW if value > previous else SYMBOL_DOWN_ARROW
+        return flag, f"Regra {self.text}: {self.field} {_number(previous)} → {_number(value)}"
+
+
+def compile_rule(text: str) -> Rule:
+    """Converte o texto de uma regra (veja a sintaxe no início do módulo) em um `Rule`."""
+    text = " ".join(text.split())
+    match = _THRESHOLD.match(text)
+    if match:
+        field, op, limit, count = match.groups()
+        return Threshold(text, field, op, float(limit), int(count or 1))
+    match = _WINDOW.match(text)
+    if match:
+        kind, field, size, op, limit = match.groups()
+        cls = Average if kind == "avg" else Rate
+        return cls(text, field, int(size), op, float(limit))
+    match = _CHANGE.match(text)
+    if match:
+        return Change(text, match.group(1))
+    raise ValueError(f"Regra inválida: {text!r}")
+
+
+def rule_of(event: Events) -> Optional[str]:
+    """
+    Texto da regra que gerou um evento de `RuleEngine`, lido da descrição (o texto
+    de uma regra não contém `:`), ou `None` se o evento não vier de uma regra.
+    """
+    if event.type != EVENT_RULE:
+        return None
+    match = _DESCRIPTION.match(event.text.split("\n", 1)[-1])
+    return match.group(1) if match else None
+
+
+def parse_rules(text: str) -> list[Rule]:
+    """Compila regras separadas por `;` ou quebras de linha (linhas iniciadas por `#` são ignoradas)."""
+    parts = (part.strip() for part in re.split(r"[;\n]", text))
+    return [compile_rule(part) for part in parts if part and not part.startswith("#")]
+
+
+class RuleEngine:
+    """
+    Avalia as regras sobre cada `Values` e devolve os `Events` sintéticos gerados.
+
+    O estado é mantido por `(channel_id, device_name)`. Leituras de um mesmo
+    dispositivo devem chegar em ordem (como no `Runner` com `by_channel`);
+    dispositivos diferentes podem ser avaliados em threads diferentes.
+
+    Args:
+        rules: Regras compiladas ou textos aceitos por `compile_rule`.
+    """
+
+    def __init__(self, rules: Iterable[Rule | str]):
+        self.rules = [compile_rule(rule) if isinstance(rule, str) else rule for rule in rules]
+        self.evaluated = 0
+        self.fired = 0
+        self._states: dict[tuple, list[list]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, text: str) -> RuleEngine:
+        return cls(parse_rules(text))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _device_states(self, key: tuple) -> list[list]:
+        states = self._states.get(key)
+        if states is None:
+            with self._lock:
+                states = self._states.setdefault(key, [rule.new_state() for rule in self.rules])
+        return states
+
+    def evaluate(self, values: Values) -> list[Events]:
+        """Atualiza o estado do dispositivo com a leitura e retorna os eventos gerados."""
+        self.evaluated += 1
+        states = self._device_states((values.channel_id, values.device_name))
+        epoch = None
+        events = []
+        for rule, state in zip(self.rules, states):
+            value = getattr(values, rule.field)
+            if value is None or value != value:
+                continue
+            if epoch is None:
+                epoch = values.epoch
+            result = rule.update(state, epoch, value)
+            if result is not None:
+                flag, description = result
+                events.append(
+                    Events(
+                        event_type=EVENT_RULE,
+                        event_text=f"{values.device_name}: {flag}\n{description}",
+                        event_flag=flag,
+                        time=values.time,
+                        timezone_offset=values.timezone_offset,
+                        channel_id=values.channel_id,
+                        channel_name=values.channel_name,
+                        message_id=values.message_id,
+                        bot_id=values.bot_id,
+                        bot_name=values.bot_name,
+                        device_id=values.device_id,
+                        device_name=values.device_name,
+                    )
+                )
+        if events:
+            self.fired += len(events)
+        return events
+
+    def reset(self):
+        """Descarta o estado de todos os dispositivos."""
+        with self._lock:
+            self._states.clear()
+
+    def stats(self) -> dict:
+        return {"rules": len(self.rules), "devices": len(self._states), "evaluated": self.evaluated, "fired": self.fired}
+
+
+__all__ = [
+    "Rule",
+    "Threshold",
+    "Average",
+    "Rate",
+    "Change",
+    "RuleEngine",
+    "compile_rule",
+    "parse_rules",
+    "rule_of",
+]
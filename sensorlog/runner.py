@@ -0,0 +1,251 @@
+"""
+Execução concorrente dos handlers do bot.
+
+`Runner` substitui `TeleBot.infinity_polling`: a thread de polling apenas busca
+as atualizações, aplica o filtro e distribui as mensagens entre filas de
+trabalho. Cada mensagem vai sempre para a mesma fila conforme sua chave (canal,
+por padrão), o que preserva a ordem por canal enquanto canais diferentes são
+processados em paralelo.
+
+Com um `Deduplicator`, mensagens já vistas (reentregas do Telegram ou reinícios
+sem `skip_pending`) são descartadas na thread de polling, antes de qualquer
+decodificação ou gravação.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Hashable, Optional
+
+from . import metrics
+from .core import _normalize_lines, _scan_header
+from .dedup import Deduplicator
+
+if TYPE_CHECKING:
+    from telebot import TeleBot, types
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+UPDATES = metrics.counter("sensorlog_updates_total", "Mensagens de canal recebidas pelo polling, por destino.", ("result",))
+QUEUE_WAIT = metrics.histogram("sensorlog_queue_wait_seconds", "Tempo entre o recebimento e o início do handler.")
+HANDLER = metrics.histogram("sensorlog_handler_seconds", "Duração do handler (decodificação e envio aos destinos).")
+HANDLER_ERRORS = metrics.counter("sensorlog_handler_errors_total", "Handlers que terminaram com exceção.")
+QUEUE_DEPTH = metrics.gauge("sensorlog_queue_depth", "Mensagens aguardando em cada fila do Runner.", ("worker",))
+_RECEIVED = UPDATES.labels("received")
+_FILTERED = UPDATES.labels("filtered")
+_DUPLICATE = UPDATES.labels("duplicate")
+_QUEUED = UPDATES.labels("queued")
+
+
+def by_channel(message: types.Message) -> Hashable:
+    """Chave de ordenação por canal."""
+    return message.chat.id
+
+
+def by_device(message: types.Message) -> Hashable:
+    """Chave de ordenação por dispositivo (cabeçalho `Nome:`), com o canal como alternativa."""
+    header = _scan_header(_normalize_lines(message.text or ""))
+    if header is not None:
+        return message.chat.id, header[0]
+    return message.chat.id
+
+
+class Latency:
+    """Acumula a latência de uma etapa (contagem, média e máximo, em segundos)."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def merge(self, other: "Latency"):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def as_dict(self) -> dict:
+        average = self.total / self.count if self.count else 0.0
+        return {"count": self.count, "avg_ms": average * 1000, "max_ms": self.max * 1000}
+
+
+class _Shard:
+    __slots__ = ("queue", "thread", "wait", "handle", "errors")
+
+    def __init__(self, queue_size: int):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.thread: Optional[threading.Thread] = None
+        self.wait = Latency()
+        self.handle = Latency()
+        self.errors = 0
+
+
+class Runner:
+    """
+    Polling do Telegram com um conjunto de workers ordenados por chave.
+
+    Args:
+        bot (TeleBot): Instância usada para buscar as atualizações.
+        handler (Callable): Função chamada com cada `types.Message` aceita.
+        func (Callable | None): Filtro aplicado antes de enfileirar (como em `channel_post_handler`).
+        workers (int): Quantidade de filas/threads de processamento.
+        queue_size (int): Limite de cada fila; com a fila cheia o polling aguarda.
+        key (Callable): Define a ordenação: mensagens com a mesma chave são tratadas em ordem.
+        report_interval (float): Intervalo, em segundos, do log de estatísticas (0 desativa).
+        dedup (Deduplicator | None): Descarta mensagens já processadas. A marca por canal
+            pressupõe ordem por canal, portanto deve ser usado com `key=by_channel`.
+    """
+
+    def __init__(
+        self,
+        bot: TeleBot,
+        handler: Callable[[types.Message], None],
+        func: Optional[Callable[[types.Message], bool]] = None,
+        workers: int = 4,
+        queue_size: int = 1000,
+        key: Callable[[types.Message], Hashable] = by_channel,
+        report_interval: float = 60.0,
+        dedup: Optional[Deduplicator] = None,
+    ):
+        self.bot = bot
+        self.handler = handler
+        self.func = func
+        self.key = key
+        self.report_interval = report_interval
+        self.dedup = dedup
+        self.poll = Latency()
+        self._shards = [_Shard(queue_size) for _ in range(workers)]
+        for index, shard in enumerate(self._shards):
+            QUEUE_DEPTH.labels(index).set_function(shard.queue.qsize)
+        self._stop = threading.Event()
+        self._started = False
+
+    def start(self):
+        """Inicia as threads de processamento (chamado por `infinity_polling`)."""
+        if self._started:
+            return
+        self._started = True
+        for index, shard in enumerate(self._shards):
+            shard.thread = threading.Thread(
+                target=self._work, args=(shard,), name=f"sensorlog-worker-{index}", daemon=True
+            )
+            shard.thread.start()
+
+    def submit(self, message: types.Message) -> bool:
+        """Filtra e enfileira uma mensagem; retorna False se ela foi descartada pelo filtro ou repetida."""
+        _RECEIVED.inc()
+        if self.func is not None and not self.func(message):
+            _FILTERED.inc()
+            return False
+        if self.dedup is not None and not self.dedup.admit(message.chat.id, message.message_id):
+            _DUPLICATE.inc()
+            return False
+        shard = self._shards[hash(self.key(message)) % len(self._shards)]
+        shard.queue.put((time.monotonic(), message))
+        _QUEUED.inc()
+        return True
+
+    def infinity_polling(self, skip_pending: bool = False, timeout: int = 20, long_polling_timeout: int = 20):
+        """Busca atualizações até `stop()` ou interrupção; ao sair, processa o que já foi enfileirado."""
+        self.start()
+        offset = self._skip_pending() if skip_pending else None
+        next_report = time.monotonic() + self.report_interval
+        errors = 0
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    updates = self.bot.get_updates(
+                        offset=offset,
+                        timeout=timeout,
+                        allowed_updates=["channel_post"],
+                        long_polling_timeout=long_polling_timeout,
+                    )
+                    errors = 0
+                except Exception as e:
+                    errors += 1
+                    delay = min(2**errors, 60)
+                    logger.error(f"Erro ao buscar atualizações: {e}; nova tentativa em {delay}s")
+                    self._stop.wait(delay)
+                    continue
+                self.poll.add(time.monotonic() - started)
+                for update in updates:
+                    offset = update.update_id + 1
+                    if update.channel_post is not None:
+                        self.submit(update.channel_post)
+                if self.report_interval and time.monotonic() >= next_report:
+                    logger.info("Estatísticas do processamento: %s", self.stats())
+                    next_report = time.monotonic() + self.report_interval
+        finally:
+            self.close()
+
+    def stop(self):
+        """Sinaliza o fim do polling (seguro para chamar de outra thread)."""
+        self._stop.set()
+
+    def close(self):
+        """Processa as mensagens pendentes e encerra as threads."""
+        self._stop.set()
+        for shard in self._shards:
+            if shard.thread is not None and shard.thread.is_alive():
+                shard.queue.put(_STOP)
+        for shard in self._shards:
+            if shard.thread is not None:
+                shard.thread.join()
+        if self.dedup is not None:
+            self.dedup.close()
+
+    def stats(self) -> dict:
+        """Profundidade das filas e latência por etapa (polling, espera na fila, handler)."""
+        wait, handle = Latency(), Latency()
+        for shard in self._shards:
+            wait.merge(shard.wait)
+            handle.merge(shard.handle)
+        return {
+            "queue_depth": [shard.queue.qsize() for shard in self._shards],
+            "errors": sum(shard.errors for shard in self._shards),
+            "duplicates": self.dedup.duplicates if self.dedup is not None else 0,
+            "poll": self.poll.as_dict(),
+            "wait": wait.as_dict(),
+            "handle": handle.as_dict(),
+        }
+
+    def _skip_pending(self) -> Optional[int]:
+        updates = self.bot.get_updates(offset=-1, timeout=1, long_polling_timeout=1)
+        return updates[-1].update_id + 1 if updates else None
+
+    def _work(self, shard: _Shard):
+        while True:
+            item = shard.queue.get()
+            if item is _STOP:
+                return
+            enqueued, message = item
+            started = time.monotonic()
+            shard.wait.add(started - enqueued)
+            QUEUE_WAIT.observe(started - enqueued)
+            try:
+                self.handler(message)
+                if self.dedup is not None:
+                    self.dedup.commit(message.chat.id, message.message_id)
+            except Exception as e:
+                shard.errors += 1
+                HANDLER_ERRORS.inc()
+                logger.error(f"Erro ao manipular mensagem do canal: {e}")
+            elapsed = time.monotonic() - started
+            shard.handle.add(elapsed)
+            HANDLER.observe(elapsed)
+
+
+__all__ = ["Runner", "Latency", "by_channel", "by_device"]
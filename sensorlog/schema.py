@@ -0,0 +1,468 @@
+"""
+Esquema versionado do banco SQLite.
+
+Versão 0 é o esquema original de `create_db.py`: tabelas `events` e
+`sensor_values` sem índices, com `time` gravado como texto e os nomes de canal,
+bot e dispositivo repetidos em todas as linhas.
+
+Versão 1 (`SCHEMA_VERSION`):
+
+- tabelas de dimensão `channels`, `bots` e `devices`;
+- `sensor_readings` e `sensor_events` com `time` em segundos desde a época (UTC)
+  e índice em `(device_id, time)`;
+- opcionalmente, uma tabela de leituras por mês (`sensor_readings_AAAAMM`),
+  reunidas pela visão `sensor_readings`;
+- visões `sensor_values` e `events` com as colunas do esquema original, para
+  que consultas existentes continuem funcionando.
+
+A versão fica em `PRAGMA user_version`. `SQLiteWriter` detecta a versão 1 e
+converte as linhas no formato antigo (as mesmas de `insert_into_db`) por meio de
+`Schema.insert`.
+"""
+
+from __future__ import annotations
+
+import calendar
+import logging
+import sqlite3
+import time as _time
+from datetime import datetime
+from typing import Iterable, Optional, Sequence
+
+from .core import _VALUE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+READINGS_TABLE = "sensor_readings"
+EVENTS_TABLE = "sensor_events"
+PARTITION_PREFIX = READINGS_TABLE + "_"
+
+VALUE_FIELDS = _VALUE_FIELDS
+READING_COLUMNS = ("device_id", "time", "timezone_offset", "bot_id", "message_id") + VALUE_FIELDS
+EVENT_COLUMNS = ("device_id", "time", "timezone_offset", "bot_id", "message_id", "type", "flag", "text")
+
+# Colunas das tabelas originais, expostas pelas visões de compatibilidade.
+LEGACY_VALUE_FIELDS = tuple(field for field in VALUE_FIELDS if field not in ("speed1", "speed2"))
+
+_INTEGER_FIELDS = {"snr", "rssi", "snr_gw", "rssi_gw", "speed1", "speed2", "counter", "digital_input"}
+
+DIMENSIONS_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS schema_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS channels (
+        id INTEGER PRIMARY KEY,
+        name TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bots (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS devices (
+        id INTEGER PRIMARY KEY,
+        channel_id INTEGER NOT NULL DEFAULT 0,
+        name TEXT NOT NULL,
+        UNIQUE (channel_id, name)
+    )
+    """,
+)
+
+EVENTS_SQL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {EVENTS_TABLE} (
+        device_id INTEGER NOT NULL REFERENCES devices (id),
+        time INTEGER NOT NULL,
+        timezone_offset INTEGER,
+        bot_id INTEGER REFERENCES bots (id),
+        message_id INTEGER,
+        type INTEGER,
+        flag TEXT,
+        text TEXT
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS {EVENTS_TABLE}_device_time ON {EVENTS_TABLE} (device_id, time)",
+)
+
+
+def _readings_sql(table: str) -> tuple[str, str]:
+    columns = ",\n        ".join(
+        f"{field} {'INTEGER' if field in _INTEGER_FIELDS else 'REAL'}" for field in VALUE_FIELDS
+    )
+    return (
+        f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        device_id INTEGER NOT NULL REFERENCES devices (id),
+        time INTEGER NOT NULL,
+        timezone_offset INTEGER,
+        bot_id INTEGER REFERENCES bots (id),
+        message_id INTEGER,
+        {columns}
+    )
+    """,
+        f"CREATE INDEX IF NOT EXISTS {table}_device_time ON {table} (device_id, time)",
+    )
+
+
+def _legacy_view_sql(view: str, source: str, fields: Sequence[str]) -> str:
+    selected = ", ".join(f"r.{field}" for field in fields)
+    return f"""
+    CREATE VIEW IF NOT EXISTS {view} AS
+    SELECT
+        datetime(r.time, 'unixepoch', 'localtime') AS time,
+        r.timezone_offset,
+        NULLIF(d.channel_id, 0) AS channel_id,
+        c.name AS channel_name,
+        b.name AS bot_name,
+        d.name AS device_name,
+        {selected}
+    FROM {source} AS r
+    JOIN devices AS d ON d.id = r.device_id
+    LEFT JOIN channels AS c ON c.id = d.channel_id
+    LEFT JOIN bots AS b ON b.id = r.bot_id
+    """
+
+
+def partition_name(epoch: int) -> str:
+    """Tabela mensal (UTC) que guarda a leitura de horário `epoch`."""
+    moment = _time.gmtime(epoch)
+    return f"{PARTITION_PREFIX}{moment.tm_year:04d}{moment.tm_mon:02d}"
+
+
+def partition_bounds(name: str) -> tuple[int, int]:
+    """Intervalo `[início, fim)` em segundos da época coberto pela partição `name`."""
+    suffix = name[len(PARTITION_PREFIX) :]
+    year, month = int(suffix[:4]), int(suffix[4:])
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return calendar.timegm((year, month, 1, 0, 0, 0)), calendar.timegm((next_year, next_month, 1, 0, 0, 0))
+
+
+def to_epoch(value) -> Optional[int]:
+    """Converte `datetime` (ingênuo = horário local), número ou texto ISO em segundos da época."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def list_partitions(conn: sqlite3.Connection) -> list[str]:
+    """Partições mensais existentes, em ordem cronológica."""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+        (PARTITION_PREFIX + "[0-9][0-9][0-9][0-9][0-9][0-9]",),
+    )
+    return sorted(name for (name,) in rows)
+
+
+def is_partitioned(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT value FROM schema_meta WHERE key = 'partitioned'").fetchone()
+    return row is not None and row[0] == "1"
+
+
+def _rebuild_readings_view(conn: sqlite3.Connection, partitions: Iterable[str]):
+    columns = ", ".join(READING_COLUMNS)
+    selects = [f"SELECT {columns} FROM {name}" for name in partitions]
+    if not selects:
+        selects = [f"SELECT {', '.join(f'NULL AS {column}' for column in READING_COLUMNS)} WHERE 0"]
+    conn.execute(f"DROP VIEW IF EXISTS {READINGS_TABLE}")
+    conn.execute(f"CREATE VIEW {READINGS_TABLE} AS " + " UNION ALL ".join(selects))
+
+
+def create_schema(conn: sqlite3.Connection, partitioned: bool = False):
+    """
+    Cria o esquema da versão `SCHEMA_VERSION` em um banco vazio.
+
+    Bancos que já estão na versão atual não são alterados; bancos com as
+    tabelas originais devem passar por `migrate`.
+
+    Args:
+        conn (sqlite3.Connection): Conexão com o banco.
+        partitioned (bool): Grava as leituras em uma tabela por mês.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return
+    legacy = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('sensor_values', 'events')"
+    ).fetchone()[0]
+    if legacy:
+        raise ValueError("O banco usa o esquema original; execute migrate_db.py para convertê-lo")
+    _create_schema(conn, partitioned)
+    conn.commit()
+
+
+def _create_schema(conn: sqlite3.Connection, partitioned: bool):
+    for sql in DIMENSIONS_SQL + EVENTS_SQL:
+        conn.execute(sql)
+    conn.execute(
+        "INSERT OR REPLACE INTO schema_meta (key, value) VALUES ('partitioned', ?)",
+        ("1" if partitioned else "0",),
+    )
+    if partitioned:
+        _rebuild_readings_view(conn, list_partitions(conn))
+    else:
+        for sql in _readings_sql(READINGS_TABLE):
+            conn.execute(sql)
+    conn.execute(_legacy_view_sql("sensor_values", READINGS_TABLE, LEGACY_VALUE_FIELDS))
+    conn.execute(_legacy_view_sql("events", EVENTS_TABLE, ("type", "flag", "text")))
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _pick(row: Sequence, index: Optional[int]):
+    return None if index is None else row[index]
+
+
+class Schema:
+    """
+    Gravação no esquema versão 1 a partir de linhas no formato antigo.
+
+    Mantém em memória os identificadores de canais, bots e dispositivos já
+    vistos e as partições existentes; use uma instância por conexão.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.partitioned = is_partitioned(conn)
+        self._channels: dict[int, Optional[str]] = {}
+        self._bots: dict[str, int] = {}
+        self._devices: dict[tuple[int, str], int] = {}
+        self._partitions = set(list_partitions(conn)) if self.partitioned else set()
+        self._layouts: dict[tuple, tuple] = {}
+        # Importado aqui porque `sensorlog.rollup` depende deste módulo.
+        from .rollup import Rollups
+
+        self.rollups = Rollups.load(conn)
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> Optional[Schema]:
+        """Retorna um `Schema` se o banco já estiver na versão 1, senão `None`."""
+        return cls(conn) if schema_version(conn) >= SCHEMA_VERSION else None
+
+    def maintain(self):
+        """Aplica a retenção configurada em `sensorlog.rollup` (no máximo uma vez por intervalo)."""
+        if self.rollups is not None and self.rollups.maybe_prune(self.conn):
+            self._partitions = set(list_partitions(self.conn)) if self.partitioned else set()
+
+    def forget(self):
+        """Descarta os identificadores em memória (após um rollback)."""
+        self._channels.clear()
+        self._bots.clear()
+        self._devices.clear()
+        self._partitions = set(list_partitions(self.conn)) if self.partitioned else set()
+
+    def device_id(self, channel_id: Optional[int], channel_name: Optional[str], device_name: Optional[str]) -> int:
+        channel_id = channel_id or 0
+        if channel_id and self._channels.get(channel_id, 0) != channel_name:
+            self.conn.execute(
+                "INSERT INTO channels (id, name) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET name = excluded.name",
+                (channel_id, channel_name),
+            )
+            self._channels[channel_id] = channel_name
+        key = (channel_id, device_name or "")
+        device = self._devices.get(key)
+        if device is None:
+            self.conn.execute("INSERT OR IGNORE INTO devices (channel_id, name) VALUES (?, ?)", key)
+            device = self.conn.execute("SELECT id FROM devices WHERE channel_id = ? AND name = ?", key).fetchone()[0]
+            self._devices[key] = device
+        return device
+
+    def bot_id(self, name: Optional[str]) -> Optional[int]:
+        if name is None:
+            return None
+        bot = self._bots.get(name)
+        if bot is None:
+            self.conn.execute("INSERT OR IGNORE INTO bots (name) VALUES (?)", (name,))
+            bot = self.conn.execute("SELECT id FROM bots WHERE name = ?", (name,)).fetchone()[0]
+            self._bots[name] = bot
+        return bot
+
+    def readings_table(self, epoch: int) -> str:
+        """Tabela de destino da leitura, criando a partição do mês se necessário."""
+        if not self.partitioned:
+            return READINGS_TABLE
+        name = partition_name(epoch)
+        if name not in self._partitions:
+            for sql in _readings_sql(name):
+                self.conn.execute(sql)
+            self._partitions.add(name)
+            _rebuild_readings_view(self.conn, sorted(self._partitions))
+        return name
+
+    def _layout(self, columns: tuple[str, ...], targets: tuple[str, ...]) -> tuple:
+        key = (columns, targets)
+        layout = self._layouts.get(key)
+        if layout is None:
+            position = {column: index for index, column in enumerate(columns)}
+            layout = self._layouts[key] = (
+                tuple(position.get(column) for column in targets),
+                tuple(position.get(column) for column in ("time", "channel_id", "channel_name", "device_name", "bot_name")),
+            )
+        return layout
+
+    def insert(self, table: str, columns: tuple[str, ...], rows: Sequence[Sequence]) -> bool:
+        """
+        Grava linhas destinadas às tabelas antigas `sensor_values` ou `events`.
+
+        Returns:
+            bool: `False` se `table` não for uma das tabelas antigas (nada é gravado).
+        """
+        if table == "sensor_values":
+            targets = READING_COLUMNS
+        elif table == "events":
+            targets = EVENT_COLUMNS
+        else:
+            return False
+        positions, (time_at, channel_at, channel_name_at, device_at, bot_at) = self._layout(columns, targets)
+
+        groups: dict[str, list] = {}
+        for row in rows:
+            epoch = to_epoch(row[time_at])
+            out = [None if index is None else row[index] for index in positions]
+            out[0] = self.device_id(_pick(row, channel_at), _pick(row, channel_name_at), _pick(row, device_at))
+            out[1] = epoch
+            out[3] = self.bot_id(_pick(row, bot_at))
+            destination = EVENTS_TABLE if targets is EVENT_COLUMNS else self.readings_table(epoch)
+            groups.setdefault(destination, []).append(out)
+
+        for destination, out_rows in groups.items():
+            placeholders = ", ".join("?" * len(targets))
+            self.conn.executemany(
+                f"INSERT INTO {destination} ({', '.join(targets)}) VALUES ({placeholders})", out_rows
+            )
+            if self.rollups is not None and targets is READING_COLUMNS:
+                self.rollups.update(self.conn, out_rows)
+        return True
+
+
+def _copy_legacy(conn: sqlite3.Connection, source: str, target: str, fields: Sequence[str]) -> int:
+    """Copia uma tabela antiga para `target` com SQL puro (sem passar linhas pelo Python)."""
+    selected = ", ".join(f"v.{field}" for field in fields)
+    cursor = conn.execute(
+        f"""
+        INSERT INTO {target} (device_id, time, timezone_offset, bot_id, message_id, {', '.join(fields)})
+        SELECT d.id, CAST(strftime('%s', v.time, 'utc') AS INTEGER), v.timezone_offset, b.id, NULL, {selected}
+        FROM {source} AS v
+        JOIN devices AS d ON d.channel_id = IFNULL(v.channel_id, 0) AND d.name = IFNULL(v.device_name, '')
+        LEFT JOIN bots AS b ON b.name = v.bot_name
+        WHERE strftime('%s', v.time, 'utc') IS NOT NULL
+        ORDER BY v.id
+        """
+    )
+    return cursor.rowcount
+
+
+def migrate(conn: sqlite3.Connection, partitioned: bool = False, drop_legacy: bool = False) -> dict:
+    """
+    Leva um banco da versão 0 para a versão `SCHEMA_VERSION`.
+
+    As tabelas antigas são renomeadas para `legacy_sensor_values` e
+    `legacy_events` (ou removidas com `drop_legacy`) e substituídas pelas visões
+    de compatibilidade. Linhas com `time` inválido não são copiadas.
+
+    Returns:
+        dict: Versões de origem e destino e quantidades copiadas/ignoradas por tabela.
+    """
+    version = schema_version(conn)
+    report = {"from_version": version, "to_version": SCHEMA_VERSION}
+    if version >= SCHEMA_VERSION:
+        logger.info(f"Banco já está na versão {version}; nada a migrar")
+        return report
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    legacy = [name for name in ("sensor_values", "events") if name in tables]
+
+    conn.isolation_level = None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for name in legacy:
+            conn.execute(f"ALTER TABLE {name} RENAME TO legacy_{name}")
+        for sql in DIMENSIONS_SQL + EVENTS_SQL:
+            conn.execute(sql)
+
+        for name in legacy:
+            source = f"legacy_{name}"
+            conn.execute(
+                f"""
+                INSERT INTO channels (id, name)
+                SELECT channel_id, channel_name FROM {source} WHERE channel_id IS NOT NULL ORDER BY id
+                ON CONFLICT (id) DO UPDATE SET name = excluded.name
+                """
+            )
+            conn.execute(f"INSERT OR IGNORE INTO bots (name) SELECT DISTINCT bot_name FROM {source} WHERE bot_name IS NOT NULL")
+            conn.execute(
+                f"INSERT OR IGNORE INTO devices (channel_id, name) "
+                f"SELECT DISTINCT IFNULL(channel_id, 0), IFNULL(device_name, '') FROM {source}"
+            )
+
+        if "sensor_values" in legacy:
+            staging = READINGS_TABLE + "_staging" if partitioned else READINGS_TABLE
+            conn.execute(_readings_sql(staging)[0])
+            copied = _copy_legacy(conn, "legacy_sensor_values", staging, LEGACY_VALUE_FIELDS)
+            total = conn.execute("SELECT COUNT(*) FROM legacy_sensor_values").fetchone()[0]
+            report["sensor_values"] = {"copied": copied, "skipped": total - copied}
+            if partitioned:
+                months = conn.execute(
+                    f"SELECT DISTINCT strftime('%Y%m', time, 'unixepoch') FROM {staging} ORDER BY 1"
+                ).fetchall()
+                for (month,) in months:
+                    name = PARTITION_PREFIX + month
+                    conn.execute(_readings_sql(name)[0])
+                    start, end = partition_bounds(name)
+                    conn.execute(
+                        f"INSERT INTO {name} SELECT * FROM {staging} WHERE time >= ? AND time < ? ORDER BY device_id, time",
+                        (start, end),
+                    )
+                    conn.execute(_readings_sql(name)[1])
+                conn.execute(f"DROP TABLE {staging}")
+
+        if "events" in legacy:
+            copied = _copy_legacy(conn, "legacy_events", EVENTS_TABLE, ("type", "flag", "text"))
+            total = conn.execute("SELECT COUNT(*) FROM legacy_events").fetchone()[0]
+            report["events"] = {"copied": copied, "skipped": total - copied}
+
+        if drop_legacy:
+            for name in legacy:
+                conn.execute(f"DROP TABLE legacy_{name}")
+        # Os índices são criados aqui, após a cópia: uma ordenação em vez de
+        # milhões de inserções fora de ordem.
+        _create_schema(conn, partitioned)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.isolation_level = ""
+    return report
+
+
+__all__ = [
+    "SCHEMA_VERSION",
+    "READINGS_TABLE",
+    "EVENTS_TABLE",
+    "READING_COLUMNS",
+    "EVENT_COLUMNS",
+    "VALUE_FIELDS",
+    "Schema",
+    "create_schema",
+    "migrate",
+    "schema_version",
+    "is_partitioned",
+    "list_partitions",
+    "partition_name",
+    "partition_bounds",
+    "to_epoch",
+]
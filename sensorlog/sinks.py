@@ -0,0 +1,197 @@
+"""
+Destinos prontos para o `Pipeline`: console, HTTP, SQLite e WhatsApp (CallMeBot).
+
+Cada destino reproduz o comportamento do script de exemplo correspondente
+(`basic.py`, `http_post.py`, `SQLite_insert.py`, `whatsapp.py`).
+"""
+
+from __future__ import annotations
+
+import logging
+from itertools import repeat
+from typing import Optional
+
+from .alerts import CALLMEBOT_API_URL, AlertDispatcher, CallMeBotClient
+from .batch import Batch
+from .core import _VALUE_FIELDS, EVENT_COMMUNICATION, EVENT_LEVEL, EVENT_RULE, Events, Values
+from .forwarder import HttpForwarder, JsonCodec, new_session
+from .pipeline import Sink
+from .state import DeviceStateCache
+from .storage import SQLiteWriter
+
+logger = logging.getLogger(__name__)
+
+
+def event_row(event: Events) -> dict:
+    """Colunas da tabela `events` como dicionário (os destinos usam `as_tuple` diretamente)."""
+    return dict(zip(Events.COLUMNS, event.as_tuple()))
+
+
+def values_row(values: Values) -> dict:
+    """Colunas da tabela `sensor_values` como dicionário (os destinos usam `as_tuple` diretamente)."""
+    return dict(zip(Values.COLUMNS, values.as_tuple()))
+
+
+class ConsoleSink(Sink):
+    """Imprime leituras e eventos no console, como `basic.py`."""
+
+    name = "console"
+
+    def on_values(self, values: Values):
+        print(f"Valores de sensores recebidos:\n{values}")
+
+    def on_event(self, event: Events):
+        if event.type == EVENT_LEVEL:
+            print(f"Evento de nível:\n{event}")
+        elif event.type == EVENT_COMMUNICATION:
+            print(f"Evento de comunicação:\n{event}")
+        elif event.type == EVENT_RULE:
+            print(f"Evento de regra:\n{event}")
+        else:
+            print(f"Evento desconhecido:\n{event}")
+
+
+class HttpSink(Sink):
+    """Encaminha leituras e eventos por HTTP/POST, como `http_post.py`."""
+
+    name = "http"
+
+    def __init__(
+        self,
+        event_url: str,
+        values_url: str,
+        event_bulk_url: Optional[str] = None,
+        values_bulk_url: Optional[str] = None,
+        workers: int = 4,
+        codec=JsonCodec,
+    ):
+        session = new_session(2 * workers)
+        self.events = HttpForwarder(event_url, event_bulk_url, workers=workers, session=session, codec=codec)
+        self.values = HttpForwarder(values_url, values_bulk_url, workers=workers, session=session, codec=codec)
+        self._undelivered = 0
+
+    def on_values(self, values: Values):
+        self.values.send(values)
+
+    def on_event(self, event: Events):
+        self.events.send(event)
+
+    def flush(self):
+        """
+        Aguarda os envios pendentes.
+
+        Raises:
+            RuntimeError: Se algum registro recebido desde o último `flush` falhou após
+                as novas tentativas ou foi descartado com a fila cheia.
+        """
+        self.events.flush()
+        self.values.flush()
+        undelivered = sum(forwarder.failed + forwarder.dropped for forwarder in (self.events, self.values))
+        lost, self._undelivered = undelivered - self._undelivered, undelivered
+        if lost:
+            raise RuntimeError(f"{lost} registro(s) não entregue(s) a {self.values.url} / {self.events.url}")
+
+    def close(self):
+        self.events.close()
+        self.values.close()
+
+
+class SQLiteSink(Sink):
+    """
+    Grava leituras e eventos em lote no SQLite, como `SQLite_insert.py`.
+
+    Com `writer`, usa um `SQLiteWriter` já aberto (por exemplo, o do `http_server.py`)
+    em vez de criar outro para `db_name`.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_name: str, writer: Optional[SQLiteWriter] = None, **writer_options):
+        self.writer = writer if writer is not None else SQLiteWriter(db_name, **writer_options)
+
+    def on_values(self, values: Values):
+        self.writer.write("sensor_values", Values.COLUMNS, values.as_tuple())
+
+    def on_event(self, event: Events):
+        self.writer.write("events", Events.COLUMNS, event.as_tuple())
+
+    def on_batch(self, batch: Batch):
+        """Grava um `Batch` colunar inteiro (os `NaN` viram NULL no SQLite)."""
+        channel_names = batch.channel_names
+        rows = list(
+            zip(
+                batch.time,
+                repeat(0.0),
+                batch.channel_id,
+                [channel_names[channel_id] for channel_id in batch.channel_id],
+                batch.message_id,
+                [batch.bot_names[code] for code in batch.bot_code],
+                [batch.device_names[code] for code in batch.device_code],
+                *(batch.columns[field] for field in _VALUE_FIELDS),
+            )
+        )
+        if rows:
+            self.writer.write_many("sensor_values", Values.COLUMNS, rows)
+        for event in batch.events:
+            self.on_event(event)
+
+    def flush(self):
+        # Levanta `sqlite3.Error` se alguma linha enfileirada até aqui não foi gravada.
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class StateSink(Sink):
+    """Mantém um `DeviceStateCache` com o estado mais recente de cada dispositivo."""
+
+    name = "state"
+
+    def __init__(self, cache: Optional[DeviceStateCache] = None, snapshot_path: Optional[str] = None, interval: float = 60.0):
+        self.snapshot_path = snapshot_path
+        self.cache = cache if cache is not None else DeviceStateCache.restore(snapshot_path)
+        if snapshot_path:
+            self.cache.start_snapshots(snapshot_path, interval)
+
+    def on_values(self, values: Values):
+        self.cache.on_values(values)
+
+    def on_event(self, event: Events):
+        self.cache.on_event(event)
+
+    def close(self):
+        self.cache.close(self.snapshot_path)
+
+
+class WhatsAppSink(Sink):
+    """
+    Envia eventos para o WhatsApp via CallMeBot, como `whatsapp.py`, através de
+    um `AlertDispatcher` (agrupamento por dispositivo e limite de taxa).
+    """
+
+    name = "whatsapp"
+
+    def __init__(
+        self, phone: str, api_key: str, url: str = CALLMEBOT_API_URL, timeout: float = 10, **dispatcher_options
+    ):
+        self.dispatcher = AlertDispatcher(CallMeBotClient(phone, api_key, url, timeout), **dispatcher_options)
+
+    def on_event(self, event: Events):
+        self.dispatcher.submit(event)
+
+    def close(self):
+        self.dispatcher.close()
+        logger.info(f"Estatísticas dos alertas: {self.dispatcher.stats()}")
+
+
+__all__ = [
+    "ConsoleSink",
+    "HttpSink",
+    "SQLiteSink",
+    "StateSink",
+    "WhatsAppSink",
+    "event_row",
+    "values_row",
+    "CALLMEBOT_API_URL",
+]
@@ -0,0 +1,423 @@
+"""
+Spool em disco: registro somente de acréscimo dos `Values`/`Events` decodificados.
+
+O `Pipeline` grava cada registro no spool antes de qualquer destino tocá-lo, e
+cada destino lê o spool no seu próprio ritmo, a partir de um offset persistido.
+Um destino lento não atrasa o recebimento, e um registro aceito pelo spool não
+se perde se o processo cair antes de chegar ao SQLite ou ao servidor HTTP.
+
+Formato: segmentos `<diretório>/<offset inicial>.seg`, cada um com quadros
+
+    I tamanho | I CRC-32 | d horário da gravação | registro (`sensorlog.wire`)
+
+(o CRC-32 cobre o horário e o registro).
+
+Offsets são posições em bytes no fluxo contínuo dos segmentos. Um novo segmento
+é aberto quando o atual passa de `segment_size`. Cada consumidor grava o
+próximo offset a ler em `<diretório>/<nome>.offset`; segmentos já lidos por todos
+os consumidores são removidos.
+
+Durabilidade: `append` escreve direto no arquivo (`os.write`), então um
+registro aceito sobrevive à queda do processo. O `fsync`, que protege contra
+queda de energia, é feito em lote por uma thread a cada `sync_interval` segundos
+(`sync_interval=0` faz `fsync` a cada gravação). Na abertura, um quadro
+incompleto ou corrompido no fim do último segmento é descartado.
+
+A entrega é "pelo menos uma vez": o consumidor confirma o offset depois de
+`Sink.flush()`, e os registros lidos após a última confirmação são entregues de
+novo no reinício.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from typing import Iterable, NamedTuple, Optional
+
+from . import metrics, wire
+from .core import Events, Values
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+SEGMENT_SUFFIX = ".seg"
+OFFSET_SUFFIX = ".offset"
+LOCK_FILE = "spool.lock"
+
+_FRAME = struct.Struct("<IId")
+# O CRC cobre o horário da gravação e o registro (tudo após os dois primeiros campos).
+_CHECKED = 8
+
+SPOOL_RECORDS = metrics.counter("sensorlog_spool_records_total", "Registros gravados no spool.")
+SPOOL_FSYNC = metrics.histogram("sensorlog_spool_fsync_seconds", "Duração de cada fsync do spool.")
+SPOOL_LAG = metrics.gauge("sensorlog_spool_lag_bytes", "Bytes do spool ainda não confirmados, por consumidor.", ("consumer",))
+
+
+class SpoolRecord(NamedTuple):
+    """Registro lido do spool; `offset` é a posição logo após ele (o valor a confirmar)."""
+
+    offset: int
+    appended: float
+    record: Values | Events
+
+
+def _segment_name(start: int) -> str:
+    return f"{start:020d}{SEGMENT_SUFFIX}"
+
+
+def _frame(record: Values | Events, appended: float) -> bytes:
+    payload = wire.encode(record)
+    checked = _FRAME.pack(0, 0, appended)[_CHECKED:] + payload
+    return _FRAME.pack(len(payload), zlib.crc32(checked), appended) + payload
+
+
+def _valid_length(data: bytes) -> int:
+    """Bytes de `data` ocupados por quadros completos e íntegros, a partir do início."""
+    position = 0
+    end = len(data)
+    with memoryview(data) as view:
+        while end - position >= _FRAME.size:
+            size, crc, _ = _FRAME.unpack_from(view, position)
+            stop = position + _FRAME.size + size
+            if stop > end or zlib.crc32(view[position + _CHECKED : stop]) != crc:
+                break
+            position = stop
+    return position
+
+
+class Spool:
+    """
+    Registro de acréscimo em segmentos, seguro entre threads.
+
+    Args:
+        directory (str): Diretório dos segmentos e offsets (criado se não existir).
+        segment_size (int): Tamanho, em bytes, a partir do qual um novo segmento é aberto.
+        sync_interval (float): Intervalo máximo, em segundos, entre `fsync`s; 0 faz
+            `fsync` a cada gravação.
+
+    Raises:
+        RuntimeError: Se outro processo estiver usando o mesmo diretório.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 * 2**20, sync_interval: float = 0.2):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_interval = sync_interval
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._acquire_directory()
+        self._lock = threading.Lock()
+        self._appended = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        self._closed = False
+        self._retired: list[int] = []
+        self._segments = sorted(
+            int(name[: -len(SEGMENT_SUFFIX)]) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        if not self._segments:
+            self._segments.append(0)
+        self._size = self._recover(self._segments[-1])
+        self.end = self._segments[-1] + self._size
+        self.durable = self.end
+        self._fd = os.open(self._path(self._segments[-1]), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.prune()
+        self._syncer = None
+        if sync_interval > 0:
+            self._syncer = threading.Thread(target=self._sync_loop, name="spool-sync", daemon=True)
+            self._syncer.start()
+
+    @property
+    def start(self) -> int:
+        """Offset do registro mais antigo ainda guardado."""
+        return self._segments[0]
+
+    def append(self, record: Values | Events) -> int:
+        """Grava um registro e retorna seu offset."""
+        return self._write(_frame(record, time.time()), 1)
+
+    def append_many(self, records: Iterable[Values | Events]) -> int:
+        """Grava vários registros com uma única escrita e retorna o offset do primeiro."""
+        appended = time.time()
+        frames = [_frame(record, appended) for record in records]
+        return self._write(b"".join(frames), len(frames))
+
+    def _write(self, data: bytes, count: int) -> int:
+        with self._lock:
+            if self._closed:
+                raise ValueError("Spool fechado")
+            if self._size and self._size + len(data) > self.segment_size:
+                self._rotate()
+            offset = self.end
+            with memoryview(data) as view:
+                written = 0
+                while written < len(data):
+                    written += os.write(self._fd, view[written:])
+            self._size += len(data)
+            self.end += len(data)
+            if not self.sync_interval:
+                self._fsync(self._fd)
+                self.durable = self.end
+            self._appended.notify_all()
+        SPOOL_RECORDS.inc(count)
+        return offset
+
+    def sync(self):
+        """Força o `fsync` do que já foi gravado."""
+        with self._sync_lock:
+            with self._lock:
+                if self._closed:
+                    return
+                fd, end = self._fd, self.end
+                retired, self._retired = self._retired, []
+            for old in retired:
+                os.close(old)
+            if end > self.durable:
+                self._fsync(fd)
+                self.durable = end
+
+    def wait(self, offset: int, timeout: Optional[float] = None) -> bool:
+        """Aguarda até haver dados após `offset`; retorna `False` no timeout ou com o spool fechado."""
+        with self._appended:
+            return self._appended.wait_for(lambda: self.end > offset or self._closed, timeout) and self.end > offset
+
+    def read(self, offset: int, max_bytes: int = 2**20) -> tuple[list[SpoolRecord], int]:
+        """
+        Registros a partir de `offset`, até cerca de `max_bytes` e sem cruzar o fim
+        de um segmento. Retorna os registros e o offset seguinte.
+        """
+        with self._lock:
+            segments = self._segments
+            end = self.end
+        if offset < segments[0]:
+            logger.warning(f"Spool {self.directory}: offset {offset} já removido; continuando de {segments[0]}")
+            offset = segments[0]
+        if offset >= end:
+            return [], offset
+        index = bisect_right(segments, offset) - 1
+        start = segments[index]
+        limit = segments[index + 1] if index + 1 < len(segments) else end
+        if offset == limit:
+            return [], offset
+        with open(self._path(start), "rb") as file:
+            file.seek(offset - start)
+            data = file.read(min(limit - offset, max_bytes))
+            if len(data) >= _FRAME.size:
+                # Um único registro maior que `max_bytes` é lido inteiro.
+                size = _FRAME.size + _FRAME.unpack_from(data)[0]
+                if size > len(data):
+                    data += file.read(size - len(data))
+        records = []
+        position = 0
+        with memoryview(data) as view:
+            while len(data) - position >= _FRAME.size:
+                size, crc, appended = _FRAME.unpack_from(view, position)
+                stop = position + _FRAME.size + size
+                if stop > len(data):
+                    break
+                if zlib.crc32(view[position + _CHECKED : stop]) != crc:
+                    if records:
+                        # Entrega os quadros íntegros; o erro aparece na próxima leitura.
+                        break
+                    raise ValueError(f"Spool {self.directory}: quadro corrompido no offset {offset + position}")
+                with view[position + _FRAME.size : stop] as payload:
+                    records.append(SpoolRecord(offset + stop, appended, wire.decode(payload)))
+                position = stop
+        if not records and offset + len(data) >= limit and limit < end:
+            # Resto de segmento sem quadro completo: não deveria existir, mas não pode travar a leitura.
+            logger.error(f"Spool {self.directory}: {limit - offset} bytes ilegíveis no fim do segmento {start}")
+            return [], limit
+        return records, offset + position
+
+    def cursor(self, name: str) -> SpoolCursor:
+        """Consumidor `name`, com offset em `<directory>/<name>.offset`."""
+        return SpoolCursor(self, name)
+
+    def prune(self) -> int:
+        """
+        Remove os segmentos já confirmados por todos os consumidores (arquivos
+        `.offset` do diretório). Sem consumidores, nada é removido. Retorna a
+        quantidade de segmentos removidos.
+        """
+        offsets = [
+            _load_offset(os.path.join(self.directory, name))
+            for name in os.listdir(self.directory)
+            if name.endswith(OFFSET_SUFFIX)
+        ]
+        offsets = [offset for offset in offsets if offset is not None]
+        if not offsets:
+            return 0
+        committed = min(offsets)
+        with self._lock:
+            removable = [
+                start for start, following in zip(self._segments, self._segments[1:]) if following <= committed
+            ]
+            self._segments = self._segments[len(removable) :]
+        for start in removable:
+            try:
+                os.remove(self._path(start))
+            except OSError as e:
+                logger.error(f"Erro ao remover o segmento {start} do spool: {e}")
+        return len(removable)
+
+    def close(self):
+        """Faz o `fsync` final e fecha os arquivos; leitores em `wait` são liberados."""
+        with self._appended:
+            if self._closed:
+                return
+            self._closed = True
+            self._appended.notify_all()
+        if self._syncer is not None:
+            self._syncer.join()
+        with self._sync_lock:
+            self._fsync(self._fd)
+            self.durable = self.end
+            for fd in (*self._retired, self._fd):
+                os.close(fd)
+            self._retired = []
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+
+    def __enter__(self) -> Spool:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> dict:
+        return {"start": self.start, "end": self.end, "durable": self.durable, "segments": len(self._segments)}
+
+    def _path(self, start: int) -> str:
+        return os.path.join(self.directory, _segment_name(start))
+
+    def _acquire_directory(self) -> Optional[int]:
+        if fcntl is None:
+            return None
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise RuntimeError(f"Spool {self.directory} já está em uso por outro processo")
+        return fd
+
+    def _recover(self, start: int) -> int:
+        """Descarta um quadro incompleto no fim do segmento ativo e retorna o tamanho válido."""
+        path = self._path(start)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return 0
+        valid = _valid_length(data)
+        if valid < len(data):
+            logger.warning(f"Spool {self.directory}: {len(data) - valid} bytes incompletos descartados do fim de {path}")
+            with open(path, "r+b") as file:
+                file.truncate(valid)
+                os.fsync(file.fileno())
+        return valid
+
+    def _rotate(self):
+        # Chamado com `_lock`; o segmento anterior é selado com fsync e fechado pela thread de sync.
+        self._fsync(self._fd)
+        if self._syncer is not None:
+            self._retired.append(self._fd)
+        else:
+            os.close(self._fd)
+        self._segments = [*self._segments, self.end]
+        self._fd = os.open(self._path(self.end), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = 0
+        logger.info(f"Spool {self.directory}: novo segmento em {self.end}")
+
+    @staticmethod
+    def _fsync(fd: int):
+        started = time.perf_counter()
+        os.fsync(fd)
+        SPOOL_FSYNC.observe(time.perf_counter() - started)
+
+    def _sync_loop(self):
+        while True:
+            with self._appended:
+                self._appended.wait_for(lambda: self._closed, self.sync_interval)
+                if self._closed:
+                    return
+            try:
+                self.sync()
+            except OSError as e:
+                logger.error(f"Erro no fsync do spool {self.directory}: {e}")
+
+
+def _load_offset(path: str) -> Optional[int]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"versão {data.get('version')} não suportada")
+        return int(data["offset"])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Erro ao carregar o offset do spool de {path}: {e}")
+        return None
+
+
+class SpoolCursor:
+    """
+    Leitura de um consumidor com offset persistido.
+
+    `read` avança apenas a posição em memória; `commit` grava a posição (ou
+    `offset`) em disco. Um consumidor novo começa no registro mais antigo guardado.
+    """
+
+    def __init__(self, spool: Spool, name: str):
+        self.spool = spool
+        self.name = name
+        self.path = os.path.join(spool.directory, name + OFFSET_SUFFIX)
+        committed = _load_offset(self.path)
+        if committed is None:
+            committed = spool.start
+        elif committed > spool.end:
+            # O fim do spool não chegou ao disco (queda de energia antes do fsync).
+            logger.warning(f"Spool {spool.directory}: offset de {name} ({committed}) além do fim ({spool.end})")
+            committed = spool.end
+        self.committed = committed
+        self.position = committed
+        SPOOL_LAG.labels(name).set_function(lambda: self.spool.end - self.committed)
+
+    def read(self, timeout: Optional[float] = None, max_bytes: int = 2**20) -> list[SpoolRecord]:
+        """Próximos registros; aguarda até `timeout` segundos se não houver nenhum."""
+        if self.position >= self.spool.end and not self.spool.wait(self.position, timeout):
+            return []
+        records, self.position = self.spool.read(self.position, max_bytes)
+        return records
+
+    def commit(self, offset: Optional[int] = None):
+        """Grava `offset` (por padrão, a posição atual) como o próximo registro a ler."""
+        offset = self.position if offset is None else offset
+        if offset == self.committed:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"version": STATE_VERSION, "offset": offset}, file)
+        os.replace(temporary, self.path)
+        previous, self.committed = self.committed, offset
+        segments = self.spool._segments
+        if bisect_right(segments, previous) != bisect_right(segments, offset):
+            self.spool.prune()
+
+    @property
+    def lag(self) -> int:
+        """Bytes gravados no spool e ainda não confirmados por este consumidor."""
+        return self.spool.end - self.committed
+
+
+__all__ = ["Spool", "SpoolCursor", "SpoolRecord"]
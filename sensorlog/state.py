@@ -0,0 +1,257 @@
+"""
+Estado mais recente de cada dispositivo, em memória.
+
+`DeviceStateCache` guarda, por `(channel_id, device_name)`, o último valor
+conhecido de cada campo, o horário da última leitura, o último evento e o
+horário em que o dispositivo foi visto pela última vez. As consultas são
+acessos a dicionário e a lista completa é serializada em JSON apenas quando algo
+muda, portanto pode ser consultada continuamente sem tocar no banco.
+
+Opcionalmente, o estado é gravado em disco a intervalos regulares (`snapshot`)
+e recarregado na inicialização (`DeviceStateCache.restore`).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from .core import _VALUE_FIELDS, Events, Values
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class DeviceState:
+    """Último estado conhecido de um dispositivo."""
+
+    __slots__ = (
+        "channel_id",
+        "channel_name",
+        "device_name",
+        "bot_name",
+        "last_seen",
+        "values_time",
+        "values",
+        "event",
+    )
+
+    def __init__(self, channel_id: Optional[int], channel_name: Optional[str], device_name: str):
+        self.channel_id = channel_id
+        self.channel_name = channel_name
+        self.device_name = device_name
+        self.bot_name: Optional[str] = None
+        self.last_seen: Optional[float] = None
+        self.values_time: Optional[float] = None
+        self.values: dict[str, float | int] = {}
+        self.event: Optional[dict] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "channel_id": self.channel_id,
+            "channel_name": self.channel_name,
+            "device_name": self.device_name,
+            "bot_name": self.bot_name,
+            "last_seen": self.last_seen,
+            "values_time": self.values_time,
+            "values": dict(self.values),
+            "event": self.event,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> DeviceState:
+        state = cls(data.get("channel_id"), data.get("channel_name"), data["device_name"])
+        state.bot_name = data.get("bot_name")
+        state.last_seen = data.get("last_seen")
+        state.values_time = data.get("values_time")
+        state.values = dict(data.get("values") or {})
+        state.event = data.get("event")
+        return state
+
+
+class DeviceStateCache:
+    """
+    Tabela `(channel_id, device_name)` → `DeviceState`, segura para várias threads.
+
+    Leituras e eventos mais antigos que o estado atual (por exemplo, de uma
+    reimportação) não sobrescrevem valores mais novos.
+    """
+
+    def __init__(self):
+        self._states: dict[tuple[Optional[int], str], DeviceState] = {}
+        # Último estado criado para cada nome, para buscas sem `channel_id`.
+        self._by_name: dict[str, DeviceState] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._json_version = -1
+        self._json = b"[]"
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _state(self, channel_id, channel_name, device_name) -> DeviceState:
+        key = (channel_id, device_name)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = self._by_name[device_name] = DeviceState(channel_id, channel_name, device_name)
+        elif channel_name is not None:
+            state.channel_name = channel_name
+        return state
+
+    def update_values(
+        self,
+        time: float,
+        channel_id: Optional[int],
+        channel_name: Optional[str],
+        device_name: str,
+        bot_name: Optional[str],
+        fields: dict,
+    ):
+        """
+        Registra uma leitura; `time` em segundos desde a época e `fields` com os
+        campos de `Values` (campos `None` mantêm o valor anterior).
+        """
+        with self._lock:
+            state = self._state(channel_id, channel_name, device_name)
+            if state.last_seen is None or time >= state.last_seen:
+                state.last_seen = time
+            if state.values_time is not None and time < state.values_time:
+                return
+            state.values_time = time
+            if bot_name is not None:
+                state.bot_name = bot_name
+            for field, value in fields.items():
+                if value is not None and value == value:
+                    state.values[field] = value
+            self._version += 1
+
+    def update_event(
+        self,
+        time: float,
+        channel_id: Optional[int],
+        channel_name: Optional[str],
+        device_name: str,
+        bot_name: Optional[str],
+        type: int,
+        flag: str,
+        text: str,
+    ):
+        """Registra um evento; apenas o mais recente é mantido."""
+        with self._lock:
+            state = self._state(channel_id, channel_name, device_name)
+            if state.last_seen is None or time >= state.last_seen:
+                state.last_seen = time
+            if state.event is not None and time < state.event["time"]:
+                return
+            if bot_name is not None:
+                state.bot_name = bot_name
+            state.event = {"time": time, "type": type, "flag": flag, "text": text}
+            self._version += 1
+
+    def on_values(self, values: Values):
+        self.update_values(
+            values.epoch,
+            values.channel_id,
+            values.channel_name,
+            values.device_name,
+            values.bot_name,
+            {field: getattr(values, field) for field in _VALUE_FIELDS},
+        )
+
+    def on_event(self, event: Events):
+        self.update_event(
+            event.epoch,
+            event.channel_id,
+            event.channel_name,
+            event.device_name,
+            event.bot_name,
+            event.type,
+            event.flag,
+            event.text,
+        )
+
+    def get(self, device_name: str, channel_id: Optional[int] = None) -> Optional[DeviceState]:
+        """Estado de um dispositivo; sem `channel_id`, retorna o de qualquer canal com esse nome."""
+        state = self._states.get((channel_id, device_name))
+        if state is None and channel_id is None:
+            state = self._by_name.get(device_name)
+        return state
+
+    def states(self) -> list[DeviceState]:
+        with self._lock:
+            return list(self._states.values())
+
+    def as_dicts(self) -> list[dict]:
+        with self._lock:
+            return [state.as_dict() for state in self._states.values()]
+
+    def to_json(self) -> bytes:
+        """Lista de estados em JSON, serializada novamente apenas quando houve mudança."""
+        if self._json_version != self._version:
+            with self._lock:
+                version = self._version
+                body = json.dumps([state.as_dict() for state in self._states.values()], ensure_ascii=False)
+            self._json, self._json_version = body.encode(), version
+        return self._json
+
+    def save(self, path: str):
+        """Grava o estado em `path` de forma atômica (arquivo temporário + rename)."""
+        data = {"version": SNAPSHOT_VERSION, "devices": self.as_dicts()}
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(temporary, path)
+
+    @classmethod
+    def restore(cls, path: Optional[str]) -> DeviceStateCache:
+        """Cria um cache a partir de um snapshot; arquivo ausente ou inválido gera um cache vazio."""
+        cache = cls()
+        if not path or not os.path.exists(path):
+            return cache
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"versão {data.get('version')} não suportada")
+            for item in data["devices"]:
+                state = DeviceState.from_dict(item)
+                cache._states[(state.channel_id, state.device_name)] = state
+                cache._by_name[state.device_name] = state
+            cache._version += 1
+            logger.info(f"Estado de {len(cache)} dispositivos carregado de {path}")
+        except Exception as e:
+            logger.error(f"Erro ao carregar o estado dos dispositivos de {path}: {e}")
+        return cache
+
+    def start_snapshots(self, path: str, interval: float = 60.0):
+        """Grava o estado em `path` a cada `interval` segundos (apenas quando houve mudança)."""
+
+        def run():
+            saved = self._version
+            while not self._stop.wait(interval):
+                if self._version != saved:
+                    saved = self._version
+                    try:
+                        self.save(path)
+                    except Exception as e:
+                        logger.error(f"Erro ao gravar o estado dos dispositivos em {path}: {e}")
+
+        self._snapshot_thread = threading.Thread(target=run, name="device-state-snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def close(self, path: Optional[str] = None):
+        """Encerra os snapshots periódicos e, se `path` for informado, grava o estado final."""
+        self._stop.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if path:
+            self.save(path)
+
+
+__all__ = ["DeviceState", "DeviceStateCache", "SNAPSHOT_VERSION"]
@@ -0,0 +1,390 @@
+"""
+Persistência em SQLite com escrita em lote.
+
+`SQLiteWriter` mantém uma única conexão (modo WAL) em uma thread própria. As
+linhas são enfileiradas sem tocar no disco e gravadas com `executemany` em uma
+transação por lote, disparada pelo tamanho do lote ou por um prazo máximo.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Sequence
+
+from . import metrics
+from .schema import Schema
+
+logger = logging.getLogger(__name__)
+
+SQLITE_ROWS = metrics.counter("sensorlog_sqlite_rows_total", "Linhas gravadas pelo SQLiteWriter.")
+SQLITE_ERRORS = metrics.counter("sensorlog_sqlite_errors_total", "Transações do SQLiteWriter que falharam.")
+SQLITE_DROPPED = metrics.counter(
+    "sensorlog_sqlite_dropped_rows_total", "Linhas descartadas pelo SQLiteWriter após esgotar as novas tentativas."
+)
+SQLITE_COMMIT = metrics.histogram("sensorlog_sqlite_commit_seconds", "Duração de cada transação do SQLiteWriter.")
+SQLITE_QUEUE_DEPTH = metrics.gauge("sensorlog_sqlite_queue_depth", "Itens aguardando na fila do SQLiteWriter.", ("db",))
+
+EVENTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time DATETIME,
+    timezone_offset INTEGER,
+    channel_id INTEGER,
+    channel_name TEXT,
+    bot_name TEXT,
+    device_name TEXT,
+    type INTEGER,
+    flag TEXT,
+    text TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+SENSOR_VALUES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS sensor_values (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time DATETIME,
+    timezone_offset INTEGER,
+    channel_id INTEGER,
+    channel_name TEXT,
+    bot_name TEXT,
+    device_name TEXT,
+    level FLOAT,
+    raw_level FLOAT,
+    distance FLOAT,
+    t0 FLOAT,
+    t1 FLOAT,
+    v0 FLOAT,
+    v1 FLOAT,
+    snr INTEGER,
+    rssi INTEGER,
+    snr_gw INTEGER,
+    rssi_gw INTEGER,
+    counter INTEGER,
+    digital_input INTEGER,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def create_tables(conn: sqlite3.Connection):
+    """
+    Cria as tabelas `events` e `sensor_values` do esquema original (versão 0).
+
+    Bancos novos devem usar `sensorlog.schema.create_schema`.
+    """
+    conn.execute(EVENTS_TABLE_SQL)
+    conn.execute(SENSOR_VALUES_TABLE_SQL)
+    conn.commit()
+
+
+def connect(db_name: str) -> sqlite3.Connection:
+    """Abre uma conexão configurada para escrita contínua (WAL, fsync apenas no checkpoint)."""
+    conn = sqlite3.connect(db_name, check_same_thread=False, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class _Flush:
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[str] = None
+
+
+class _Failed:
+    """Lote cuja transação falhou, guardado para uma nova tentativa."""
+
+    __slots__ = ("groups", "count", "attempts", "due")
+
+    def __init__(self, groups: dict, count: int, due: float):
+        self.groups = groups
+        self.count = count
+        self.attempts = 1
+        self.due = due
+
+
+_STOP = object()
+# Intervalo com que `flush`, `close` e uma fila cheia conferem se a thread de gravação ainda existe.
+_POLL = 0.5
+
+# Tabelas do esquema original, que não têm todas as colunas de `Values.COLUMNS`.
+_LEGACY_TABLES = ("sensor_values", "events")
+
+
+class SQLiteWriter:
+    """
+    Gravador assíncrono com uma conexão de longa duração.
+
+    Em bancos no esquema versão 1 (`sensorlog.schema`), as linhas destinadas a
+    `sensor_values` e `events` são convertidas por `Schema.insert`, que também
+    atualiza os agregados de `sensorlog.rollup`; as demais tabelas são gravadas
+    diretamente. No esquema original (versão 0), colunas que essas tabelas não
+    têm são descartadas e `time` em segundos é gravado como data/hora.
+
+    Args:
+        db_name (str): Caminho do banco SQLite.
+        batch_size (int): Quantidade de linhas que dispara a gravação imediata.
+        flush_interval (float): Prazo máximo, em segundos, que uma linha aguarda na fila.
+        queue_size (int): Limite da fila; quando cheia, `write` aguarda espaço.
+        retries (int): Novas tentativas de um lote cuja transação falhou antes de descartá-lo.
+        retry_delay (float): Espera inicial, em segundos, entre tentativas (dobra a cada falha).
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        queue_size: int = 100_000,
+        retries: int = 5,
+        retry_delay: float = 1.0,
+    ):
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.failed_batches = 0
+        self.dropped_rows = 0
+        self._error: Optional[BaseException] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._statements: dict[tuple[str, tuple[str, ...]], str] = {}
+        self._legacy_layouts: dict[tuple[str, tuple[str, ...]], tuple] = {}
+        SQLITE_QUEUE_DEPTH.labels(db_name).set_function(self._queue.qsize)
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, table: str, columns: Sequence[str], row: Sequence):
+        """Enfileira uma linha; `columns` deve ser a mesma tupla para linhas do mesmo formato."""
+        self._put((table, tuple(columns), (tuple(row),)))
+
+    def write_many(self, table: str, columns: Sequence[str], rows: Sequence[Sequence]):
+        """Enfileira várias linhas do mesmo formato como um único item da fila."""
+        self._put((table, tuple(columns), rows))
+
+    def insert(self, table: str, data: dict):
+        """Enfileira um dicionário coluna → valor (mesma interface de `insert_into_db`)."""
+        self._put((table, tuple(data), (tuple(data.values()),)))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Grava tudo o que foi enfileirado até aqui e aguarda a confirmação.
+
+        Returns:
+            bool: `False` se `timeout` segundos passarem antes da confirmação.
+
+        Raises:
+            sqlite3.Error: Se alguma linha enfileirada antes do `flush` não foi gravada
+                (a transação falhou; o lote aguarda uma nova tentativa ou foi descartado).
+            RuntimeError: Se a thread de gravação tiver terminado (após `close` ou por erro).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        marker = _Flush()
+        if not self._put(marker, deadline):
+            return False
+        while True:
+            wait = _POLL if deadline is None else min(_POLL, deadline - time.monotonic())
+            if marker.done.wait(max(0.0, wait)):
+                if marker.error is not None:
+                    raise sqlite3.Error(marker.error)
+                return True
+            if not self._thread.is_alive() and not marker.done.is_set():
+                raise self._stopped() from self._error
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Grava as linhas pendentes e encerra a thread e a conexão.
+
+        Raises:
+            RuntimeError: Se a thread de gravação terminou por erro, com as linhas
+                ainda na fila não gravadas.
+        """
+        if self._thread.is_alive():
+            deadline = None if timeout is None else time.monotonic() + timeout
+            if self._put(_STOP, deadline):
+                self._thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if self._error is not None:
+            raise self._stopped() from self._error
+
+    def _stopped(self) -> RuntimeError:
+        if self._error is None:
+            return RuntimeError(f"SQLiteWriter de {self.db_name} já encerrado")
+        return RuntimeError(f"Thread de gravação de {self.db_name} terminou por erro: {self._error}")
+
+    def _put(self, item, deadline: Optional[float] = None) -> bool:
+        """Enfileira `item`; com a fila cheia, levanta `RuntimeError` se a thread tiver terminado."""
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        while True:
+            wait = _POLL if deadline is None else min(_POLL, deadline - time.monotonic())
+            try:
+                self._queue.put(item, timeout=max(0.0, wait))
+                return True
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise self._stopped() from self._error
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _statement(self, table: str, columns: tuple[str, ...]) -> str:
+        key = (table, columns)
+        sql = self._statements.get(key)
+        if sql is None:
+            placeholders = ", ".join("?" * len(columns))
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+            self._statements[key] = sql
+        return sql
+
+    def _legacy_rows(self, conn: sqlite3.Connection, table: str, columns: tuple[str, ...], rows: list) -> tuple:
+        key = (table, columns)
+        layout = self._legacy_layouts.get(key)
+        if layout is None:
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            kept = tuple(column for column in columns if column in existing)
+            time_at = kept.index("time") if "time" in kept else None
+            layout = self._legacy_layouts[key] = (kept, [columns.index(column) for column in kept], time_at)
+        kept, positions, time_at = layout
+        out = []
+        for row in rows:
+            values = [row[index] for index in positions]
+            if time_at is not None and isinstance(values[time_at], (int, float)):
+                values[time_at] = datetime.fromtimestamp(values[time_at])
+            out.append(values)
+        return kept, out
+
+    def _run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            self._error = e
+            logger.error(f"Erro na thread de gravação de {self.db_name}: {e}")
+
+    def _loop(self):
+        conn = connect(self.db_name)
+        schema = Schema.load(conn)
+        groups: dict[tuple[str, tuple[str, ...]], list[tuple]] = {}
+        count = 0
+        deadline = None
+        stop = False
+        failed: list[_Failed] = []
+        try:
+            while not stop:
+                due = [moment for moment in (deadline, failed[0].due if failed else None) if moment is not None]
+                timeout = max(0.0, min(due) - time.monotonic()) if due else None
+                markers = []
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                # Esvazia o que já estiver na fila sem bloquear, até completar o lote.
+                while item is not None:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, _Flush):
+                        markers.append(item)
+                    else:
+                        table, columns, rows = item
+                        groups.setdefault((table, columns), []).extend(rows)
+                        count += len(rows)
+                        if deadline is None:
+                            deadline = time.monotonic() + self.flush_interval
+                    if count >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+
+                error = None
+                now = time.monotonic()
+                if count and (stop or markers or count >= self.batch_size or now >= deadline):
+                    error = self._commit(conn, schema, groups, count)
+                    if error is not None:
+                        # As linhas ficam guardadas: um `flush` não pode tratá-las como gravadas.
+                        failed.append(_Failed(groups, count, now + self.retry_delay))
+                    groups = {}
+                    count = 0
+                    deadline = None
+                error = self._retry(conn, schema, failed, now, stop) or error
+                for marker in markers:
+                    if failed or error is not None:
+                        marker.error = f"Linhas não gravadas em {self.db_name}: {error or 'lote aguardando nova tentativa'}"
+                    marker.done.set()
+        finally:
+            conn.close()
+
+    def _retry(self, conn: sqlite3.Connection, schema: Optional[Schema], failed: list, now: float, stop: bool):
+        """Tenta de novo os lotes vencidos (todos ao encerrar); retorna o último erro."""
+        error = None
+        for batch in list(failed):
+            if batch.due > now and not stop:
+                continue
+            last = self._commit(conn, schema, batch.groups, batch.count)
+            if last is None:
+                failed.remove(batch)
+                continue
+            error = last
+            if stop or batch.attempts >= self.retries:
+                failed.remove(batch)
+                self.dropped_rows += batch.count
+                SQLITE_DROPPED.inc(batch.count)
+                logger.error(
+                    f"Erro ao gravar lote de {batch.count} linhas no banco de dados: "
+                    f"descartado após {batch.attempts + 1} tentativas"
+                )
+            else:
+                batch.due = now + min(self.retry_delay * 2**batch.attempts, 300.0)
+                batch.attempts += 1
+        failed.sort(key=lambda batch: batch.due)
+        return error
+
+    def _commit(self, conn: sqlite3.Connection, schema: Optional[Schema], groups: dict, count: int) -> Optional[str]:
+        """Grava um lote em uma transação; retorna a descrição do erro, se falhar."""
+        started = time.perf_counter()
+        try:
+            with conn:
+                for (table, columns), rows in groups.items():
+                    if schema is not None and schema.insert(table, columns, rows):
+                        continue
+                    if schema is None and table in _LEGACY_TABLES:
+                        columns, rows = self._legacy_rows(conn, table, columns, rows)
+                    conn.executemany(self._statement(table, columns), rows)
+            SQLITE_COMMIT.observe(time.perf_counter() - started)
+            SQLITE_ROWS.inc(count)
+            logger.debug("Lote de %d linhas gravado em %s", count, self.db_name)
+        except Exception as e:
+            self.failed_batches += 1
+            SQLITE_ERRORS.inc()
+            if schema is not None:
+                schema.forget()
+            logger.error(f"Erro ao gravar lote de {count} linhas no banco de dados: {e}")
+            return str(e)
+        if schema is not None:
+            schema.maintain()
+        return None
+
+
+__all__ = [
+    "SQLiteWriter",
+    "connect",
+    "create_tables",
+    "EVENTS_TABLE_SQL",
+    "SENSOR_VALUES_TABLE_SQL",
+]
@@ -0,0 +1,128 @@
+"""
+Recebimento de atualizações por webhook, alternativa ao long polling.
+
+O Telegram envia cada `Update` em um POST. `WebhookReceiver.accept` extrai o
+`channel_post`, aplica o filtro sobre o próprio JSON, descarta reentregas e
+entrega um `ChannelMessage` (sem os objetos de `types.Message`) ao
+`Pipeline` (decodificação e filas dos destinos) sem esperar pelos destinos, de
+modo que a resposta ao Telegram sai logo após a decodificação. Cada requisição
+é independente, portanto o servidor pode rodar com vários workers do uvicorn
+(um `Pipeline` por processo); veja `http_server.py`.
+"""
+
+from __future__ import annotations
+
+import hmac
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from . import metrics
+from .dedup import Deduplicator
+from .message import ChannelMessage, channel_post, filter_channel_post
+from .pipeline import Pipeline
+
+if TYPE_CHECKING:
+    from telebot import TeleBot
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+ALLOWED_UPDATES = ["channel_post"]
+
+QUEUED = "queued"
+IGNORED = "ignored"
+FILTERED = "filtered"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+RESULTS = (QUEUED, IGNORED, FILTERED, DUPLICATE, INVALID)
+
+WEBHOOK_UPDATES = metrics.counter(
+    "sensorlog_webhook_updates_total", "Atualizações recebidas por webhook, por resultado.", ("result",)
+)
+WEBHOOK_SECONDS = metrics.histogram(
+    "sensorlog_webhook_seconds", "Duração do processamento de uma atualização (até a entrega às filas)."
+)
+
+
+class WebhookReceiver:
+    """
+    Entrega as mensagens de canal recebidas por webhook a um `Pipeline`.
+
+    Args:
+        pipeline (Pipeline): Destinos das leituras e eventos decodificados.
+        secret (str | None): Valor esperado no cabeçalho `X-Telegram-Bot-Api-Secret-Token`
+            (o `secret_token` de `set_webhook`).
+        func: Filtro aplicado ao `channel_post` (dict); o padrão equivale ao dos scripts de polling.
+        dedup (Deduplicator | None): Descarte de reentregas do Telegram. Com vários
+            workers, cada processo vê apenas as atualizações que recebeu.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        secret: Optional[str] = None,
+        func: Callable[[dict], bool] = filter_channel_post,
+        dedup: Optional[Deduplicator] = None,
+    ):
+        self.pipeline = pipeline
+        self.secret = secret or None
+        self.func = func
+        self.dedup = dedup
+        self.counters = dict.fromkeys(RESULTS, 0)
+        self._results = {result: WEBHOOK_UPDATES.labels(result) for result in RESULTS}
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Confere o cabeçalho secreto (sempre `True` sem `secret`)."""
+        if self.secret is None:
+            return True
+        return token is not None and hmac.compare_digest(token.encode(), self.secret.encode())
+
+    def accept(self, update: Optional[dict]) -> str:
+        """
+        Processa um `Update` (`None` se o corpo não era JSON válido) e retorna o
+        resultado (`queued`, `ignored`, `filtered`, `duplicate` ou `invalid`).
+        Nunca levanta exceção: atualizações com problema são registradas e
+        confirmadas, para que o Telegram não as reenvie.
+        """
+        started = time.perf_counter()
+        result = self._accept(update)
+        WEBHOOK_SECONDS.observe(time.perf_counter() - started)
+        self.counters[result] += 1
+        self._results[result].inc()
+        return result
+
+    def _accept(self, update: Optional[dict]) -> str:
+        if not isinstance(update, dict):
+            return INVALID
+        try:
+            data = channel_post(update)
+            if data is None:
+                return IGNORED
+            if not self.func(data):
+                return FILTERED
+            message = ChannelMessage.from_dict(data)
+            if self.dedup is not None and not self.dedup.admit(message.chat.id, message.message_id):
+                return DUPLICATE
+            return QUEUED if self.pipeline.handle(message) is not None else IGNORED
+        except Exception as e:
+            logger.error(f"Erro ao processar a atualização do webhook: {e}")
+            return INVALID
+
+    def stats(self) -> dict:
+        return {**self.counters, "pipeline": self.pipeline.stats()}
+
+
+def set_webhook(bot: TeleBot, url: str, secret: Optional[str] = None, max_connections: int = 40) -> bool:
+    """Registra `url` no Telegram para receber apenas `channel_post` (desativa o polling do token)."""
+    return bot.set_webhook(
+        url=url, secret_token=secret or None, allowed_updates=ALLOWED_UPDATES, max_connections=max_connections
+    )
+
+
+__all__ = [
+    "WebhookReceiver",
+    "set_webhook",
+    "SECRET_HEADER",
+    "ALLOWED_UPDATES",
+]
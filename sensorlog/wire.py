@@ -0,0 +1,323 @@
+"""
+Formato binário compacto para `Values` e `Events`.
+
+Cada registro é um quadro autodelimitado (little-endian):
+
+    cabeçalho  B versão | B tipo | I tamanho total | q time (µs) | i timezone_offset
+               q channel_id | q message_id | I bitmap de nulos
+    Values     7d (level..v1) | 6i (snr..speed2) | q counter | i digital_input
+               3H tamanhos de channel_name, bot_name, device_name | textos UTF-8
+    Events     B type | 5 tamanhos (3H nomes, H flag, I text) | textos UTF-8
+
+O bitmap marca com 1 os campos ausentes: bits 0–14 seguem `_VALUE_FIELDS`, os
+demais cobrem `channel_id`, `message_id` e os três nomes. A decodificação lê
+direto de um `memoryview`, sem copiar o buffer recebido.
+
+A versão 2 grava `time` em microssegundos; quadros da versão 1 (segundos
+inteiros, ainda presentes em spools antigos) continuam legíveis.
+"""
+
+from __future__ import annotations
+
+import struct
+from datetime import datetime, timedelta
+from operator import attrgetter
+from typing import Iterator, Optional
+
+from .core import Events, Values, _VALUE_FIELDS
+
+CONTENT_TYPE = "application/x-sensorlog"
+VERSION = 2
+# Unidades de `time` por segundo, por versão de quadro aceita na leitura.
+_TIME_SCALE = {1: 1, 2: 1_000_000}
+KIND_VALUES = 1
+KIND_EVENT = 2
+
+_HEADER = "<BBIqiqqI"
+_VALUES = struct.Struct(_HEADER + "7d6iqi" + "3H")
+_EVENT = struct.Struct(_HEADER + "B" + "4HI")
+_FRAME = struct.Struct("<BBI")
+
+_WIDTH = len(_VALUE_FIELDS)
+# Campos de `_VALUE_FIELDS` a partir deste índice são inteiros no quadro (6i q i).
+_FIRST_INT = 7
+_VALUE_NULLS = (1 << _WIDTH) - 1
+_NULL_CHANNEL_ID = 1 << _WIDTH
+_NULL_MESSAGE_ID = 1 << (_WIDTH + 1)
+_NULL_CHANNEL_NAME = 1 << (_WIDTH + 2)
+_NULL_BOT_NAME = 1 << (_WIDTH + 3)
+_NULL_DEVICE_NAME = 1 << (_WIDTH + 4)
+_NAME_BITS = (_NULL_CHANNEL_NAME, _NULL_BOT_NAME, _NULL_DEVICE_NAME)
+
+_get_values = attrgetter(*_VALUE_FIELDS)
+
+
+def _id_fields(record) -> tuple[int, int, int, bytes, bytes, bytes]:
+    mask = 0
+    channel_id, message_id = record.channel_id, record.message_id
+    if channel_id is None:
+        mask |= _NULL_CHANNEL_ID
+        channel_id = 0
+    elif channel_id.__class__ is not int:
+        channel_id = int(channel_id)
+    if message_id is None:
+        mask |= _NULL_MESSAGE_ID
+        message_id = 0
+    elif message_id.__class__ is not int:
+        message_id = int(message_id)
+    names = []
+    for bit, name in zip(_NAME_BITS, (record.channel_name, record.bot_name, record.device_name)):
+        if name is None:
+            mask |= bit
+            names.append(b"")
+        else:
+            names.append(name.encode("utf-8"))
+    return mask, channel_id, message_id, names[0], names[1], names[2]
+
+
+def _micros(record) -> int:
+    return round(record.epoch * 1_000_000)
+
+
+def encode_values(values: Values) -> bytes:
+    mask, channel_id, message_id, channel_name, bot_name, device_name = _id_fields(values)
+    numbers = list(_get_values(values))
+    for index, number in enumerate(numbers):
+        if number is None:
+            mask |= 1 << index
+            numbers[index] = 0
+        elif index >= _FIRST_INT and number.__class__ is not int:
+            # `Decode.from_dict` e o JSON podem trazer floats em campos inteiros.
+            numbers[index] = int(number)
+    size = _VALUES.size + len(channel_name) + len(bot_name) + len(device_name)
+    return (
+        _VALUES.pack(
+            VERSION,
+            KIND_VALUES,
+            size,
+            _micros(values),
+            int(values.timezone_offset.total_seconds()),
+            channel_id,
+            message_id,
+            mask,
+            *numbers,
+            len(channel_name),
+            len(bot_name),
+            len(device_name),
+        )
+        + channel_name
+        + bot_name
+        + device_name
+    )
+
+
+def encode_event(event: Events) -> bytes:
+    mask, channel_id, message_id, channel_name, bot_name, device_name = _id_fields(event)
+    flag = event.flag.encode("utf-8")
+    text = event.text.encode("utf-8")
+    size = _EVENT.size + len(channel_name) + len(bot_name) + len(device_name) + len(flag) + len(text)
+    return (
+        _EVENT.pack(
+            VERSION,
+            KIND_EVENT,
+            size,
+            _micros(event),
+            int(event.timezone_offset.total_seconds()),
+            channel_id,
+            message_id,
+            mask,
+            int(event.type),
+            len(channel_name),
+            len(bot_name),
+            len(device_name),
+            len(flag),
+            len(text),
+        )
+        + channel_name
+        + bot_name
+        + device_name
+        + flag
+        + text
+    )
+
+
+def encode(record: Values | Events) -> bytes:
+    """Codifica um `Values` ou `Events` em um quadro binário."""
+    if isinstance(record, Values):
+        return encode_values(record)
+    if isinstance(record, Events):
+        return encode_event(record)
+    raise TypeError(f"Tipo não suportado: {type(record).__name__}")
+
+
+def iter_frames(buffer) -> Iterator[memoryview]:
+    """Percorre os quadros completos de `buffer`, devolvendo fatias sem cópia."""
+    view = memoryview(buffer)
+    offset = 0
+    end = len(view)
+    while end - offset >= _FRAME.size:
+        version, _, size = _FRAME.unpack_from(view, offset)
+        if version not in _TIME_SCALE or size < _FRAME.size:
+            raise ValueError(f"Quadro inválido na posição {offset}")
+        if end - offset < size:
+            raise ValueError("Quadro incompleto no fim do buffer")
+        yield view[offset : offset + size]
+        offset += size
+    if offset != end:
+        raise ValueError("Quadro incompleto no fim do buffer")
+
+
+def _texts(frame: memoryview, offset: int, sizes) -> list[str]:
+    texts = []
+    for size in sizes:
+        texts.append(str(frame[offset : offset + size], "utf-8"))
+        offset += size
+    return texts
+
+
+def decode_dict(frame: memoryview) -> dict:
+    """
+    Decodifica um quadro para o mesmo dicionário enviado em JSON por `http_post.py`
+    (`time` em segundos desde a época; campos nulos como `None`).
+
+    Raises:
+        ValueError: Se a versão do quadro não for suportada, se ele for menor que o
+            cabeçalho do seu tipo ou se os textos não couberem nele.
+    """
+    if len(frame) < _FRAME.size:
+        raise ValueError(f"Quadro de {len(frame)} bytes; mínimo {_FRAME.size}")
+    scale = _TIME_SCALE.get(frame[0])
+    if scale is None:
+        raise ValueError(f"Versão de quadro não suportada: {frame[0]}")
+    kind = frame[1]
+    layout = _VALUES if kind == KIND_VALUES else _EVENT if kind == KIND_EVENT else None
+    if layout is None:
+        raise ValueError(f"Tipo de registro desconhecido: {kind}")
+    if len(frame) < layout.size:
+        raise ValueError(f"Quadro de {len(frame)} bytes; mínimo {layout.size} para o tipo {kind}")
+    fields = layout.unpack_from(frame)
+    if kind == KIND_VALUES:
+        head, numbers, sizes = fields[3:8], fields[8 : 8 + _WIDTH], fields[8 + _WIDTH :]
+    else:
+        head, event_type, sizes = fields[3:8], fields[8], fields[9:]
+    offset = layout.size
+    if offset + sum(sizes) > len(frame):
+        raise ValueError(f"Textos de {sum(sizes)} bytes não cabem no quadro de {len(frame)} bytes")
+
+    time, timezone_offset, channel_id, message_id, mask = head
+    texts = _texts(frame, offset, sizes)
+    data = {
+        "time": time / scale,
+        "timezone_offset": float(timezone_offset),
+        "channel_id": None if mask & _NULL_CHANNEL_ID else channel_id,
+        "channel_name": None if mask & _NULL_CHANNEL_NAME else texts[0],
+        "message_id": None if mask & _NULL_MESSAGE_ID else message_id,
+        "bot_name": None if mask & _NULL_BOT_NAME else texts[1],
+        "device_name": None if mask & _NULL_DEVICE_NAME else texts[2],
+    }
+    if kind == KIND_VALUES:
+        data.update(zip(_VALUE_FIELDS, numbers))
+        nulls = mask & _VALUE_NULLS
+        if nulls:
+            for index, field in enumerate(_VALUE_FIELDS):
+                if nulls >> index & 1:
+                    data[field] = None
+    else:
+        data["type"] = event_type
+        data["flag"] = texts[3]
+        data["text"] = texts[4]
+    return data
+
+
+def decode(frame: memoryview) -> Values | Events:
+    """Reconstrói o `Values` ou `Events` de um quadro."""
+    data = decode_dict(frame)
+    time = data.pop("time")
+    time = int(time) if time.is_integer() else datetime.fromtimestamp(time)
+    timezone_offset = int(data.pop("timezone_offset"))
+    if frame[1] == KIND_EVENT:
+        return Events(
+            event_type=data.pop("type"),
+            event_text=data.pop("text"),
+            event_flag=data.pop("flag"),
+            time=time,
+            timezone_offset=timezone_offset,
+            **data,
+        )
+    return Values.from_parsed(
+        time,
+        data["channel_id"],
+        data["channel_name"],
+        data["message_id"],
+        data["bot_name"],
+        data["device_name"],
+        [data[field] for field in _VALUE_FIELDS],
+        timedelta(seconds=timezone_offset),
+    )
+
+
+class RecordStream:
+    """
+    Separa quadros recebidos em pedaços (mesma interface de `JsonRecordStream`).
+
+    Args:
+        kind (int | None): Se informado, rejeita quadros de outro tipo.
+    """
+
+    __slots__ = ("_buffer", "_kind")
+
+    def __init__(self, kind: Optional[int] = None):
+        self._buffer = bytearray()
+        self._kind = kind
+
+    def feed(self, chunk: bytes) -> list[dict]:
+        self._buffer += chunk
+        buffer = self._buffer
+        records = []
+        offset = 0
+        with memoryview(buffer) as view:
+            while len(buffer) - offset >= _FRAME.size:
+                version, kind, size = _FRAME.unpack_from(view, offset)
+                if version not in _TIME_SCALE or size < _FRAME.size:
+                    raise ValueError(f"Quadro inválido na posição {offset}")
+                if self._kind is not None and kind != self._kind:
+                    raise ValueError(f"Tipo de registro inesperado: {kind}")
+                if len(buffer) - offset < size:
+                    break
+                with view[offset : offset + size] as frame:
+                    records.append(decode_dict(frame))
+                offset += size
+        del buffer[:offset]
+        return records
+
+    def close(self) -> list[dict]:
+        if self._buffer:
+            raise ValueError("Quadro incompleto no fim do corpo")
+        return []
+
+
+class BinaryCodec:
+    """Codec para `HttpForwarder`: um ou vários registros concatenados."""
+
+    content_type = CONTENT_TYPE
+
+    @staticmethod
+    def encode(payload) -> bytes:
+        if isinstance(payload, list):
+            return b"".join(map(encode, payload))
+        return encode(payload)
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "KIND_VALUES",
+    "KIND_EVENT",
+    "BinaryCodec",
+    "RecordStream",
+    "encode",
+    "encode_values",
+    "encode_event",
+    "iter_frames",
+    "decode",
+    "decode_dict",
+]